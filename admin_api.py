@@ -3,6 +3,7 @@ Admin Panel API Endpoints
 Bu dosyayı main.py'ye import edin
 """
 import base64
+import datetime
 import secrets
 import os
 
@@ -10,6 +11,12 @@ from fastapi import APIRouter, Request, Depends, HTTPException, status
 from fastapi.responses import HTMLResponse, JSONResponse
 from servisler.sweep_service import CoboSweepService
 from servisler.withdrawal_service import CoboWithdrawalService
+from core.transaction.transaction_event import TransactionEvent
+from core.tokens.token_registry import resolve_token
+from core.currency.price_cache import price_cache
+from core.filter.base_volume_filter import BaseVolumeFilter
+from servisler.db_service import get_backfill_checkpoint, get_ledger_entries, summarize_ledger
+from workers.backfill_worker import cobo_backfill, parse_iso_to_ms, CHECKPOINT_NAME
 from config.settings import (
     ADMIN_USERNAME,
     ADMIN_PASSWORD,
@@ -113,18 +120,26 @@ async def admin_dashboard(request: Request):
         transactions = sweep_service.list_transactions(wallet_id, limit=100)
         balances = sweep_service.get_token_balances(wallet_id)
         
-        # Toplam USDT bakiyesini bul
+        # Toplam USDT bakiyesini bul + tüm token'ların tahmini USD değeri (cache'teki kurlarla)
         total_usdt = "0.00"
+        total_usd = 0.0
         if balances.get("success"):
             token_list = balances["data"].get("data", [])
             for token in token_list:
-                if "USDT" in token.get("token_id", ""):
-                    total_usdt = token.get("balance", {}).get("total", "0.00")
-                    break
+                token_info = resolve_token(token.get("token_id"))
+                token_total = token.get("balance", {}).get("total", "0.00")
+                if token_info and token_info.asset == "USDT" and total_usdt == "0.00":
+                    total_usdt = token_total
+                try:
+                    total_usd += float(token_total) * (BaseVolumeFilter.get_usd_rate(token.get("token_id")) or 0.0)
+                except (TypeError, ValueError):
+                    pass
         
         return {
             "success": True,
             "balance": f"{total_usdt} USDT",
+            "total_usd": round(total_usd, 2),
+            "prices": price_cache.snapshot(),
             "balances": balances.get("data", {}).get("data", []) if balances.get("success") else [],
             "addresses": len(addresses.get("data", {}).get("data", [])) if addresses.get("success") else 0,
             "transactions": len(transactions.get("data", {}).get("data", [])) if transactions.get("success") else 0
@@ -183,34 +198,17 @@ async def admin_transactions(request: Request, type: str = None):
             # Verileri normalize et (Miktar ve Token ID'yi düzleştir)
             transactions = []
             for tx in raw_transactions:
-                # Cobo WaaS 2.0 structure flattening - Daha detaylı kontrol
-                amount = tx.get("amount")
-                token_id = tx.get("token_id") or tx.get("asset_id")
-                to_addr = tx.get("to_address")
-
-                # Eğer ana seviyede yoksa destination içinden bak (Örn: Çekim işlemleri)
-                dest = tx.get("destination", {})
-                if isinstance(dest, list) and len(dest) > 0:
-                    dest = dest[0] # Listeyse ilkini al
-                
-                if not amount and isinstance(dest, dict):
-                    amount = dest.get("amount")
-                if not to_addr and isinstance(dest, dict):
-                    to_addr = dest.get("address")
-                
-                # HALA YOKSA (Örn: Yatırım işlemleri - Source kısmında olabilir veya SDK farklı dönmüştür)
-                if not amount: amount = "0"
-                if not token_id: token_id = "USDT"
-                if not to_addr: to_addr = "N/A"
+                # Cobo WaaS 2.0 structure flattening — ortak model üzerinden
+                event = TransactionEvent.from_cobo_transaction(tx)
 
                 tx_data = {
-                    "transaction_id": tx.get("transaction_id"),
+                    "transaction_id": event.transaction_id,
                     "type": tx.get("type"),
                     "status": tx.get("status"),
-                    "created_timestamp": tx.get("created_timestamp"),
-                    "amount": amount,
-                    "token_id": token_id,
-                    "to_address": to_addr
+                    "created_timestamp": event.created_timestamp,
+                    "amount": event.amount_raw or "0",
+                    "token_id": event.symbol or "USDT",
+                    "to_address": event.address or "N/A"
                 }
                 
                 # Tip filtreleme
@@ -313,3 +311,56 @@ async def admin_sweep(request: Request):
         }
     except Exception as e:
         return {"success": False, "error": str(e)}
+
+
+@router.post("/api/admin/backfill")
+async def admin_backfill_start(request: Request):
+    """
+    Kaçırılan webhook'lar için Cobo işlem geçmişini yeniden işler (arka planda).
+    Body: {"since": "2026-10-01", "until": "2026-10-02" (opsiyonel), "restart": false}
+    """
+    authenticate(request)
+    try:
+        data = await request.json()
+        if cobo_backfill.running:
+            return {"success": False, "error": "Backfill zaten çalışıyor."}
+        if not data.get("since"):
+            return {"success": False, "error": "Lütfen başlangıç tarihi (since) girin."}
+
+        since_ms = parse_iso_to_ms(data["since"])
+        until_ms = parse_iso_to_ms(data["until"]) if data.get("until") else None
+        cobo_backfill.start(since_ms, until_ms, restart=bool(data.get("restart")))
+        return {"success": True, "message": "Backfill başlatıldı"}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+@router.get("/api/admin/backfill")
+async def admin_backfill_status(request: Request):
+    """Backfill durumunu (checkpoint) döndürür"""
+    authenticate(request)
+    try:
+        checkpoint = await get_backfill_checkpoint(CHECKPOINT_NAME) or {}
+        checkpoint.pop("_id", None)
+        return {"success": True, "running": cobo_backfill.running, "checkpoint": checkpoint}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+@router.get("/api/admin/ledger")
+async def admin_ledger(request: Request, tp_number: str = None, symbol: str = None,
+                       since: str = None, until: str = None, limit: int = 100):
+    """
+    Yatırım defteri (müşteri ve/veya token bazında, yeniden eskiye) + varlık özeti.
+    since/until: ISO tarih ("2026-10-01"); limit en fazla 1000.
+    """
+    authenticate(request)
+    try:
+        since_dt = datetime.datetime.fromisoformat(since) if since else None
+        until_dt = datetime.datetime.fromisoformat(until) if until else None
+        entries = await get_ledger_entries(
+            tp_number=tp_number, symbol=symbol, since=since_dt, until=until_dt, limit=min(limit, 1000)
+        )
+        summary = await summarize_ledger(tp_number=tp_number, since=since_dt, until=until_dt)
+        return {"success": True, "data": entries, "summary": summary}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
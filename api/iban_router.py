@@ -34,6 +34,7 @@ from servisler.db_service import (
     get_lead_by_tp,
 )
 from servisler.telegram_service import send_telegram_msg
+from core.lead.lead_views import LeadIdentity, LeadFinancials
 from admin_api import authenticate, authenticate_iban
 from config.settings import COMPANY_NAME, DEFAULT_AGENT_NAME
 
@@ -68,7 +69,7 @@ async def iban_copy_notify(tp_number: str = Form(...)):
     Kullanıcı IBAN'ı kopyaladığında çağrılır.
     Telegram grubuna bildirim atar.
     """
-    lead = await get_lead_by_tp(tp_number)
+    lead = await get_lead_by_tp(tp_number, view=LeadIdentity)
     if not lead:
         raise HTTPException(status_code=404, detail="TP Number bulunamadı.")
 
@@ -76,7 +77,7 @@ async def iban_copy_notify(tp_number: str = Form(...)):
     if not iban:
         raise HTTPException(status_code=404, detail="Aktif IBAN bulunamadı.")
 
-    name = lead.get("name", "Bilinmeyen")
+    name = lead.name or "Bilinmeyen"
 
     msg = (
         f"📋 <b>IBAN KOPYALANDI</b>\n"
@@ -101,7 +102,7 @@ async def iban_deposit(
     """
     IBAN ile yatırım talebini oluşturur ve Telegram'a bildirim gönderir.
     """
-    lead = await get_lead_by_tp(tp_number)
+    lead = await get_lead_by_tp(tp_number, view=LeadFinancials)
     if not lead:
         raise HTTPException(status_code=404, detail="TP Number bulunamadı.")
 
@@ -109,7 +110,7 @@ async def iban_deposit(
     if not iban:
         raise HTTPException(status_code=404, detail="Aktif IBAN bulunamadı.")
 
-    name = lead.get("name", "Bilinmeyen")
+    name = lead.name or "Bilinmeyen"
 
     def tr_format(val):
         try:
@@ -135,13 +136,13 @@ async def iban_deposit(
         f"<b>Döviz:</b> {doviz}\n"
         f"<b>Miktar:</b> {tr_format(tutar)} {doviz}\n"
         f"<b>Firma Adı:</b> {COMPANY_NAME}\n"
-        f"<b>CRM NO:</b> {lead.get('crm_no', 'N/A')}\n"
+        f"<b>CRM NO:</b> {lead.crm_no or 'N/A'}\n"
         f"<b>MT5 :</b> <code>{tp_number}</code>\n"
-        f"<b>Müşteri Temsilcisi:</b> {lead.get('agent', DEFAULT_AGENT_NAME)}\n"
-        f"<b>Departman:</b> {lead.get('department', 'MAIN')}\n"
-        f"<b>Ref:</b> {lead.get('reference', 'N/A')}\n"
-        f"<b>Toplam Yatırım:</b> {tr_format(lead.get('total_deposit', 0.0))}\n"
-        f"<b>Toplam Çekim:</b> {tr_format(lead.get('total_withdrawal', 0.0))}\n"
+        f"<b>Müşteri Temsilcisi:</b> {lead.agent or DEFAULT_AGENT_NAME}\n"
+        f"<b>Departman:</b> {lead.department or 'MAIN'}\n"
+        f"<b>Ref:</b> {lead.reference or 'N/A'}\n"
+        f"<b>Toplam Yatırım:</b> {tr_format(lead.total_deposit)}\n"
+        f"<b>Toplam Çekim:</b> {tr_format(lead.total_withdrawal)}\n"
         f"<b>TALEP ZAMANI:</b> {now}"
     )
     send_telegram_msg(msg)
@@ -161,11 +162,11 @@ async def iban_withdrawal(
     """
     Çekim talebi oluşturur ve Telegram'a bildirim gönderir.
     """
-    lead = await get_lead_by_tp(tp_number)
+    lead = await get_lead_by_tp(tp_number, view=LeadIdentity)
     if not lead:
         raise HTTPException(status_code=404, detail="TP Number bulunamadı.")
 
-    name = lead.get("name", "Bilinmeyen")
+    name = lead.name or "Bilinmeyen"
 
     msg = (
         f"💸 <b>BANKA ÇEKİM TALEBİ</b>\n"
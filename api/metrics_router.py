@@ -0,0 +1,22 @@
+"""
+Pipeline Metrik Endpoint'i
+==========================
+- GET /metrics: Yatırım pipeline'ı aşama bazlı gecikme özetleri
+  (p50/p95/p99/avg/max, adet) — toplam, event_type ve token kırılımlarıyla.
+
+Metrikler process belleğinde tutulur; restart ile sıfırlanır.
+Kaynak: core/metrics/latency.py
+"""
+
+from fastapi import APIRouter, Request
+from admin_api import authenticate
+from core.metrics.latency import pipeline_metrics
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics")
+async def get_metrics(request: Request):
+    """Aşama bazlı gecikme histogramlarının özeti (admin yetkisi gerekir)."""
+    authenticate(request)
+    return pipeline_metrics.snapshot()
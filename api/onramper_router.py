@@ -39,6 +39,7 @@ from servisler.db_service import (
     get_existing_wallet
 )
 from servisler.telegram_service import send_telegram_msg
+from core.lead.lead_views import LeadIdentity
 from servisler.mt5_sync_util import force_sync_single_user
 
 router = APIRouter(prefix="/api/onramper", tags=["Onramper"])
@@ -99,18 +100,18 @@ async def get_widget_url(tp_number: str):
     Kullanıcı için imzalanmış Onramper Widget URL'si oluşturur ve Telegram bildirimini tetikler.
     """
     # 1. Kullanıcıyı veritabanından çek
-    lead = await get_lead_by_tp(tp_number)
+    lead = await get_lead_by_tp(tp_number, view=LeadIdentity)
     
     if not lead:
         # Fallback: manuel senkronizasyon tetikle ve tekrar kontrol et
         sync_success = await force_sync_single_user(tp_number)
         if sync_success:
-            lead = await get_lead_by_tp(tp_number)
+            lead = await get_lead_by_tp(tp_number, view=LeadIdentity)
 
     if not lead:
         raise HTTPException(status_code=404, detail="Kullanıcı (TP Number) bulunamadı!")
 
-    name = lead.get("name", "Değerli Yatırımcı")
+    name = lead.name or "Değerli Yatırımcı"
 
     # 2. USDT-TRON adresini al veya oluştur
     address = await _get_or_create_usdt_tron_wallet(tp_number)
@@ -192,13 +193,13 @@ async def onramper_callback(request: Request):
         return PlainTextResponse("ok")
 
     # Adrese göre kullanıcıyı (Lead) bul
-    lead = await get_lead_by_address(wallet_address)
+    lead = await get_lead_by_address(wallet_address, view=LeadIdentity)
     if not lead:
         logger.error(f"❌ Onramper Webhook: {wallet_address} adresine bağlı Lead bulunamadı!")
         return PlainTextResponse("ok")
 
-    name = lead.get("name", "Bilinmeyen Kullanıcı")
-    tp_number = lead.get("tp_number", "Bilinmeyen TP")
+    name = lead.name or "Bilinmeyen Kullanıcı"
+    tp_number = lead.tp_number or "Bilinmeyen TP"
 
     status = payload.get("status", "").lower()
     payment_method = payload.get("paymentMethod", "Bilinmeyen Yöntem")
@@ -2,12 +2,16 @@
 Sistem Bakım Endpoint'leri
 ==========================
 - fix-db: Veritabanı index onarımı ve duplicate kontrol
+- index-report: Migration durumu, eksik index'ler, sıcak sorguların explain
+  planı (COLLSCAN var mı?) ve index kullanım sayıları
 
 DİKKAT: Bu endpoint production'da sadece yetkili kişiler tarafından kullanılmalıdır.
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
+from admin_api import authenticate
 from servisler.db_service import ensure_transaction_index
+from servisler.db_migrations import build_index_report
 
 router = APIRouter(prefix="/api/system", tags=["System"])
 
@@ -30,3 +34,13 @@ async def manual_fix_db():
             "status": "error",
             "message": f"Hata: {str(e)}"
         }
+
+
+@router.get("/index-report")
+async def index_report(request: Request):
+    """
+    Hiçbir sıcak sorgunun koleksiyon taraması yapmadığını gösteren rapor
+    (admin yetkisi gerekir). collection_scans boş olmalı.
+    """
+    authenticate(request)
+    return await build_index_report()
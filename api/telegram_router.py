@@ -26,6 +26,7 @@ from config.settings import COBO_WALLET_ID, APP_BASE_URL
 from workers.pending_store import pending_transactions
 from workers.webhook_processor import _process_mt5_balance
 from core.comision.calculate_comision import COMISION_RATE
+from servisler.db_service import append_ledger_status
 
 logger = logging.getLogger(__name__)
 
@@ -99,7 +100,10 @@ async def telegram_callback(
 
     if action == "approve":
         # MT5'e bakiye ekle
-        await _process_mt5_balance(tp_number, name, net_amount, base_comment, formatted_net)
+        success, ticket = await _process_mt5_balance(tp_number, name, net_amount, base_comment, formatted_net)
+        await _record_ledger_status(
+            transaction_id, "mt5_credited" if success else "mt5_failed", mt5_ticket=ticket
+        )
         # pending_store'dan temizle
         pending_transactions.pop(transaction_id, None)
         return {"status": "success", "message": "MT5 aktarımı başlatıldı"}
@@ -121,6 +125,7 @@ async def telegram_callback(
             f"<b>DURUM :</b> ❌ MT5 BAKİYE EKLENMEDİ"
         )
         send_telegram_msg(reject_msg)
+        await _record_ledger_status(transaction_id, "rejected")
         # pending_store'dan temizle
         pending_transactions.pop(transaction_id, None)
         return {"status": "success", "message": "İşlem reddedildi"}
@@ -129,6 +134,14 @@ async def telegram_callback(
         return {"status": "error", "message": f"Bilinmeyen aksiyon: {action}"}
 
 
+async def _record_ledger_status(transaction_id: str, status: str, **fields):
+    """Onay/ret sonucunu defter kaydının zaman çizelgesine yazar (hata callback'i bozmaz)."""
+    try:
+        await append_ledger_status(transaction_id, status, **fields)
+    except Exception as e:
+        logger.error(f"❌ Defter durumu yazılamadı ({transaction_id}): {e}")
+
+
 async def _handle_sweep_command():
     """
     /sweep komutunu işler - Wallet durumunu gösterir
@@ -27,6 +27,7 @@ from servisler.db_service import (
     get_existing_wallet
 )
 from servisler.qr_service import generate_qr_base64
+from core.lead.lead_views import LeadBalance, LeadIdentity
 from config.settings import COBO_API_KEY, COBO_API_SECRET, COBO_WALLET_ID, logger
 from servisler.mt5_sync_util import force_sync_single_user
 
@@ -36,13 +37,13 @@ router = APIRouter(prefix="/api", tags=["Wallet"])
 @router.post("/verify_tp")
 async def verify_tp(tp_number: str = Form(...)):
     """TP numarasını doğrular ve müşteri bilgilerini döndürür"""
-    lead = await get_lead_by_tp(tp_number)
+    lead = await get_lead_by_tp(tp_number, view=LeadBalance)
     
     if not lead:
         # Fallback: manuel senkronizasyon tetikle ve tekrar kontrol et
         sync_success = await force_sync_single_user(tp_number)
         if sync_success:
-            lead = await get_lead_by_tp(tp_number)
+            lead = await get_lead_by_tp(tp_number, view=LeadBalance)
             
     if not lead:
         return JSONResponse(
@@ -51,18 +52,18 @@ async def verify_tp(tp_number: str = Form(...)):
         )
 
     mt5_data = {
-        "balance": lead.get("balance", 0),
-        "equity": lead.get("equity", 0),
-        "credit": lead.get("credit", 0),
-        "name": lead.get("name", "Değerli Yatırımcı")
+        "balance": lead.balance,
+        "equity": lead.equity,
+        "credit": lead.credit,
+        "name": lead.name or "Değerli Yatırımcı"
     }
 
     return {
         "status": "success",
         "name": mt5_data.get("name"),
-        "email": lead.get("email"),
+        "email": lead.email,
         "mt5": mt5_data,
-        "last_sync": lead.get("last_sync")
+        "last_sync": lead.last_sync
     }
 
 
@@ -77,13 +78,13 @@ async def create_wallet(
     asset_name: str = Form(...)
 ):
     """Cobo API üzerinden yeni cüzdan oluşturur"""
-    lead = await get_lead_by_tp(tp_number)
+    lead = await get_lead_by_tp(tp_number, view=LeadIdentity)
     
     if not lead:
         # Fallback: manuel senkronizasyon tetikle ve tekrar kontrol et
         sync_success = await force_sync_single_user(tp_number)
         if sync_success:
-            lead = await get_lead_by_tp(tp_number)
+            lead = await get_lead_by_tp(tp_number, view=LeadIdentity)
             
     if not lead:
         raise HTTPException(status_code=404, detail="Geçersiz TP Number")
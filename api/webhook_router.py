@@ -2,39 +2,82 @@
 Cobo Webhook Endpoint'i
 =======================
 Cobo platformundan gelen POST bildirimlerini karşılar.
-Hızlıca 200 OK döner ve asıl işlemi BackgroundTasks'a atar.
+Tekrarlanan olayları eler, yenileri kalıcı outbox'a (db.webhook_outbox)
+yazar ve hızlıca 200 OK döner. Outbox WEBHOOK_QUEUE_HIGH_WATER_MARK'ı aşmışsa
+veya kuyruk worker'ları çalışmıyorsa 503 + Retry-After döner; taşan yük Cobo'nun
+retry mekanizmasında bekler.
 
 Asıl işleme mantığı: workers/webhook_processor.py
+Kuyruk / worker havuzu: workers/webhook_queue.py
 """
 
 import logging
-from fastapi import APIRouter, Request, BackgroundTasks
+from fastapi import APIRouter, Request
 from fastapi.responses import Response
-from workers.webhook_processor import process_cobo_notification
+from workers.webhook_queue import webhook_queue
+from workers.event_dedup import webhook_deduplicator
+from core.transaction.transaction_event import parse_webhook_body
+from core.metrics.latency import pipeline_metrics
+from config.settings import WEBHOOK_RETRY_AFTER_SECONDS
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["Webhook"])
 
 
+def _retry_response() -> Response:
+    """Cobo'nun olayı daha sonra tekrar göndermesi için 503."""
+    return Response(
+        content="retry",
+        status_code=503,
+        media_type="text/plain",
+        headers={"Retry-After": str(WEBHOOK_RETRY_AFTER_SECONDS)},
+    )
+
+
 @router.post("/cobo/callback_v2")
-async def cobo_callback(request: Request, background_tasks: BackgroundTasks):
+async def cobo_callback(request: Request):
     """
     Cobo webhook endpoint'i.
-    Hızla 200 OK döner, işlemi background'a atar.
+    Olayı outbox'a yazar ve hızla 200 OK döner.
+    Outbox'a yazılamazsa veya kuyruk doluysa 503 döner ki Cobo olayı tekrar göndersin.
     """
-    try:
-        # JSON verisini hemen oku
-        data = await request.json()
-        logger.info(f"📥 Webhook alındı (Queue'ya eklendi): {data.get('event_id', 'unknown')}")
+    # Worker'lar çalışmıyorsa olay outbox'ta işlenmeden kalır; Cobo tekrar göndersin
+    if not webhook_queue.running:
+        logger.error("❌ Webhook kuyruğu çalışmıyor, 503 dönülüyor")
+        return _retry_response()
 
-        # Ağır işlemi arka plana at
-        background_tasks.add_task(process_cobo_notification, data)
+    # Load shedding: body'yi parse etmeden önce ucuz kontrol
+    if webhook_queue.is_overloaded():
+        pipeline_metrics.increment("webhook_shed")
+        logger.warning(f"🚦 Webhook kuyruğu dolu ({webhook_queue.depth}), 503 dönülüyor")
+        return _retry_response()
 
-        # Cobo'ya hemen "ok" (plain text) dön
-        return Response(content="ok", media_type="text/plain")
+    try:
+        # Ham body'yi tek seferde parse et (orjson varsa onunla); JSON nesnesi değilse hata
+        data = parse_webhook_body(await request.body())
 
+        # Cobo retry'ları ve aynı status'lü created/updated/succeeded olayları
+        if await webhook_deduplicator.is_duplicate(data):
+            logger.info(f"⏭️ Tekrarlanan webhook atlandı: {data.get('event_id', 'unknown')}")
+            return Response(content="ok", media_type="text/plain")
     except Exception as e:
         logger.error(f"❌ Webhook karşılama hatası: {e}")
-        # Hata olsa bile 200 dönelim ki Cobo sürekli retry yapmasın
+        # Bozuk payload için 200 dönelim ki Cobo sürekli retry yapmasın
         return Response(content="ok", media_type="text/plain")
+
+    try:
+        # Olayı kalıcı kuyruğa yaz (restart/crash durumunda kaybolmaz)
+        await webhook_queue.enqueue(data)
+        logger.info(f"📥 Webhook alındı (Outbox'a yazıldı): {data.get('event_id', 'unknown')}")
+    except Exception as e:
+        logger.error(f"❌ Webhook outbox'a yazılamadı: {e}")
+        webhook_deduplicator.forget(data)
+        # Olay kaybolmasın: Cobo'nun retry mekanizmasına bırak
+        return _retry_response()
+
+    # Paylaşımlı dedup açıksa diğer process'ler de bu olayı görsün
+    await webhook_deduplicator.remember(data)
+
+    # Cobo'ya hemen "ok" (plain text) dön
+    return Response(content="ok", media_type="text/plain")
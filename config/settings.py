@@ -97,6 +97,123 @@ TRX_CONVERTER_WALLET  = os.getenv("TRX_CONVERTER_WALLET", "")
 # false ise routing tamamen atlanır; coin webhook işlenmeye devam eder ama transfer yapılmaz.
 COBO_AUTO_ROUTING_ENABLED = os.getenv("COBO_AUTO_ROUTING_ENABLED", "true").lower() == "true"
 
+# ─── Webhook Kuyruğu (MongoDB Outbox) ────────────────────────────────────────
+# Cobo webhook'ları önce db.webhook_outbox koleksiyonuna yazılır, sonra sabit
+# sayıdaki worker tarafından lease (kiralama) mantığıyla işlenir.
+WEBHOOK_QUEUE_CONCURRENCY     = int(os.getenv("WEBHOOK_QUEUE_CONCURRENCY", 4))
+WEBHOOK_QUEUE_LEASE_SECONDS   = int(os.getenv("WEBHOOK_QUEUE_LEASE_SECONDS", 300))
+WEBHOOK_QUEUE_MAX_ATTEMPTS    = int(os.getenv("WEBHOOK_QUEUE_MAX_ATTEMPTS", 5))
+WEBHOOK_QUEUE_POLL_SECONDS    = float(os.getenv("WEBHOOK_QUEUE_POLL_SECONDS", 2))
+WEBHOOK_QUEUE_RETENTION_HOURS = int(os.getenv("WEBHOOK_QUEUE_RETENTION_HOURS", 72))
+
+# Backpressure: bekleyen olay sayısı HIGH_WATER_MARK'a ulaşınca webhook 503 + Retry-After
+# döner (0 = kapalı). Derinlik bellekte tutulur, REFRESH_SECONDS'ta bir Mongo'dan düzeltilir.
+WEBHOOK_QUEUE_HIGH_WATER_MARK       = int(os.getenv("WEBHOOK_QUEUE_HIGH_WATER_MARK", 5000))
+WEBHOOK_QUEUE_DEPTH_REFRESH_SECONDS = float(os.getenv("WEBHOOK_QUEUE_DEPTH_REFRESH_SECONDS", 5))
+WEBHOOK_RETRY_AFTER_SECONDS         = int(os.getenv("WEBHOOK_RETRY_AFTER_SECONDS", 30))
+
+# Öncelikli işleme: HIGH_VALUE_USD üstü yatırımlar öne geçer, spam/dust sona kalır.
+# Her seviye farkı AGING_SECONDS kadar avans demektir (0 = FIFO); düşük öncelikli
+# bir olay en fazla 3 * AGING_SECONDS geride kalır (açlık koruması).
+WEBHOOK_PRIORITY_HIGH_VALUE_USD = float(os.getenv("WEBHOOK_PRIORITY_HIGH_VALUE_USD", 10000))
+WEBHOOK_PRIORITY_AGING_SECONDS  = float(os.getenv("WEBHOOK_PRIORITY_AGING_SECONDS", 30))
+
+# Tekrarlanan Cobo webhook'larını (aynı event_id veya aynı transaction_id+status)
+# kuyruğa yazmadan eler. SHARED=true ise bellek dışında Mongo'da da tutulur (çoklu worker).
+WEBHOOK_DEDUP_MAX_ENTRIES = int(os.getenv("WEBHOOK_DEDUP_MAX_ENTRIES", 50000))
+WEBHOOK_DEDUP_TTL_SECONDS = int(os.getenv("WEBHOOK_DEDUP_TTL_SECONDS", 86400))
+WEBHOOK_DEDUP_SHARED      = os.getenv("WEBHOOK_DEDUP_SHARED", "false").lower() == "true"
+
+# Opsiyonel micro-batch: aynı anda işlenen yatırımların lead sorgusu, kilit ve
+# istatistik güncellemesi toplu Mongo işlemleriyle yapılır. Her queue worker kendi
+# olayını beklediği için bir batch en fazla WEBHOOK_QUEUE_CONCURRENCY olay tutar;
+# MAX_EVENTS bu sınıra kırpılır. Tüm worker'lar yatırım işlerken pencere beklenmez.
+WEBHOOK_BATCH_ENABLED    = os.getenv("WEBHOOK_BATCH_ENABLED", "false").lower() == "true"
+WEBHOOK_BATCH_WINDOW_MS  = int(os.getenv("WEBHOOK_BATCH_WINDOW_MS", 10))
+WEBHOOK_BATCH_MAX_EVENTS = min(
+    int(os.getenv("WEBHOOK_BATCH_MAX_EVENTS", WEBHOOK_QUEUE_CONCURRENCY)),
+    WEBHOOK_QUEUE_CONCURRENCY,
+)
+
+# ─── Adres İndeksi (İç Transfer Tespiti) ─────────────────────────────────────
+# Müşteri adresleri bellekte tutulur. Birden fazla process varsa diğerlerinin eklediği
+# cüzdanlar için change stream (replica set gerekir) veya periyodik yeniden yükleme.
+ADDRESS_INDEX_CHANGE_STREAM  = os.getenv("ADDRESS_INDEX_CHANGE_STREAM", "false").lower() == "true"
+ADDRESS_INDEX_RELOAD_SECONDS = float(os.getenv("ADDRESS_INDEX_RELOAD_SECONDS", 300))
+
+# Çok büyük adres sayıları için: ADDRESS_INDEX_MODE=bloom → adresler set yerine mmap'lenmiş
+# Bloom filtresinde tutulur (tüm worker'lar aynı dosyayı paylaşır), pozitifler Mongo'da doğrulanır.
+# ADDRESS_BLOOM_PATH sürüm dosyalarının ön ekidir (<path>.<zaman damgası>); her kurulum yeni dosya yazar.
+ADDRESS_INDEX_MODE         = os.getenv("ADDRESS_INDEX_MODE", "set").lower()
+ADDRESS_BLOOM_PATH         = os.getenv("ADDRESS_BLOOM_PATH", "cache/address_bloom.bin")
+ADDRESS_BLOOM_ERROR_RATE   = float(os.getenv("ADDRESS_BLOOM_ERROR_RATE", 0.001))
+ADDRESS_BLOOM_MIN_CAPACITY = int(os.getenv("ADDRESS_BLOOM_MIN_CAPACITY", 100000))
+
+# ─── Fiyat Cache'i ──────────────────────────────────────────────────────────
+# Hacim filtresi ve USD çevirisi aynı, arka planda yenilenen fiyatları kullanır.
+# PRICE_MAX_STALENESS_SECONDS'tan eski fiyatlar kullanılmaz (filtre sabit tabloya döner).
+PRICE_REFRESH_SECONDS       = float(os.getenv("PRICE_REFRESH_SECONDS", 60))  # 0 = kapalı
+PRICE_MAX_STALENESS_SECONDS = float(os.getenv("PRICE_MAX_STALENESS_SECONDS", 300))
+# Webhook yolundaki çeviri (PriceOracle): ORACLE_TTL_SECONDS'tan genç fiyat için ağa çıkılmaz
+PRICE_ORACLE_TTL_SECONDS    = float(os.getenv("PRICE_ORACLE_TTL_SECONDS", 90))
+# Kaynak cevap vermezse USD çevirisinde kabul edilen en eski fiyat. Bundan eskisi varsa
+# yatırım 1:1 çevrilmez; webhook kuyruğu işlemi sonra yeniden dener.
+PRICE_CONVERSION_MAX_STALENESS_SECONDS = float(os.getenv("PRICE_CONVERSION_MAX_STALENESS_SECONDS", 3600))
+PRICE_HTTP_TIMEOUT_SECONDS  = float(os.getenv("PRICE_HTTP_TIMEOUT_SECONDS", 5))
+PRICE_HTTP_MAX_CONNECTIONS  = int(os.getenv("PRICE_HTTP_MAX_CONNECTIONS", 10))
+# Fiyat kaynakları (öncelik sırasıyla): cryptocompare, coinbase, fake (ağsız, test)
+PRICE_PROVIDERS             = [p.strip().lower() for p in os.getenv("PRICE_PROVIDERS", "cryptocompare,coinbase").split(",") if p.strip()]
+# first = ilk geçerli cevap, median = PRICE_MEDIAN_QUORUM kaynağın medyanı
+# (median en az 3 kaynak ister; 2 fiyatın medyanı ortalamadır)
+PRICE_AGGREGATION           = os.getenv("PRICE_AGGREGATION", "first").lower()
+PRICE_MEDIAN_QUORUM         = int(os.getenv("PRICE_MEDIAN_QUORUM", 3))
+# Tek fiyat sorgusunun (tüm kaynaklar dahil) toplam süre sınırı
+PRICE_FETCH_DEADLINE_SECONDS = float(os.getenv("PRICE_FETCH_DEADLINE_SECONDS", 3))
+# Kaynak bu sürede cevap vermezse sıradaki de başlatılır (0 = kaynağın kendi p95'i)
+PRICE_HEDGE_DELAY_SECONDS   = float(os.getenv("PRICE_HEDGE_DELAY_SECONDS", 0))
+# Devre kesici: üst üste BREAKER_FAILURES hatadan sonra kaynak RESET_SECONDS boyunca atlanır
+PRICE_BREAKER_FAILURES      = int(os.getenv("PRICE_BREAKER_FAILURES", 5))
+PRICE_BREAKER_RESET_SECONDS = float(os.getenv("PRICE_BREAKER_RESET_SECONDS", 60))
+# Yatırımlar Cobo created_timestamp anındaki fiyatla çevrilir (yenileyicinin doldurduğu
+# dakikalık geçmişten). En yakın bar MAX_GAP_SECONDS'tan uzaksa güncel fiyat kullanılır.
+PRICE_HISTORY_RETENTION_MINUTES = int(os.getenv("PRICE_HISTORY_RETENTION_MINUTES", 10080))  # 7 gün
+PRICE_HISTORY_MAX_GAP_SECONDS   = float(os.getenv("PRICE_HISTORY_MAX_GAP_SECONDS", 300))
+
+# ─── Lead Cache ──────────────────────────────────────────────────────────────
+# get_lead_by_tp / get_lead_by_address read-through cache'i. TTL, başka process'lerin
+# (mt5_worker.py) yazımları için en fazla bayatlık süresidir (0 = kapalı).
+LEAD_CACHE_TTL_SECONDS = float(os.getenv("LEAD_CACHE_TTL_SECONDS", 30))
+LEAD_CACHE_MAX_ENTRIES = int(os.getenv("LEAD_CACHE_MAX_ENTRIES", 10000))
+
+# ─── Yatırım Defteri ─────────────────────────────────────────────────────────
+# İşlem kilidi + total_deposit/deposit_count artışı tek Mongo transaction'ında yazılır
+# (replica set gerekir — Atlas). Standalone sunucuda otomatik olarak sıralı yazıma düşer.
+LEDGER_USE_TRANSACTIONS = os.getenv("LEDGER_USE_TRANSACTIONS", "true").lower() == "true"
+
+# Analitik kopya: kredilenen yatırımlar ayrıca db.ledger_timeseries time-series koleksiyonuna
+# yazılır (MongoDB 5.0+). Kilit koleksiyonu unique index gerektirdiği için time-series olamaz.
+LEDGER_TIMESERIES_ENABLED        = os.getenv("LEDGER_TIMESERIES_ENABLED", "false").lower() == "true"
+LEDGER_TIMESERIES_RETENTION_DAYS = int(os.getenv("LEDGER_TIMESERIES_RETENTION_DAYS", 730))
+
+# Arşiv: ARCHIVE_AFTER_DAYS'ten eski kayıtların tamamı db.transactions_archive'a kopyalanır,
+# transactions'ta sadece kilit ve rapor alanları kalır (0 = kapalı).
+LEDGER_ARCHIVE_AFTER_DAYS       = int(os.getenv("LEDGER_ARCHIVE_AFTER_DAYS", 0))
+LEDGER_ARCHIVE_INTERVAL_SECONDS = float(os.getenv("LEDGER_ARCHIVE_INTERVAL_SECONDS", 3600))
+
+# ─── Cüzdan Adresleri (db.wallet_addresses) ──────────────────────────────────
+# Geçiş dönemi: wallet_addresses'te bulunamayan adresler eski lead.wallets dizisinde aranır.
+# python -m workers.wallet_address_migration ile backfill bittikten sonra false yapılabilir.
+WALLET_ADDRESSES_LEGACY_FALLBACK = os.getenv("WALLET_ADDRESSES_LEGACY_FALLBACK", "true").lower() == "true"
+
+# ─── İşlem Durum Makinesi ────────────────────────────────────────────────────
+# Ara durumlar (CONFIRMING vb.) ve tekrar eden terminal olaylar pipeline'a girmeden elenir.
+TX_STATE_CACHE_MAX_ENTRIES = int(os.getenv("TX_STATE_CACHE_MAX_ENTRIES", 50000))
+TX_STATE_RETENTION_DAYS    = int(os.getenv("TX_STATE_RETENTION_DAYS", 30))
+
+# ─── Backfill / Replay ───────────────────────────────────────────────────────
+# Kaçırılan webhook'lar için Cobo geçmişini tarayan işin paralel işlem limiti
+BACKFILL_CONCURRENCY = int(os.getenv("BACKFILL_CONCURRENCY", 8))
+
 # ─── Onramper ────────────────────────────────────────────────────────────────
 ONRAMPER_API_KEY       = os.getenv("ONRAMPER_API_KEY")
 ONRAMPER_SECRET_KEY    = os.getenv("ONRAMPER_SECRET_KEY")
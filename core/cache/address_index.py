@@ -0,0 +1,82 @@
+"""
+Bellek İçi Adres İndeksi
+========================
+Sistemdeki tüm müşteri cüzdan adreslerinin process genelindeki kümesi.
+İç transfer (sweep/consolidation) tespiti için O(1) üyelik sorgusu sağlar;
+eskiden her webhook'ta COBO koleksiyonu baştan sona taranıyordu.
+
+İki mod (ADDRESS_INDEX_MODE):
+- set   : Tüm adresler Python set'inde (kesin cevap)
+- bloom : Adresler mmap'lenmiş Bloom filtresinde (core/filter/bloom_filter.py);
+          "hayır" kesin, "belki" cevabı Mongo'da doğrulanır. Milyonlarca adreste
+          worker başına bellek MB seviyesinde kalır.
+
+Besleme:
+- Açılışta bir kez tam yükleme (servisler/db_service.py → load_address_index)
+- save_wallet_to_lead ve wallets.addresses.created olaylarında artımlı ekleme
+  (bloom modunda son eklenenler küçük bir set'te tutulur)
+- Opsiyonel: Mongo change stream veya periyodik yeniden yükleme
+  (workers/address_index_watcher.py) — diğer process'lerin eklediği adresler için
+
+Adresler sadece eklenir; silinen bir cüzdanın adresi "bizim" sayılmaya devam eder
+(iç transferi yanlışlıkla yatırım saymaktansa güvenli taraf).
+"""
+
+
+class AddressIndex:
+    """Yüklenip yüklenmediğini bilen adres kümesi (opsiyonel Bloom filtresi ile)."""
+
+    __slots__ = ("_addresses", "_bloom", "loaded")
+
+    def __init__(self):
+        self._addresses: set = set()
+        self._bloom = None
+        self.loaded = False
+
+    def load(self, addresses: set):
+        """
+        Tam yüklemeden gelen kümeyi birleştirir. Yükleme sorgusu sürerken
+        artımlı eklenen adresler kaybolmasın diye mevcut küme korunur.
+        """
+        self._addresses = set(addresses) | self._addresses
+        self.loaded = True
+
+    def load_bloom(self, bloom):
+        """Bloom modunda yeni filtreyi yerleştirir; artımlı eklenenler korunur."""
+        previous, self._bloom = self._bloom, bloom
+        self.loaded = True
+        if previous is not None:
+            previous.close()
+
+    def add(self, address: str):
+        if address:
+            self._addresses.add(address)
+
+    def add_many(self, addresses):
+        for address in addresses:
+            self.add(address)
+
+    def lookup(self, address: str):
+        """
+        Returns:
+            True  : Kesin bizim adresimiz
+            False : Kesin değil
+            None  : Bloom "belki" dedi — Mongo'da doğrulanmalı
+        """
+        if address in self._addresses:
+            return True
+        if self._bloom is not None and address in self._bloom:
+            return None
+        return False
+
+    def __contains__(self, address) -> bool:
+        return self.lookup(address) is not False
+
+    def __len__(self) -> int:
+        if self._bloom is not None:
+            return self._bloom.count + len(self._addresses)
+        return len(self._addresses)
+
+
+# Uygulama genelinde tek instance
+address_index = AddressIndex()
@@ -0,0 +1,120 @@
+"""
+Lead Read-Through Cache
+=======================
+get_lead_by_tp her verify_tp, create_wallet, IBAN ve Onramper isteğinde tam lead
+dokümanını (wallets dizisi dahil) Mongo'dan çekiyordu. Bu cache:
+
+- tp_number → lead        (LRU + TTL, LEAD_CACHE_TTL_SECONDS)
+- address   → tp_number   (cüzdan sahibi değişmez; aynı LRU sınırı)
+
+Aynı tp_number için eşzamanlı cache miss'leri TEK Mongo sorgusunda birleştirilir
+(single-flight). None sonuçlar cache'lenmez (verify_tp'nin MT5 senkronizasyon
+fallback'i çalışmaya devam etsin).
+
+Invalidation:
+- Aynı process: save_lead, save_wallet_to_lead, update_financial_stats,
+  record_deposit vb. yazımlar invalidate() çağırır (servisler/db_service.py).
+- Diğer process'ler (mt5_worker.py): ADDRESS_INDEX_CHANGE_STREAM açıksa COBO
+  change stream'i ilgili lead'i düşürür (workers/address_index_watcher.py);
+  kapalıysa bayatlık en fazla TTL kadardır.
+
+Yükleme sürerken gelen invalidation, yüklenen (muhtemelen eski) değerin
+cache'e yazılmasını engeller.
+
+DİKKAT: Dönen dict paylaşılır; çağıranlar değiştirmemelidir.
+
+Metrikler (/metrics): lead_cache_* gauge'ları ve lead_cache_age histogramı
+(cache'ten dönen kaydın yaşı = bayatlık).
+"""
+
+import asyncio
+import time
+
+from core.cache.lru_ttl_cache import LruTtlCache
+from core.metrics.latency import pipeline_metrics
+from config.settings import LEAD_CACHE_MAX_ENTRIES, LEAD_CACHE_TTL_SECONDS
+
+
+class LeadCache:
+    """tp_number ve adres anahtarlı, single-flight read-through lead cache'i."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.enabled = ttl_seconds > 0
+        self._leads = LruTtlCache(max_size=max_entries, ttl_seconds=ttl_seconds)  # tp → (loaded_at, lead)
+        self._owners = LruTtlCache(max_size=max_entries, ttl_seconds=ttl_seconds)  # address → tp
+        self._inflight: dict = {}  # tp → Task
+        # Her invalidation'da artar; adres sorgusundan gelen lead'in taze olup olmadığı buna bakılarak anlaşılır
+        self.generation = 0
+        self.invalidations = 0
+
+    async def get(self, tp_number, loader):
+        """Cache'te varsa döner; yoksa loader() ile (tek sorguda) yükler."""
+        if not self.enabled:
+            return await loader()
+        key = str(tp_number)
+        entry = self._leads.get(key)
+        if entry is not None:
+            loaded_at, lead = entry
+            pipeline_metrics.observe("lead_cache_age", time.monotonic() - loaded_at, event_type=None, token=None)
+            return lead
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(loader())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, key=key: self._on_loaded(key, done))
+        # Bekleyen istek iptal edilse bile yükleme diğerleri için sürer
+        return await asyncio.shield(task)
+
+    def _on_loaded(self, key: str, task):
+        if self._inflight.get(key) is not task:
+            return  # Yükleme sırasında invalidate edildi
+        del self._inflight[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        lead = task.result()
+        if lead is not None:
+            self._leads.set(key, (time.monotonic(), lead))
+
+    def owner_of(self, address: str):
+        """Adresin tp_number'ı (biliniyorsa)."""
+        return self._owners.get(address) if self.enabled else None
+
+    def remember(self, address: str, lead: dict, generation: int):
+        """
+        Adres sorgusundan gelen lead'i kaydeder. generation, sorgudan ÖNCE okunan
+        değerdir; arada bir invalidation olduysa lead cache'lenmez (sadece sahiplik).
+        """
+        if not self.enabled or not lead:
+            return
+        key = str(lead["tp_number"])
+        self._owners.set(address, key)
+        if generation == self.generation and key not in self._inflight:
+            self._leads.set(key, (time.monotonic(), lead))
+
+    def invalidate(self, tp_number):
+        if tp_number is None:
+            return
+        key = str(tp_number)
+        self._leads.pop(key)
+        self._inflight.pop(key, None)
+        self.generation += 1
+        self.invalidations += 1
+
+    def invalidate_many(self, tp_numbers):
+        for tp_number in tp_numbers:
+            self.invalidate(tp_number)
+
+    def stats(self) -> dict:
+        return dict(
+            self._leads.stats(),
+            owner_hit_rate=self._owners.stats()["hit_rate"],
+            invalidations=self.invalidations,
+        )
+
+
+# Uygulama genelinde tek instance
+lead_cache = LeadCache(max_entries=LEAD_CACHE_MAX_ENTRIES, ttl_seconds=LEAD_CACHE_TTL_SECONDS)
+
+for _field in ("size", "hit_rate", "hits", "misses", "evictions", "owner_hit_rate", "invalidations"):
+    pipeline_metrics.register_gauge(f"lead_cache_{_field}", lambda field=_field: lead_cache.stats()[field])
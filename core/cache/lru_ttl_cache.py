@@ -0,0 +1,79 @@
+"""
+LRU + TTL Bellek İçi Cache
+==========================
+Boyutu sınırlı (LRU tahliye) ve süreli (TTL) basit bir anahtar/değer deposu.
+Tek event loop içinde kullanılmak üzere tasarlanmıştır; lock kullanmaz.
+
+Kullanım:
+    cache = LruTtlCache(max_size=10_000, ttl_seconds=3600)
+    cache.set("key", value)
+    cache.get("key")  # süresi dolduysa None
+"""
+
+import time
+from collections import OrderedDict
+
+
+class LruTtlCache:
+    """OrderedDict tabanlı, boyut sınırlı ve süreli cache."""
+
+    __slots__ = ("max_size", "ttl_seconds", "_data", "hits", "misses", "evictions")
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max(1, max_size)
+        self.ttl_seconds = ttl_seconds
+        self._data: OrderedDict = OrderedDict()  # key -> (expires_at, value)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Değeri döner ve anahtarı en yeni konuma taşır. Yoksa/süresi dolduysa default."""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl_seconds: float = None):
+        """Değeri yazar; kapasite aşılırsa en eski kaydı tahliye eder."""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key, default=None):
+        """Anahtarı siler (invalidation)."""
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        self._data.clear()
+
+    def __contains__(self, key) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[0] >= time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """Hit/miss/eviction sayaçlarını döner (metrics için)."""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
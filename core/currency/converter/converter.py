@@ -1,57 +1,76 @@
-import requests
+from core.currency.price_history import price_history
+from core.currency.price_oracle import price_oracle
+from core.metrics.latency import pipeline_metrics
+from core.tokens.token_registry import resolve_token
+from config.settings import PRICE_HISTORY_MAX_GAP_SECONDS
 
-def coin_parser(symbol, amount):
-    """
-    CryptoCompare API kullanarak kripto parayı USD'ye çevirir.
-    symbol: Cobo'dan gelen asset_id (BTC, TRON, ETH, USDT vb.)
-    amount: Gelen miktar
-    """
-    # CryptoCompare API kullanarak kripto parayı USD'ye çevirir.
-    # 1. Verileri temizle (Örn: "1.5e-06" gibi bilimsel sayıları anlar)
+def _normalize(symbol, amount):
+    # Verileri temizle (Örn: "1.5e-06" gibi bilimsel sayıları anlar)
     symbol = str(symbol).upper().strip()
     try:
         amount = float(amount)
     except Exception:
         amount = 0.0
+    # Gerçek coin adını token registry'den al (Örn: "ERC20_ETH" → "ETH", "TRON" → "TRX")
+    return symbol, amount, resolve_token(symbol)
+
+
+async def _history_quote(asset, created_timestamp):
+    """
+    İşlem anındaki fiyat: (fiyat, işlem zamanına uzaklık saniye) veya None.
+    created_timestamp: Cobo'nun ms cinsinden işlem zamanı. Bellekte bar yoksa
+    kalıcı barlara (db.price_bars) bakılır.
+    """
+    if not created_timestamp:
+        return None
+    try:
+        at = float(created_timestamp) / 1000
+    except (TypeError, ValueError):
+        return None
+    quote = await price_history.find(asset, at, PRICE_HISTORY_MAX_GAP_SECONDS)
+    pipeline_metrics.increment("price_history_hits" if quote is not None else "price_history_misses")
+    return quote
+
 
-    # 2. Gerçek coin adını ayıkla (Örn: "ERC20_ETH" geldiğinde "ETH"yi çeker)
-    clean_symbol = symbol
-    for coin in ["USDT", "USDC", "TRX", "TRON", "ETH", "BTC", "LTC", "SOL", "MATIC", "BNB", "XRP", "ADA", "DOT"]:
-        if coin in symbol:
-            clean_symbol = coin
-            break
-
-    # CryptoCompare TRON'u TRX olarak tanır
-    if clean_symbol == "TRON":
-        clean_symbol = "TRX"
-        
-    usd_amount = amount 
-    
-    # 3. Zaten Stabil coin ise API'yi yorma, 1:1 geçir
-    if clean_symbol in ["USDT", "USDC"]:
-        usd_amount = amount
-    else:
-        try:
-            # CryptoCompare Single Price API Endpoint
-            url = f"https://min-api.cryptocompare.com/data/price?fsym={clean_symbol}&tsyms=USD"
-            
-            response = requests.get(url, timeout=5)
-            response.raise_for_status() 
-            
-            data = response.json()
-            
-            if "USD" in data:
-                price = float(data['USD'])
-                usd_amount = amount * price
-            else:
-                print(f"Hata: {clean_symbol} için USD fiyatı bulunamadı.")
-            
-        except Exception as e:
-            print(f"Kur çekilirken hata oluştu ({symbol}): {e}")
-            usd_amount = amount 
-
-    # 3. İkili Return formatı (Senin istediğin liste yapısı)
+def _conversion_result(symbol, amount, quote):
+    """
+    İkili Return formatı. quote: (fiyat, yaş saniye) — stablecoin için None (1:1).
+    USD kaydındaki rate / price_age_seconds deftere ve Telegram onayına taşınır.
+    İşlem anı fiyatında price_age_seconds, fiyatın işlem zamanına uzaklığıdır.
+    """
+    rate, age = quote if quote is not None else (1.0, None)
     return [
         {"currency": symbol, "amount": amount},
-        {"currency": "USD", "amount": round(usd_amount, 2)}
-    ]
\ No newline at end of file
+        {
+            "currency": "USD",
+            "amount": round(amount * rate, 2),
+            "rate": rate,
+            "price_age_seconds": None if age is None else round(age, 1),
+        }
+    ]
+
+
+async def convert_to_usd(symbol, amount, created_timestamp=None):
+    """
+    Kripto parayı USD'ye çevirir.
+    symbol: Cobo'dan gelen asset_id (BTC, TRON, ETH, USDT vb.)
+    amount: Gelen miktar
+    created_timestamp: Cobo işlem zamanı (ms). Dakikalık fiyat geçmişinde o ana yakın
+        bar varsa işlem anındaki fiyat kullanılır (replay'de aynı sonuç).
+
+    Aksi halde fiyat PriceOracle'dan gelir: paylaşılan fiyat cache'i (hacim filtresiyle
+    aynı değer), havuzlu bağlantı, eşzamanlı isteklerin birleştirilmesi, hedge'li çoklu
+    kaynak ve sınırlı bayatlıkta fallback. Stablecoin'ler 1:1 geçer.
+    Kabul edilebilir fiyat yoksa RuntimeError (1 ETH asla 1 USD sayılmaz).
+    """
+    symbol, amount, token = _normalize(symbol, amount)
+    if token and token.stablecoin:
+        return _conversion_result(symbol, amount, None)
+
+    clean_symbol = token.asset if token else symbol
+    quote = await _history_quote(clean_symbol, created_timestamp)
+    if quote is None:
+        quote = await price_oracle.get_quote(clean_symbol)
+    if quote is None:
+        raise RuntimeError(f"{clean_symbol} için güncel USD fiyatı yok")
+    return _conversion_result(symbol, amount, quote)
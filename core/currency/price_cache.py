@@ -0,0 +1,93 @@
+"""
+Paylaşılan Fiyat Cache'i
+========================
+Hacim filtresi (BaseVolumeFilter) ve USD çevirisi (convert_to_usd) aynı fiyatı
+kullansın diye tek, process genelinde fiyat tablosu:
+
+    kanonik varlık ("ETH", "TRX"...) → (USD fiyatı, çekilme zamanı)
+
+- Arka planda workers/price_refresher.py ile PRICE_REFRESH_SECONDS'ta bir, tüm
+  izinli varlıklar için tek sorguda yenilenir
+- Okuma kilitsizdir: update() yeni bir dict kurup referansı tek atamayla değiştirir;
+  okuyucular (PriceOracle, BaseVolumeFilter, admin dashboard) yarım güncelleme görmez
+- PRICE_MAX_STALENESS_SECONDS'tan eski fiyat "yok" sayılır; çağıran kendi
+  fallback'ine döner (filtre → sabit RATES tablosu, PriceOracle → fiyat kaynakları).
+  USD çevirisi, kaynak cevap vermezse PRICE_CONVERSION_MAX_STALENESS_SECONDS'a kadar
+  eski fiyatı kabul eder (quote(asset, max_staleness)); daha eskiyse işlem yeniden denenir.
+- Son snapshot Mongo'ya yazılır ve açılışta geri yüklenir (workers/price_refresher.py)
+
+Stablecoin'ler (token registry'de stablecoin=True) burada tutulmaz, 1:1'dir.
+"""
+
+import time
+
+from config.settings import PRICE_MAX_STALENESS_SECONDS
+
+
+class PriceCache:
+    """Atomik olarak değiştirilen, yaşı sınırlı USD fiyat tablosu."""
+
+    __slots__ = ("max_staleness_seconds", "_prices")
+
+    def __init__(self, max_staleness_seconds: float):
+        self.max_staleness_seconds = max_staleness_seconds
+        self._prices: dict = {}  # asset → (usd, fetched_at epoch)
+
+    def update(self, prices: dict, fetched_at: float = None):
+        """Yeni fiyatları ekler; geçersiz (<= 0) değerler yok sayılır."""
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        merged = dict(self._prices)
+        for asset, price in prices.items():
+            if price and price > 0:
+                merged[asset] = (float(price), fetched_at)
+        self._prices = merged
+
+    def get(self, asset: str, max_staleness: float = None):
+        """Taze fiyat veya None (hiç yok / bayat). max_staleness verilmezse varsayılan sınır."""
+        quote = self.quote(asset, max_staleness)
+        return None if quote is None else quote[0]
+
+    def quote(self, asset: str, max_staleness: float = None):
+        """(fiyat, yaş saniye) veya None — yaş max_staleness'ı (varsayılan sınır) aşıyorsa None."""
+        entry = self._prices.get(asset)
+        if entry is None:
+            return None
+        limit = self.max_staleness_seconds if max_staleness is None else max_staleness
+        age = time.time() - entry[1]
+        return None if age > limit else (entry[0], age)
+
+    def age(self, asset: str):
+        """Fiyatın yaşı (saniye) veya None."""
+        entry = self._prices.get(asset)
+        return None if entry is None else time.time() - entry[1]
+
+    def entries(self) -> dict:
+        """Kalıcı kayıt için ham tablo: {asset: (usd, fetched_at epoch)}."""
+        return dict(self._prices)
+
+    def restore(self, entries: dict):
+        """Kalıcı snapshot'tan yükler; cache'te daha yeni olan fiyatların üstüne yazmaz."""
+        merged = dict(self._prices)
+        for asset, (price, fetched_at) in entries.items():
+            current = merged.get(asset)
+            if price and price > 0 and (current is None or current[1] < fetched_at):
+                merged[asset] = (float(price), fetched_at)
+        self._prices = merged
+
+    def max_age(self):
+        """En eski fiyatın yaşı (saniye) veya None (cache boş)."""
+        prices = self._prices
+        if not prices:
+            return None
+        return time.time() - min(fetched_at for _, fetched_at in prices.values())
+
+    def __len__(self) -> int:
+        return len(self._prices)
+
+    def snapshot(self) -> dict:
+        return {asset: {"usd": price, "age_seconds": round(time.time() - fetched_at, 1)}
+                for asset, (price, fetched_at) in self._prices.items()}
+
+
+# Uygulama genelinde tek instance
+price_cache = PriceCache(max_staleness_seconds=PRICE_MAX_STALENESS_SECONDS)
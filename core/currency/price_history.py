@@ -0,0 +1,115 @@
+"""
+Dakikalık Fiyat Geçmişi
+=======================
+Yatırımın USD karşılığı, çevirinin yapıldığı anın değil işlemin Cobo'daki
+created_timestamp'inin fiyatıyla hesaplansın diye process içi fiyat geçmişi.
+Kuyruk birikmişken veya replay/backfill sırasında aynı işlem hep aynı USD tutarını alır,
+ek API çağrısı yapılmaz.
+
+Varlık başına iki sıralı dizi (array modülü, kayıt başına 16 byte):
+
+    dakikalar: array('q')  epoch // 60
+    fiyatlar : array('d')  o dakikada görülen son USD fiyatı
+
+- Arka plan yenileyici (workers/price_refresher.py) her turda record() ile doldurur;
+  aynı dakikadaki ikinci fiyat son barın üstüne yazılır (kapanış fiyatı)
+- lookup() bisect ile O(log n): işlem zamanına en yakın bar, en fazla
+  PRICE_HISTORY_MAX_GAP_SECONDS uzaklıkta ise kullanılır
+- PRICE_HISTORY_RETENTION_MINUTES'tan eski barlar baştan toplu silinir
+  (varsayılan 7 gün ≈ varlık başına 160 KB)
+
+Barlar Mongo'ya da yazılır (db.price_bars, TTL = saklama süresi): açılışta saklama
+penceresi geri yüklenir, bellekte bulunamayan bar için find() kalıcı barlara bakar
+(store'u workers/price_refresher.py bağlar). Böylece yeniden başlatma sonrası da
+replay/backfill aynı USD tutarını alır. Barı olmayan zamanlar için çeviri güncel fiyata döner.
+"""
+
+import logging
+import time
+from array import array
+from bisect import bisect_left
+
+from config.settings import PRICE_HISTORY_RETENTION_MINUTES
+
+logger = logging.getLogger(__name__)
+
+
+class PriceHistory:
+    """Varlık başına dizi tabanlı, dakika çözünürlüklü USD fiyat geçmişi."""
+
+    __slots__ = ("retention_minutes", "store", "_series")
+
+    def __init__(self, retention_minutes: int):
+        self.retention_minutes = max(1, retention_minutes)
+        # Kalıcı bar araması: async (asset, at, max_gap_seconds) -> (fiyat, uzaklık) | None
+        self.store = None
+        self._series: dict = {}  # asset → (array('q') dakikalar, array('d') fiyatlar)
+
+    def record(self, prices: dict, at: float = None):
+        """Fiyatları `at` (epoch saniye) dakikasına yazar; geçersiz (<= 0) değerler yok sayılır."""
+        minute = int((time.time() if at is None else at) // 60)
+        for asset, price in prices.items():
+            if not price or price <= 0:
+                continue
+            series = self._series.get(asset)
+            if series is None:
+                series = self._series[asset] = (array("q"), array("d"))
+            minutes, values = series
+            if minutes and minutes[-1] == minute:
+                values[-1] = float(price)
+            elif not minutes or minutes[-1] < minute:
+                minutes.append(minute)
+                values.append(float(price))
+                self._trim(minutes, values)
+            # Daha eski dakika (ör. snapshot'ın yenileyiciden sonra yüklenmesi) sıralamayı
+            # bozmasın diye yok sayılır
+
+    def _trim(self, minutes: array, values: array):
+        # Her append'te değil, saklama süresi %10 aşılınca toplu silinir
+        excess = len(minutes) - self.retention_minutes
+        if excess > self.retention_minutes // 10:
+            del minutes[:excess]
+            del values[:excess]
+
+    def lookup(self, asset: str, at: float, max_gap_seconds: float):
+        """
+        `at` (epoch saniye) anına en yakın bar: (fiyat, işlem zamanına uzaklık saniye).
+        Bar yoksa veya en yakını max_gap_seconds'tan uzaksa None.
+        """
+        series = self._series.get(asset)
+        if series is None:
+            return None
+        minutes, values = series
+        # Komşu iki bar: işlem anından önceki son ve sonraki ilk
+        index = bisect_left(minutes, at / 60)
+        best = None
+        for candidate in (index - 1, index):
+            if 0 <= candidate < len(minutes):
+                gap = abs(at - minutes[candidate] * 60)
+                if best is None or gap < best[1]:
+                    best = (values[candidate], gap)
+        if best is None or best[1] > max_gap_seconds:
+            return None
+        return best
+
+    async def find(self, asset: str, at: float, max_gap_seconds: float):
+        """lookup(); bellekte uygun bar yoksa kalıcı barlara (store) bakar. Store hatası None döner."""
+        quote = self.lookup(asset, at, max_gap_seconds)
+        if quote is not None or self.store is None:
+            return quote
+        try:
+            return await self.store(asset, at, max_gap_seconds)
+        except Exception as e:
+            logger.error(f"❌ Kalıcı fiyat barı okunamadı ({asset}): {e}")
+            return None
+
+    def bars(self) -> int:
+        """Tüm varlıklardaki toplam bar sayısı."""
+        return sum(len(minutes) for minutes, _ in self._series.values())
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+
+# Uygulama genelinde tek instance
+price_history = PriceHistory(retention_minutes=PRICE_HISTORY_RETENTION_MINUTES)
@@ -0,0 +1,300 @@
+"""
+Async Fiyat Servisi (Price Oracle)
+==================================
+Webhook yolundaki USD çevirisi eskiden her stabil olmayan yatırımda executor'da
+bloklayan bir requests.get yapıyordu (her seferinde yeni TCP/TLS bağlantısı, cache yok).
+Aynı saniyede gelen 10 ETH yatırımı 10 özdeş HTTP çağrısı demekti.
+
+- Kalıcı httpx.AsyncClient: bağlantı havuzu (keep-alive), event loop bloklanmaz
+- Varlık başına TTL: paylaşılan fiyat cache'indeki (core/currency/price_cache.py)
+  fiyat PRICE_ORACLE_TTL_SECONDS'tan gençse ağa çıkılmaz. Arka plan yenileyici
+  (workers/price_refresher.py) aynı cache'i tüm varlıklar için TEK sorguda
+  beslediği için çoğu çeviri ağsızdır.
+- Single-flight: Aynı varlık için eşzamanlı cache miss'leri TEK sorguda birleşir
+- Çekim başarısızsa PRICE_CONVERSION_MAX_STALENESS_SECONDS'a kadar eski fiyat
+  kullanılır (yaşı çağırana döner: defter kaydı ve Telegram onayı); daha eskisi
+  yoksa fiyat "yok"tur — çeviri 1:1 yapılmaz, işlem yeniden denenir
+
+Çoklu kaynak (core/currency/price_providers.py, PRICE_PROVIDERS öncelik sırasıyla):
+- Her sorgu PRICE_FETCH_DEADLINE_SECONDS içinde biter; yavaş kaynak beklenmez
+- Hedge: Kaynak kendi p95 gecikmesi (veya PRICE_HEDGE_DELAY_SECONDS) içinde cevap
+  vermezse ya da hata verirse sıradaki kaynak da başlatılır, ilk geçerli cevap alınır
+- PRICE_AGGREGATION=median: PRICE_MEDIAN_QUORUM (en az 3) kaynak paralel sorulur ve
+  varlık başına medyan alınır; tek kaynağın hatalı fiyatı sonucu bozmaz. Bir varlık için
+  3'ten az cevap gelirse (kaynak hatası/devre kesici) ortalama alınmaz, öncelik
+  sırasındaki ilk cevap kullanılır. En az 3 kaynak tanımlı olmalıdır.
+- Devre kesicisi açık kaynak hiç sorgulanmaz
+
+Metrikler (/metrics): price_oracle_* ve price_provider_<ad>_open gauge'ları,
+price_fetch ve price_provider_<ad> histogramları, price_hedges ve
+price_provider_failures_<ad> sayaçları.
+"""
+
+import asyncio
+import logging
+import statistics
+
+import httpx
+
+from core.currency.price_cache import price_cache
+from core.currency.price_providers import build_providers
+from core.metrics.latency import pipeline_metrics
+from config.settings import (
+    PRICE_ORACLE_TTL_SECONDS,
+    PRICE_CONVERSION_MAX_STALENESS_SECONDS,
+    PRICE_HTTP_TIMEOUT_SECONDS,
+    PRICE_HTTP_MAX_CONNECTIONS,
+    PRICE_PROVIDERS,
+    PRICE_AGGREGATION,
+    PRICE_MEDIAN_QUORUM,
+    PRICE_FETCH_DEADLINE_SECONDS,
+    PRICE_HEDGE_DELAY_SECONDS,
+    PRICE_BREAKER_FAILURES,
+    PRICE_BREAKER_RESET_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Medyanın tek hatalı kaynağa dayanıklı olması için gereken en az cevap (2'nin medyanı ortalamadır)
+MEDIAN_MIN_QUORUM = 3
+
+# Hedge süresi: kaynağın bu kadar ölçümü olana kadar varsayılan, sonra kendi p95'i
+HEDGE_MIN_SAMPLES = 20
+HEDGE_DEFAULT_DELAY_SECONDS = 0.5
+HEDGE_MIN_DELAY_SECONDS = 0.05
+
+
+class PriceOracle:
+    """Havuzlu async HTTP istemcisi, TTL, single-flight ve hedged çoklu kaynak ile USD fiyat servisi."""
+
+    def __init__(self, providers: list, ttl_seconds: float, fallback_max_staleness_seconds: float,
+                 timeout_seconds: float, max_connections: int, deadline_seconds: float,
+                 aggregation: str = "first", median_quorum: int = MEDIAN_MIN_QUORUM, hedge_delay_seconds: float = 0):
+        self.providers = providers
+        self.ttl_seconds = ttl_seconds
+        self.fallback_max_staleness_seconds = fallback_max_staleness_seconds
+        self.timeout_seconds = timeout_seconds
+        self.max_connections = max_connections
+        self.deadline_seconds = deadline_seconds
+        if aggregation not in ("first", "median"):
+            raise ValueError(f"Bilinmeyen PRICE_AGGREGATION: {aggregation}")
+        if aggregation == "median" and len(providers) < MEDIAN_MIN_QUORUM:
+            raise ValueError(f"PRICE_AGGREGATION=median en az {MEDIAN_MIN_QUORUM} fiyat kaynağı gerektirir")
+        self.aggregation = aggregation
+        self.median_quorum = max(MEDIAN_MIN_QUORUM, median_quorum)
+        self.hedge_delay_seconds = hedge_delay_seconds
+        self._client = None
+        self._inflight: dict = {}  # asset → Task
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.stale_fallbacks = 0
+        self.hedges = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # İlk kullanımda oluşturulur (çalışan event loop'a bağlanır)
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout_seconds,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._client
+
+    async def get_quote(self, asset: str):
+        """
+        Varlığın USD fiyatı ve yaşı: (fiyat, yaş saniye).
+        Kaynak cevap vermezse PRICE_CONVERSION_MAX_STALENESS_SECONDS'a kadar eski fiyat
+        döner; o da yoksa None.
+        """
+        quote = price_cache.quote(asset, self.ttl_seconds)
+        if quote is not None:
+            self.hits += 1
+            return quote
+
+        self.misses += 1
+        task = self._inflight.get(asset)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(asset))
+            self._inflight[asset] = task
+            task.add_done_callback(lambda done, asset=asset: self._inflight.pop(asset, None))
+        else:
+            self.coalesced += 1
+
+        try:
+            # Bekleyen istek iptal edilse bile çekim diğerleri için sürer
+            price = await asyncio.shield(task)
+        except Exception as e:
+            logger.warning(f"⚠️ Fiyat alınamadı ({asset}): {e}")
+            price = None
+        if price is not None:
+            return price, 0.0
+        quote = price_cache.quote(asset, self.fallback_max_staleness_seconds)
+        if quote is not None:
+            self.stale_fallbacks += 1
+        return quote
+
+    async def _fetch(self, asset: str):
+        prices = await self._fetch_quotes([asset])
+        if asset not in prices:
+            logger.warning(f"⚠️ {asset} için USD fiyatı bulunamadı")
+            return None
+        price_cache.update({asset: prices[asset]})
+        return prices[asset]
+
+    async def refresh(self, assets) -> dict:
+        """
+        Verilen varlıkları TTL'e bakmadan tek sorguda çeker ve cache'e tek seferde yazar.
+        Returns: {asset: fiyat} (fiyatı dönenler). Hiçbir kaynak cevap vermezse hata fırlatır.
+        """
+        prices = await self._fetch_quotes(list(assets))
+        price_cache.update(prices)
+        return prices
+
+    def _hedge_delay(self, provider) -> float:
+        if self.hedge_delay_seconds > 0:
+            return self.hedge_delay_seconds
+        if provider.latency.count < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY_SECONDS
+        return max(HEDGE_MIN_DELAY_SECONDS, provider.latency.percentile(0.95))
+
+    async def _fetch_quotes(self, assets: list) -> dict:
+        """
+        Kaynakları öncelik sırasıyla, hedge ederek sorgular; deadline'a kadar gelen
+        geçerli cevapları birleştirir. Hiç cevap yoksa hata fırlatır.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + self.deadline_seconds
+        # allow() tembel çağrılır: half-open kaynağın deneme hakkı sadece başlatılınca harcanır
+        candidates = (provider for provider in self.providers if provider.breaker.allow())
+        needed = 1 if self.aggregation == "first" else min(self.median_quorum, len(self.providers))
+        pending = {}  # Task → (provider, başlangıç)
+        results = []  # [(öncelik sırası, {asset: fiyat})]
+        failures = []
+        next_hedge_at = float("inf")
+
+        def launch() -> bool:
+            nonlocal next_hedge_at
+            provider = next(candidates, None)
+            if provider is None:
+                next_hedge_at = float("inf")
+                return False
+            now = loop.time()
+            pending[asyncio.ensure_future(provider.fetch(self._get_client(), assets))] = (provider, now)
+            next_hedge_at = now + self._hedge_delay(provider)
+            return True
+
+        for _ in range(needed):
+            if not launch():
+                break
+        try:
+            while pending and len(results) < needed:
+                now = loop.time()
+                if now >= deadline:
+                    break
+                done, _ = await asyncio.wait(
+                    pending, timeout=min(deadline, next_hedge_at) - now, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # Hedge süresi doldu: sıradaki kaynağı da başlat
+                    if loop.time() < deadline and launch():
+                        self.hedges += 1
+                        pipeline_metrics.increment("price_hedges")
+                    continue
+                for task in done:
+                    provider, launched_at = pending.pop(task)
+                    elapsed = loop.time() - launched_at
+                    try:
+                        prices = task.result()
+                        if not prices:
+                            raise ValueError("boş cevap")
+                    except Exception as e:
+                        provider.breaker.record_failure()
+                        pipeline_metrics.increment(f"price_provider_failures_{provider.name}")
+                        failures.append(f"{provider.name}: {e}")
+                        # Hata veren kaynağın yerine sıradaki beklemeden başlatılır
+                        if len(pending) + len(results) < needed:
+                            launch()
+                        continue
+                    provider.breaker.record_success()
+                    provider.latency.observe(elapsed)
+                    pipeline_metrics.observe(f"price_provider_{provider.name}", elapsed, event_type=None, token=None)
+                    results.append((self.providers.index(provider), prices))
+        finally:
+            timed_out = loop.time() >= deadline
+            for task, (provider, _) in pending.items():
+                task.cancel()
+                if timed_out:
+                    provider.breaker.record_failure()
+                    pipeline_metrics.increment(f"price_provider_failures_{provider.name}")
+                    failures.append(f"{provider.name}: deadline")
+                else:
+                    # Yeterli cevap geldi; yarıda kesilen kaynak hatalı sayılmaz
+                    provider.breaker.abandon()
+            pipeline_metrics.observe("price_fetch", loop.time() - started, event_type=None, token=None)
+
+        if not results:
+            self.errors += 1
+            raise RuntimeError(f"Fiyat kaynağı cevap vermedi ({'; '.join(failures) or 'tüm devre kesiciler açık'})")
+        if failures:
+            logger.warning(f"⚠️ Fiyat kaynağı hataları: {'; '.join(failures)}")
+        return self._aggregate(results)
+
+    def _aggregate(self, results: list) -> dict:
+        # Öncelik sırasına göre: ilk kaynakta olmayan varlık sonrakilerden tamamlanır
+        ordered = [prices for _, prices in sorted(results, key=lambda result: result[0])]
+        merged = {}
+        for prices in reversed(ordered):
+            merged.update(prices)
+        if self.aggregation != "median":
+            return merged
+        for asset in merged:
+            quotes = [prices[asset] for prices in ordered if asset in prices]
+            # İki cevabın medyanı ortalamadır (hatalı fiyat sonucu yarı yarıya kaydırır)
+            if len(quotes) >= MEDIAN_MIN_QUORUM:
+                merged[asset] = statistics.median(quotes)
+        return merged
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "stale_fallbacks": self.stale_fallbacks,
+            "hedges": self.hedges,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Uygulama genelinde tek instance
+price_oracle = PriceOracle(
+    providers=build_providers(PRICE_PROVIDERS, PRICE_BREAKER_FAILURES, PRICE_BREAKER_RESET_SECONDS),
+    ttl_seconds=PRICE_ORACLE_TTL_SECONDS,
+    fallback_max_staleness_seconds=PRICE_CONVERSION_MAX_STALENESS_SECONDS,
+    timeout_seconds=PRICE_HTTP_TIMEOUT_SECONDS,
+    max_connections=PRICE_HTTP_MAX_CONNECTIONS,
+    deadline_seconds=PRICE_FETCH_DEADLINE_SECONDS,
+    aggregation=PRICE_AGGREGATION,
+    median_quorum=PRICE_MEDIAN_QUORUM,
+    hedge_delay_seconds=PRICE_HEDGE_DELAY_SECONDS,
+)
+
+for _field in ("hits", "misses", "coalesced", "errors", "stale_fallbacks", "hedges", "hit_rate"):
+    pipeline_metrics.register_gauge(f"price_oracle_{_field}", lambda field=_field: price_oracle.stats()[field])
+
+for _provider in price_oracle.providers:
+    pipeline_metrics.register_gauge(
+        f"price_provider_{_provider.name}_open",
+        lambda provider=_provider: 0 if provider.breaker.state == "closed" else 1,
+    )
@@ -0,0 +1,174 @@
+"""
+Fiyat Kaynakları (Providers)
+============================
+PriceOracle'ın (core/currency/price_oracle.py) sorguladığı, takılıp çıkarılabilir
+USD fiyat kaynakları. Her kaynak tek istekte birden fazla varlık döner:
+
+    await provider.fetch(client, ["BTC", "ETH"]) → {"BTC": 67158.1, "ETH": 1990.2}
+
+Dönmeyen varlık sonuçta yer almaz; istek tamamen başarısızsa hata fırlatılır.
+
+- cryptocompare : data/pricemulti (varsayılan, birincil)
+- coinbase      : v2/exchange-rates?currency=USD (tüm varlıklar tek çağrıda; 1 / oran)
+- fake          : Ağsız, sabit fiyatlar (BaseVolumeFilter.RATES) — test/geliştirme
+
+Her kaynağın kendi devre kesicisi (CircuitBreaker) vardır: üst üste
+PRICE_BREAKER_FAILURES hata/zaman aşımından sonra kaynak PRICE_BREAKER_RESET_SECONDS
+boyunca hiç sorgulanmaz, ardından tek bir deneme isteğiyle (half-open) geri alınır.
+
+Yeni kaynak: PriceProvider'dan türet, fetch()'i yaz, PROVIDER_CLASSES'a ekle.
+"""
+
+import asyncio
+import time
+
+from core.filter.base_volume_filter import BaseVolumeFilter
+from core.metrics.latency import LatencyHistogram
+
+
+class CircuitBreaker:
+    """closed → (failure_threshold hata) → open → (reset_seconds) → half-open → closed/open"""
+
+    __slots__ = ("failure_threshold", "reset_seconds", "failures", "opened_at", "_probing")
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Kaynağa istek atılabilir mi? half-open'da aynı anda tek deneme isteği."""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def abandon(self):
+        """Deneme isteği sonuçlanmadan iptal edildi (yeterli sonuç geldi); sayılmaz."""
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class PriceProvider:
+    """Fiyat kaynağı tabanı: isim, devre kesici ve gecikme histogramı (hedge süresi için)."""
+
+    name = "base"
+
+    def __init__(self, breaker: CircuitBreaker):
+        self.breaker = breaker
+        self.latency = LatencyHistogram()
+
+    async def fetch(self, client, assets: list) -> dict:
+        raise NotImplementedError
+
+
+class CryptoCompareProvider(PriceProvider):
+    name = "cryptocompare"
+    URL = "https://min-api.cryptocompare.com/data/pricemulti"
+    # fsyms parametresi uzunluk sınırlı; daha fazlası ayrı isteklere bölünür
+    MAX_SYMBOLS = 50
+
+    async def fetch(self, client, assets: list) -> dict:
+        chunks = [assets[i:i + self.MAX_SYMBOLS] for i in range(0, len(assets), self.MAX_SYMBOLS)]
+        prices = {}
+        for result in await asyncio.gather(*(self._fetch_chunk(client, chunk) for chunk in chunks)):
+            prices.update(result)
+        return prices
+
+    async def _fetch_chunk(self, client, assets: list) -> dict:
+        response = await client.get(self.URL, params={"fsyms": ",".join(assets), "tsyms": "USD"})
+        response.raise_for_status()
+        data = response.json()
+        # Hata durumunda CryptoCompare 200 + {"Response": "Error", "Message": ...} döner
+        if data.get("Response") == "Error":
+            raise ValueError(data.get("Message", "pricemulti hatası"))
+        return {
+            asset: float(quote["USD"])
+            for asset, quote in data.items()
+            if isinstance(quote, dict) and "USD" in quote
+        }
+
+
+class CoinbaseProvider(PriceProvider):
+    name = "coinbase"
+    URL = "https://api.coinbase.com/v2/exchange-rates"
+
+    async def fetch(self, client, assets: list) -> dict:
+        response = await client.get(self.URL, params={"currency": "USD"})
+        response.raise_for_status()
+        rates = response.json().get("data", {}).get("rates", {})
+        prices = {}
+        for asset in assets:
+            # Oran "1 USD kaç coin" — fiyat tersidir
+            rate = float(rates.get(asset) or 0)
+            if rate > 0:
+                prices[asset] = 1 / rate
+        return prices
+
+
+class FakePriceProvider(PriceProvider):
+    """Ağsız kaynak: sabit fiyatlar, isteğe bağlı gecikme ve hata (test/geliştirme)."""
+
+    name = "fake"
+
+    def __init__(self, breaker: CircuitBreaker, prices: dict, delay_seconds: float = 0.0,
+                 error: Exception = None, name: str = None):
+        super().__init__(breaker)
+        self.prices = prices
+        self.delay_seconds = delay_seconds
+        self.error = error
+        self.calls = 0
+        if name:
+            self.name = name
+
+    async def fetch(self, client, assets: list) -> dict:
+        self.calls += 1
+        if self.delay_seconds:
+            await asyncio.sleep(self.delay_seconds)
+        if self.error is not None:
+            raise self.error
+        return {asset: self.prices[asset] for asset in assets if asset in self.prices}
+
+
+PROVIDER_CLASSES = {
+    CryptoCompareProvider.name: CryptoCompareProvider,
+    CoinbaseProvider.name: CoinbaseProvider,
+}
+
+
+def build_providers(names, failure_threshold: int, reset_seconds: float) -> list:
+    """PRICE_PROVIDERS listesinden (öncelik sırasıyla) kaynakları oluşturur."""
+    providers = []
+    for name in names:
+        breaker = CircuitBreaker(failure_threshold, reset_seconds)
+        if name == FakePriceProvider.name:
+            prices = {asset: data["usd_rate"] for asset, data in BaseVolumeFilter.RATES.items()}
+            providers.append(FakePriceProvider(breaker, prices))
+        elif name in PROVIDER_CLASSES:
+            providers.append(PROVIDER_CLASSES[name](breaker))
+        else:
+            raise ValueError(f"Bilinmeyen fiyat kaynağı: {name}")
+    return providers
@@ -1,5 +1,8 @@
 import logging
 from config.settings import MIN_DEPOSIT_USD_LIMIT
+from core.currency.price_cache import price_cache
+from core.metrics.latency import pipeline_metrics
+from core.tokens.token_registry import resolve_token
 
 # Logger ayarları
 logger = logging.getLogger("VolumeFilter")
@@ -7,11 +10,13 @@ logger = logging.getLogger("VolumeFilter")
 class BaseVolumeFilter:
     """
     Finansal işlemler için MANUEL ve HIZLI hacim filtresi.
-    API çağırmaz, sabit tanımlanmış 2026-02-12 kurlarını kullanır.
+    API çağırmaz: kurları arka planda tazelenen paylaşılan fiyat cache'inden okur
+    (workers/price_refresher.py). Cache soğuk ya da bayatsa sabit 2026-02-12
+    kurlarına düşer.
     Belirlenen limitin (Varsayılan 1 USD) altındaki "Dust" (Toz) işlemleri engeller.
     """
 
-    # 12 Şubat 2026 - Manuel Kur Listesi
+    # 12 Şubat 2026 - Manuel Kur Listesi (canlı fiyat yokken fallback)
     # amount_for_1_usd: 1 USD eden coin miktarı (Limit kontrolü için referans)
     # usd_rate: 1 Coinin USD karşılığı (Hesaplama ve Loglama için)
     RATES = {
@@ -21,7 +26,6 @@ class BaseVolumeFilter:
         "XRP":  { "usd_rate": 1.398, "amount_for_1_usd": 0.715307 },
         "SOL":  { "usd_rate": 81.18, "amount_for_1_usd": 0.012318 },
         "TRX":  { "usd_rate": 0.2783, "amount_for_1_usd": 3.593244 },
-        "TRON": { "usd_rate": 0.2783, "amount_for_1_usd": 3.593244 },
         "ADA":  { "usd_rate": 0.267, "amount_for_1_usd": 3.745318 },
         "LTC":  { "usd_rate": 53.57, "amount_for_1_usd": 0.018667 },
         "DOT":  { "usd_rate": 1.29, "amount_for_1_usd": 0.775193 },
@@ -56,24 +60,10 @@ class BaseVolumeFilter:
                 return True # Güvenlik için blokla
 
             # 2. Kur Bilgisini Al
-            coin_data = BaseVolumeFilter.RATES.get(symbol)
-            
-            # Tam eşleşme yoksa, içinde geçiyor mu diye bak (Örn: "ERC20_ETH" -> "ETH")
-            if not coin_data:
-                for key, data in BaseVolumeFilter.RATES.items():
-                    if key in symbol:
-                        coin_data = data
-                        break
-            
-            if not coin_data:
-                # Fallback: Eğer listede yoksa ve Stablecoin ise (örn BUSD) 1:1 kabul et
-                if "USD" in symbol:
-                     usd_rate = 1.0
-                else:
-                    logger.warning(f"⚠️ [VolumeFilter] Tanımsız Coin: {symbol} - Kur 0 kabul edilecek.")
-                    usd_rate = 0.0
-            else:
-                usd_rate = coin_data["usd_rate"]
+            usd_rate = BaseVolumeFilter.get_usd_rate(symbol)
+            if usd_rate is None:
+                logger.warning(f"⚠️ [VolumeFilter] Tanımsız Coin: {symbol} - Kur 0 kabul edilecek.")
+                usd_rate = 0.0
 
             # 3. Değer Hesaplama
             usd_value = amount * usd_rate
@@ -95,6 +85,27 @@ class BaseVolumeFilter:
             # Hata durumunda sistemi kilitlememek adına (Fail Open)
             return False
 
+    @staticmethod
+    def get_usd_rate(symbol: str):
+        """
+        1 coinin USD karşılığı. Tanımsız coin için None.
+        token_id önce token registry ile kanonik varlığa çevrilir ("TRON_USDT" -> "USDT",
+        "TRON" -> "TRX"). Stablecoin dışındaki varlıklarda taze canlı fiyat varsa o,
+        yoksa sabit liste kullanılır; listede olmayan stablecoin 1:1 kabul edilir.
+        """
+        token = resolve_token(symbol)
+        if token is None:
+            return None
+        if not token.stablecoin:
+            live_rate = price_cache.get(token.asset)
+            if live_rate is not None:
+                return live_rate
+            pipeline_metrics.increment("price_static_fallback")
+        coin_data = BaseVolumeFilter.RATES.get(token.asset)
+        if coin_data:
+            return coin_data["usd_rate"]
+        return 1.0 if token.stablecoin else None
+
     @staticmethod
     def _log_block(symbol, amount, usd_value, limit, tx_id):
         """Reddedilen işlemler için kurumsal log formatı"""
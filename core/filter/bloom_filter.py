@@ -0,0 +1,152 @@
+"""
+Dizi Tabanlı Bloom Filtresi (mmap ile paylaşılabilir)
+=====================================================
+Milyonlarca cüzdan adresini Python str kümesi yerine sabit boyutlu bir bit
+dizisinde tutar. 5M adres / %0.1 hata oranı ≈ 9 MB (set ile yüzlerce MB).
+
+- Negatif cevap KESİNDİR ("bizim adresimiz değil")
+- Pozitif cevap "muhtemelen" demektir; çağıran tarafça Mongo'da doğrulanır
+
+Dosya formatı (little-endian):
+    magic "CBLM" | version u16 | num_hashes u32 | num_bits u64 | count u64 | bit dizisi
+
+save() her kurulumda YENİ bir sürüm dosyası yazar (<path>.<zaman damgası>); açık
+dosyanın üstüne yazılmaz. Windows'ta mmap'lenmiş dosya değiştirilemez/silinemez
+(PermissionError); böylece hem bu process'in hem diğer PM2 worker'larının
+mmap'i geçerli kalır. Eski sürümler sonraki kayıtlarda silinir (hâlâ açıksa
+sonraki tura kalır). latest_version() en yeni sürümü bulur; open_shared()
+dosyayı salt okunur mmap'ler, böylece tüm worker process'leri aynı sayfaları
+(OS page cache) paylaşır.
+"""
+
+import glob
+import math
+import mmap
+import os
+import struct
+import time
+import zlib
+
+_crc32 = zlib.crc32
+_adler32 = zlib.adler32
+
+_HEADER = struct.Struct("<4sHIQQ")
+_MAGIC = b"CBLM"
+_VERSION = 1
+
+# Kaydederken silinmeyen önceki sürüm sayısı (o an açmakta olan process'ler için)
+_KEEP_PREVIOUS_VERSIONS = 1
+
+
+class BloomFilter:
+    """
+    Double hashing kullanan klasik Bloom filtresi.
+    crc32 + adler32 (C'de, process'ler arası sabit) — kriptografik hash'e göre
+    negatif sorgu ~2 kat hızlı (< 1 µs); ölçülen yanlış pozitif oranı hedefte.
+    """
+
+    __slots__ = ("num_bits", "num_hashes", "count", "_bits", "_mmap")
+
+    def __init__(self, num_bits: int, num_hashes: int, bits=None, count: int = 0, mapped=None):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.count = count
+        self._bits = bits if bits is not None else bytearray((num_bits + 7) // 8)
+        self._mmap = mapped
+
+    @classmethod
+    def for_capacity(cls, capacity: int, error_rate: float) -> "BloomFilter":
+        """capacity eleman için error_rate yanlış pozitif oranını sağlayan boyut."""
+        capacity = max(1, capacity)
+        num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        num_hashes = max(1, int(round(num_bits / capacity * math.log(2))))
+        return cls(num_bits, num_hashes)
+
+    @staticmethod
+    def _hashes(item: str) -> tuple:
+        data = item.encode()
+        return _crc32(data), _adler32(data) | 1
+
+    def add(self, item: str):
+        bits = self._bits
+        h1, h2 = self._hashes(item)
+        num_bits = self.num_bits
+        for i in range(self.num_hashes):
+            position = (h1 + i * h2) % num_bits
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        # Sıcak yol: generator yok, ilk sıfır bitte çıkış (negatiflerin çoğu 1-2 adımda)
+        bits = self._bits
+        h1, h2 = self._hashes(item)
+        num_bits = self.num_bits
+        for i in range(self.num_hashes):
+            position = (h1 + i * h2) % num_bits
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self._bits)
+
+    # ─── Dosya / mmap ────────────────────────────────────────────────────────
+    def save(self, path: str) -> str:
+        """
+        Yeni sürüm dosyasına atomik yazım (geçici dosya + os.replace); açık bir
+        dosyanın üstüne yazılmaz. Returns: yazılan sürüm dosyasının yolu
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        version_path = f"{path}.{time.time_ns():020d}"
+        tmp_path = f"{version_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, self.num_hashes, self.num_bits, self.count))
+            f.write(self._bits)
+        os.replace(tmp_path, version_path)
+        self._remove_old_versions(path, keep=_KEEP_PREVIOUS_VERSIONS + 1)
+        return version_path
+
+    @staticmethod
+    def _versions(path: str) -> list:
+        """path'in sürüm dosyaları, eskiden yeniye (geçici dosyalar hariç)."""
+        return sorted(
+            candidate for candidate in glob.glob(f"{glob.escape(path)}.*")
+            if candidate[len(path) + 1:].isdigit()
+        )
+
+    @classmethod
+    def latest_version(cls, path: str):
+        """En yeni sürüm dosyasının yolu (hiç yoksa None)."""
+        versions = cls._versions(path)
+        return versions[-1] if versions else None
+
+    @classmethod
+    def _remove_old_versions(cls, path: str, keep: int):
+        for old_path in cls._versions(path)[:-keep]:
+            try:
+                os.remove(old_path)
+            except OSError:
+                # Windows: başka bir process hâlâ mmap'liyor; sonraki kayıtta tekrar denenir
+                pass
+
+    @classmethod
+    def open_shared(cls, path: str) -> "BloomFilter":
+        """Dosyayı salt okunur mmap ile açar (process'ler arası paylaşılan sayfalar)."""
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, num_hashes, num_bits, count = _HEADER.unpack_from(mapped, 0)
+        if magic != _MAGIC or version != _VERSION:
+            mapped.close()
+            raise ValueError(f"Geçersiz Bloom dosyası: {path}")
+        bits = memoryview(mapped)[_HEADER.size:_HEADER.size + (num_bits + 7) // 8]
+        return cls(num_bits, num_hashes, bits=bits, count=count, mapped=mapped)
+
+    def close(self):
+        """mmap'i bırakır (sadece open_shared ile açılanlar için)."""
+        if self._mmap is not None:
+            self._bits.release()
+            self._mmap.close()
+            self._mmap = None
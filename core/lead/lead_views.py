@@ -0,0 +1,83 @@
+"""
+Lead Görünümleri (Projection'lı, __slots__'lu)
+=============================================
+Lead dokümanı zamanla büyür (MT5 alanları, wallets dizisi...). Çoğu çağıran ise
+sadece birkaç alana bakar. Her görünüm kendi Mongo projection'ını taşır;
+servisler/db_service.py → get_lead_by_tp(..., view=...) sadece o alanları okur.
+
+- LeadIdentity   : Kim? (webhook, Onramper, IBAN bildirimleri)
+- LeadBalance    : + MT5 bakiye alanları (verify_tp)
+- LeadFinancials : + toplam yatırım/çekim ve yatırım sayısı (IBAN yatırım, MT5 senkron)
+- LeadWallets    : tp_number + wallets dizisi (cache'lenmez; ağır alan)
+
+Eksik alanlar FIELDS'teki varsayılan değeri alır.
+"""
+
+
+class _LeadView:
+    """Görünümlerin ortak tabanı: FIELDS (alan → varsayılan) ve PROJECTION."""
+
+    __slots__ = ()
+
+    FIELDS: dict = {}
+    # Lead cache'teki (wallets hariç) dokümandan üretilebilir mi?
+    CACHED = True
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.PROJECTION = {"_id": 0, **{field: 1 for field in cls.FIELDS}}
+
+    @classmethod
+    def from_doc(cls, doc: dict | None):
+        if doc is None:
+            return None
+        view = cls.__new__(cls)
+        for field, default in cls.FIELDS.items():
+            setattr(view, field, doc.get(field, default))
+        return view
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(tp_number={self.tp_number!r})"
+
+
+class LeadIdentity(_LeadView):
+    __slots__ = ("tp_number", "name", "email", "crm_no", "agent", "department", "reference")
+
+    FIELDS = {
+        "tp_number": None,
+        "name": None,
+        "email": None,
+        "crm_no": None,
+        "agent": None,
+        "department": None,
+        "reference": None,
+    }
+
+
+class LeadBalance(LeadIdentity):
+    __slots__ = ("balance", "equity", "credit", "last_sync")
+
+    FIELDS = dict(LeadIdentity.FIELDS, balance=0, equity=0, credit=0, last_sync=None)
+
+
+class LeadFinancials(LeadIdentity):
+    __slots__ = ("total_deposit", "total_withdrawal", "deposit_count")
+
+    FIELDS = dict(LeadIdentity.FIELDS, total_deposit=0.0, total_withdrawal=0.0, deposit_count=0)
+
+
+class LeadWallets(_LeadView):
+    __slots__ = ("tp_number", "wallets")
+
+    FIELDS = {"tp_number": None, "wallets": []}
+    CACHED = False
+
+    def find(self, address: str) -> dict | None:
+        """Dizideki cüzdanı adresle bulur."""
+        for wallet in self.wallets or []:
+            if wallet.get("address") == address:
+                return wallet
+        return None
@@ -0,0 +1,211 @@
+"""
+Pipeline Gecikme Metrikleri
+===========================
+Yatırım pipeline'ının her aşaması için bellek içi gecikme histogramları tutar.
+Yavaş bir bildirimin Mongo'dan mı, CryptoCompare'den mi, MT5 bağlantısından mı,
+yoksa Cobo routing çekiminden mi kaynaklandığını görmek için kullanılır.
+
+Aşamalar: state, filters, lead_lookup, fx, ledger_write (kilit + istatistik;
+          batch yolunda tüm batch için tek ölçüm), mt5_metadata,
+          telegram_enqueue, routing, total (uçtan uca)
+
+Etiketler (event_type, token) contextvars ile taşınır; her fonksiyona parametre
+geçirmek gerekmez. Token etiketi dışarıdan gelen veri olduğu için (spam token'lar)
+farklı değer sayısı MAX_LABEL_VALUES ile sınırlanır, fazlası "other" sayılır.
+
+Kullanım:
+    with pipeline_metrics.timer("lead_lookup"):
+        lead = await get_lead_by_address(address)
+
+Anlık değerler (kuyruk derinliği vb.) register_gauge ile, olay sayaçları
+increment ile eklenir.
+
+Çıktı: GET /metrics (api/metrics_router.py)
+"""
+
+import bisect
+import contextlib
+import contextvars
+import time
+
+# Etiket başına en fazla farklı değer (kardinalite koruması)
+MAX_LABEL_VALUES = 50
+
+# 0.1 ms ile ~2 dk arası geometrik bucket sınırları (saniye)
+_BUCKET_BOUNDS = []
+_bound = 0.0001
+while _bound < 120:
+    _BUCKET_BOUNDS.append(_bound)
+    _bound *= 1.2
+_BUCKET_BOUNDS.append(float("inf"))
+
+_event_type_label = contextvars.ContextVar("metrics_event_type", default=None)
+_token_label = contextvars.ContextVar("metrics_token", default=None)
+
+# observe() çağrısında etiketi contextvar'dan al anlamına gelir
+_FROM_CONTEXT = object()
+
+
+class LatencyHistogram:
+    """Sabit bucket'lı, kilitsiz gecikme histogramı."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * len(_BUCKET_BOUNDS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(_BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        """Yaklaşık yüzdelik (bucket üst sınırı, gözlenen max ile sınırlı), saniye."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return min(_BUCKET_BOUNDS[index], self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        """p50/p95/p99/avg/max (ms) ve adet."""
+        return {
+            "count": self.count,
+            "p50_ms": round(self.percentile(0.50) * 1000, 2),
+            "p95_ms": round(self.percentile(0.95) * 1000, 2),
+            "p99_ms": round(self.percentile(0.99) * 1000, 2),
+            "avg_ms": round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 2),
+        }
+
+
+class _StageTimer:
+    __slots__ = ("metrics", "stage", "started")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.stage, time.perf_counter() - self.started)
+        return False
+
+
+class PipelineMetrics:
+    """Aşama bazlı histogramlar + event_type / token kırılımları."""
+
+    def __init__(self):
+        self.stages: dict = {}
+        self.by_event_type: dict = {}
+        self.by_token: dict = {}
+        self.event_counts: dict = {}
+        self.counters: dict = {}
+        self._gauges: dict = {}
+
+    # ─── Etiketler ───────────────────────────────────────────────────────────
+    @staticmethod
+    @contextlib.contextmanager
+    def event_labels(event_type: str):
+        """
+        Tek olayın etiket kapsamı: event_type set edilir, token temizlenir; çıkışta ikisi
+        de önceki değerine döner. Uzun yaşayan kuyruk worker task'larında bir olayın
+        token etiketi sonraki olaya (token'sız cüzdan olayı vb.) sızmaz.
+        """
+        event_type_reset = _event_type_label.set(event_type or "unknown")
+        token_reset = _token_label.set(None)
+        try:
+            yield
+        finally:
+            _token_label.reset(token_reset)
+            _event_type_label.reset(event_type_reset)
+
+    @staticmethod
+    def set_token(token: str):
+        _token_label.set((token or "unknown").upper())
+
+    # ─── Kayıt ───────────────────────────────────────────────────────────────
+    def timer(self, stage: str) -> _StageTimer:
+        return _StageTimer(self, stage)
+
+    def increment(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def register_gauge(self, name: str, read):
+        """read: snapshot anında çağrılan, sayı dönen fonksiyon."""
+        self._gauges[name] = read
+
+    def count_event(self, event_type: str):
+        key = self._bounded_label(self.event_counts, event_type or "unknown")
+        self.event_counts[key] = self.event_counts.get(key, 0) + 1
+
+    def observe(self, stage: str, seconds: float, event_type=_FROM_CONTEXT, token=_FROM_CONTEXT):
+        """
+        Aşama süresini kaydeder. event_type / token verilmezse contextvar'dan okunur;
+        None verilirse o kırılıma yazılmaz (örn: batch aşamaları).
+        """
+        self._histogram(self.stages, stage).observe(seconds)
+
+        if event_type is _FROM_CONTEXT:
+            event_type = _event_type_label.get()
+        if event_type:
+            self._labelled_histogram(self.by_event_type, event_type, stage).observe(seconds)
+
+        if token is _FROM_CONTEXT:
+            token = _token_label.get()
+        if token:
+            self._labelled_histogram(self.by_token, token, stage).observe(seconds)
+
+    # ─── Çıktı ───────────────────────────────────────────────────────────────
+    def snapshot(self) -> dict:
+        return {
+            "stages": {stage: h.summary() for stage, h in self.stages.items()},
+            "by_event_type": {
+                label: {stage: h.summary() for stage, h in stages.items()}
+                for label, stages in self.by_event_type.items()
+            },
+            "by_token": {
+                label: {stage: h.summary() for stage, h in stages.items()}
+                for label, stages in self.by_token.items()
+            },
+            "event_counts": dict(self.event_counts),
+            "counters": dict(self.counters),
+            "gauges": {name: read() for name, read in self._gauges.items()},
+        }
+
+    # ─── Yardımcılar ─────────────────────────────────────────────────────────
+    @staticmethod
+    def _histogram(container: dict, key: str) -> LatencyHistogram:
+        histogram = container.get(key)
+        if histogram is None:
+            histogram = container[key] = LatencyHistogram()
+        return histogram
+
+    def _labelled_histogram(self, container: dict, label: str, stage: str) -> LatencyHistogram:
+        label = self._bounded_label(container, label)
+        stages = container.get(label)
+        if stages is None:
+            stages = container[label] = {}
+        return self._histogram(stages, stage)
+
+    @staticmethod
+    def _bounded_label(container: dict, label: str) -> str:
+        if label in container or len(container) < MAX_LABEL_VALUES:
+            return label
+        return "other"
+
+
+# Uygulama genelinde tek instance
+pipeline_metrics = PipelineMetrics()
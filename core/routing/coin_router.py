@@ -12,6 +12,8 @@ Gelen kripto para türüne göre hangi Cobo cüzdanına yönlendirileceğini bel
 
 import os
 
+from core.tokens.token_registry import resolve_token, ROUTE_MAIN, ROUTE_ETH, ROUTE_BTC, ROUTE_TRX
+
 # V2.0 - Cüzdan adresleri .env'den okunur. Yönlendirme bu adreslere göre yapılır.
 MAIN_WALLET = os.getenv("MAIN_WALLET", "")
 ETH_CONVERTER_WALLET = os.getenv("ETH_CONVERTER_WALLET", "")
@@ -24,29 +26,30 @@ def get_target_wallet(symbol: str) -> tuple:
     V2.0 - Coin türüne göre hedef cüzdan adresini ve etiketini döner.
 
     Args:
-        symbol: Cobo'dan gelen token_id (ör: USDT, ETH, BTC, TRX, TRON)
+        symbol: Cobo'dan gelen token_id (ör: TRON_USDT, ETH, BTC, TRON) — token registry ile çözülür
 
     Returns:
         tuple: (wallet_address: str, wallet_label: str, is_main: bool)
                is_main=True  → Ana kasaya yönlendirildi (USDT)
                is_main=False → Convert cüzdanına yönlendirildi
     """
-    symbol_upper = (symbol or "").upper()
+    token = resolve_token(symbol)
+    route = token.route if token else None
 
-    # USDT → Ana kasa
-    if "USDT" in symbol_upper or "USDC" in symbol_upper:
+    # USDT / USDC → Ana kasa
+    if route == ROUTE_MAIN:
         return (MAIN_WALLET, "Ana Kasa", True)
 
     # ETH → ETH Convert cüzdanı
-    if "ETH" in symbol_upper:
+    if route == ROUTE_ETH:
         return (ETH_CONVERTER_WALLET, "ETH Convert Cüzdanı", False)
 
     # BTC → BTC Convert cüzdanı
-    if "BTC" in symbol_upper:
+    if route == ROUTE_BTC:
         return (BTC_CONVERTER_WALLET, "BTC Convert Cüzdanı", False)
 
     # TRX / TRON → TRX Convert cüzdanı
-    if "TRX" in symbol_upper or "TRON" in symbol_upper:
+    if route == ROUTE_TRX:
         return (TRX_CONVERTER_WALLET, "TRX Convert Cüzdanı", False)
 
     # Bilinmeyen coin → Varsayılan olarak ana kasaya yönlendir
@@ -0,0 +1,152 @@
+"""
+Token Kayıt Defteri (Token Registry)
+====================================
+Cobo token_id'sini ("TRON_USDT", "ETH_USDT", "BSC_BNB", "BTC"...) tek yerde
+sınıflandırır: kanonik varlık, ağ, ondalık, stablecoin bayrağı ve routing hedefi.
+
+Eskiden dört farklı yerde "içinde geçiyor mu" taraması vardı (izin listesi,
+hacim filtresi, convert_to_usd, get_target_wallet). Bu yüzden "ETH_AIRDROP" veya
+"TRON_FAKEUSD" gibi token'lar ETH / TRON sanılıyordu.
+
+Çözümleme sırası (substring araması YOK):
+1. TOKENS tablosunda tam eşleşme
+2. "<AĞ>_<VARLIK>" biçimi: AĞ bilinen bir ağ ve VARLIK izinli bir varlık ise
+   (örn: "ARBITRUM_USDC"); ağın yerel coin'i ise ondalık ASSETS'ten gelir
+3. Hiçbiri değilse bilinmeyen token → None (spam)
+
+Sonuçlar (None dahil) memoize edilir; her sorgu tek dict/LRU erişimidir.
+İzinli varlıklar config/constants.py → ALLOWED_TOKENS'tır.
+"""
+
+from functools import lru_cache
+
+from config.constants import ALLOWED_TOKENS
+
+# Routing hedefleri (core/routing/coin_router.py)
+ROUTE_MAIN = "main"
+ROUTE_ETH = "eth"
+ROUTE_BTC = "btc"
+ROUTE_TRX = "trx"
+
+# Kanonik varlık → (varsayılan ondalık, stablecoin mi, routing hedefi)
+# routing None → ana kasaya varsayılan yönlendirme
+ASSETS = {
+    "USDT":  (6, True, ROUTE_MAIN),
+    "USDC":  (6, True, ROUTE_MAIN),
+    "ETH":   (18, False, ROUTE_ETH),
+    "BTC":   (8, False, ROUTE_BTC),
+    "TRX":   (6, False, ROUTE_TRX),
+    "LTC":   (8, False, None),
+    "SOL":   (9, False, None),
+    "MATIC": (18, False, None),
+    "BNB":   (18, False, None),
+    "XRP":   (6, False, None),
+    "ADA":   (6, False, None),
+    "DOT":   (10, False, None),
+}
+
+# Eş anlamlı varlık adları (Cobo TRON'un yerel coin'ini "TRON" diye gönderir)
+ASSET_ALIASES = {"TRON": "TRX", "POL": "MATIC"}
+
+# İş kuralı: sadece ALLOWED_TOKENS'taki varlıklar tanınır
+_ALLOWED_ASSETS = {ASSET_ALIASES.get(token, token) for token in ALLOWED_TOKENS}
+
+# Bilinen ağ önekleri → kanonik ağ adı
+CHAINS = {
+    "TRON": "TRON",
+    "ETH": "ETH",
+    "ERC20": "ETH",
+    "BSC": "BSC",
+    "BEP20": "BSC",
+    "BTC": "BTC",
+    "LTC": "LTC",
+    "SOL": "SOL",
+    "MATIC": "MATIC",
+    "POLYGON": "MATIC",
+    "XRP": "XRP",
+    "ADA": "ADA",
+    "DOT": "DOT",
+    "ARBITRUM": "ARBITRUM",
+    "ARB": "ARBITRUM",
+    "BASE": "BASE",
+    "OPT": "OPTIMISM",
+    "OPTIMISM": "OPTIMISM",
+}
+
+# Ondalığı varlığın varsayılanından farklı olan bilinen Cobo token_id'leri
+# token_id → (varlık, ağ, ondalık)
+TOKENS = {
+    "TRON": ("TRX", "TRON", 6),
+    "TRX": ("TRX", "TRON", 6),
+    "BSC_USDT": ("USDT", "BSC", 18),
+    "BSC_USDC": ("USDC", "BSC", 18),
+    "BSC_BNB": ("BNB", "BSC", 18),
+    "BSC_ETH": ("ETH", "BSC", 18),
+    "BNB": ("BNB", "BSC", 18),
+}
+
+
+class TokenInfo:
+    """Çözümlenmiş token bilgisi (değiştirilmez kabul edilir)."""
+
+    __slots__ = ("token_id", "asset", "chain", "decimals", "stablecoin", "route")
+
+    def __init__(self, token_id: str, asset: str, chain: str, decimals: int, stablecoin: bool, route: str):
+        self.token_id = token_id
+        self.asset = asset
+        self.chain = chain
+        self.decimals = decimals
+        self.stablecoin = stablecoin
+        self.route = route
+
+    def __repr__(self) -> str:
+        return f"TokenInfo({self.token_id!r}, asset={self.asset!r}, chain={self.chain!r})"
+
+
+def _build(token_id: str, asset: str, chain: str, decimals: int = None) -> TokenInfo | None:
+    asset = ASSET_ALIASES.get(asset, asset)
+    if asset not in ASSETS or asset not in _ALLOWED_ASSETS:
+        return None
+    default_decimals, stablecoin, route = ASSETS[asset]
+    return TokenInfo(
+        token_id=token_id,
+        asset=asset,
+        chain=chain,
+        decimals=default_decimals if decimals is None else decimals,
+        stablecoin=stablecoin,
+        route=route,
+    )
+
+
+@lru_cache(maxsize=4096)
+def resolve_token(token_id: str) -> TokenInfo | None:
+    """
+    Cobo token_id → TokenInfo. Bilinmeyen / izinsiz token için None.
+    Hem pozitif hem negatif sonuçlar cache'lenir (spam token'lar dahil, LRU sınırlı).
+    """
+    normalized = str(token_id or "").strip().upper()
+    if not normalized:
+        return None
+
+    known = TOKENS.get(normalized)
+    if known:
+        return _build(normalized, *known)
+
+    chain, separator, asset = normalized.partition("_")
+    if not separator:
+        # Sadece varlık adı (coin_code: "USDT", "BTC"); ağ varlığın kendi ağı kabul edilir
+        asset = ASSET_ALIASES.get(normalized, normalized)
+        return _build(normalized, asset, CHAINS.get(normalized) or CHAINS.get(asset))
+
+    if chain not in CHAINS or "_" in asset:
+        return None
+    return _build(normalized, asset, CHAINS[chain])
+
+
+def is_allowed_token(token_id: str) -> bool:
+    return resolve_token(token_id) is not None
+
+
+def priced_assets() -> list:
+    """Fiyatı piyasadan çekilmesi gereken izinli varlıklar (stablecoin'ler hariç)."""
+    return sorted(asset for asset in _ALLOWED_ASSETS if asset in ASSETS and not ASSETS[asset][1])
@@ -0,0 +1,69 @@
+"""
+Webhook Öncelik Puanlaması
+==========================
+Outbox'a yazılan her olaya, işlenmeden ÖNCE ucuz bir öncelik verilir (DB/HTTP yok):
+sabit BaseVolumeFilter.RATES tablosu, token registry ve BLOCKED_TYPES listesi.
+
+Seviyeler:
+- HIGH   (3): Tahmini değeri WEBHOOK_PRIORITY_HIGH_VALUE_USD üstü yatırım
+- NORMAL (2): Diğer yatırımlar, cüzdan olayları, tanınmayan payload'lar
+- LOW    (1): Ara durumlar (CONFIRMING vb.), limit altı (dust) tutarlar
+- SPAM   (0): Engellenen işlem tipi veya izin listesinde olmayan token
+
+Zamanlama (servisler/db_service.py → claim_webhook_event):
+    due_at = available_at + (HIGH - priority) * WEBHOOK_PRIORITY_AGING_SECONDS
+Worker'lar en küçük due_at'i alır. Büyük yatırım sırada öne geçer, ama düşük
+öncelikli bir olay en fazla (HIGH - priority) * AGING saniye geride kalabilir
+(açlık / starvation koruması).
+"""
+
+from config.constants import BLOCKED_TYPES
+from config.settings import MIN_DEPOSIT_USD_LIMIT, WEBHOOK_PRIORITY_HIGH_VALUE_USD
+from core.filter.base_volume_filter import BaseVolumeFilter
+from core.tokens.token_registry import resolve_token
+from core.transaction.transaction_event import TransactionEvent
+from core.transaction.transaction_status import SUCCESS_STATUSES
+
+PRIORITY_SPAM = 0
+PRIORITY_LOW = 1
+PRIORITY_NORMAL = 2
+PRIORITY_HIGH = 3
+
+PRIORITY_NAMES = {
+    PRIORITY_SPAM: "spam",
+    PRIORITY_LOW: "low",
+    PRIORITY_NORMAL: "normal",
+    PRIORITY_HIGH: "high",
+}
+
+
+def score_webhook_event(data: dict) -> int:
+    """Ham Cobo webhook payload'ı için öncelik seviyesi."""
+    # Sadece işlem olayları puanlanır (cüzdan oluşturma vb. normal sırada)
+    event_type = (data.get("type") or data.get("event_type") or "").lower()
+    if "transaction" not in event_type or not isinstance(data.get("data"), dict):
+        return PRIORITY_NORMAL
+
+    event = TransactionEvent.from_webhook(data)
+    if not event.transaction_id:
+        return PRIORITY_NORMAL
+
+    if event.tx_type in BLOCKED_TYPES:
+        return PRIORITY_SPAM
+    if resolve_token(event.symbol) is None:
+        return PRIORITY_SPAM
+
+    if event.status not in SUCCESS_STATUSES:
+        return PRIORITY_LOW
+
+    usd_value = event.amount * (BaseVolumeFilter.get_usd_rate(event.symbol) or 0.0)
+    if usd_value < MIN_DEPOSIT_USD_LIMIT:
+        return PRIORITY_LOW
+    if usd_value >= WEBHOOK_PRIORITY_HIGH_VALUE_USD:
+        return PRIORITY_HIGH
+    return PRIORITY_NORMAL
+
+
+def priority_delay_seconds(priority: int, aging_seconds: float) -> float:
+    """due_at için available_at'e eklenecek gecikme."""
+    return (PRIORITY_HIGH - priority) * aging_seconds
@@ -0,0 +1,146 @@
+"""
+Cobo İşlem Olayı Modeli (TransactionEvent)
+==========================================
+Cobo'dan gelen ham işlem payload'ını TEK SEFERDE normalize eder.
+
+Cobo aynı bilgiyi farklı yerlerde gönderebilir:
+- to_address       ↔ destination.address
+- amount           ↔ destination.amount
+- from_address     ↔ source.address / source.addresses[0]
+- token_id         ↔ coin_code ↔ asset_id
+- destination      → dict veya list olabilir (çekim işlemleri)
+
+Bu zincirleme .get() fallback'leri artık sadece burada tutulur.
+Webhook işleyici, admin paneli ve replay/backfill araçları aynı modeli kullanır.
+"""
+
+try:
+    import orjson as _json_lib
+except ImportError:  # orjson kurulu değilse standart kütüphane
+    import json as _json_lib
+
+
+def parse_webhook_body(body: bytes) -> dict:
+    """
+    Ham HTTP body'sini dict'e çevirir (orjson varsa onunla).
+    JSON nesnesi olmayan body'ler (liste, string, sayı) için ValueError.
+    """
+    data = _json_lib.loads(body)
+    if not isinstance(data, dict):
+        raise ValueError(f"Webhook body JSON nesnesi değil: {type(data).__name__}")
+    return data
+
+
+class TransactionEvent:
+    """Normalize edilmiş, __slots__ kullanan hafif işlem modeli."""
+
+    __slots__ = (
+        "event_id",
+        "event_type",
+        "transaction_id",
+        "status",
+        "tx_type",
+        "address",
+        "from_address",
+        "wallet_id",
+        "amount",
+        "amount_raw",
+        "symbol",
+        "chain_id",
+        "created_timestamp",
+    )
+
+    def __init__(
+        self,
+        transaction_id: str,
+        status: str,
+        tx_type: str,
+        address: str,
+        from_address: str,
+        wallet_id: str,
+        amount: float,
+        amount_raw: str,
+        symbol: str,
+        chain_id: str,
+        created_timestamp: int = None,
+        event_id: str = None,
+        event_type: str = None,
+    ):
+        self.event_id = event_id
+        self.event_type = event_type
+        self.transaction_id = transaction_id
+        self.status = status
+        self.tx_type = tx_type
+        self.address = address
+        self.from_address = from_address
+        self.wallet_id = wallet_id
+        self.amount = amount
+        self.amount_raw = amount_raw
+        self.symbol = symbol
+        self.chain_id = chain_id
+        self.created_timestamp = created_timestamp
+
+    @classmethod
+    def from_webhook(cls, data: dict) -> "TransactionEvent":
+        """
+        Cobo webhook wrapper'ından ({event_id, type, data: {...}}) model üretir.
+        transaction_id yoksa event_id kullanılır.
+        """
+        if not isinstance(data, dict):
+            data = {}
+        tx = data.get("data")
+        if not isinstance(tx, dict):
+            tx = {}
+        if isinstance(tx.get("transaction"), dict):
+            tx = tx["transaction"]
+        return cls.from_cobo_transaction(
+            tx,
+            event_id=data.get("event_id"),
+            event_type=data.get("type") or data.get("event_type"),
+        )
+
+    @classmethod
+    def from_cobo_transaction(cls, tx: dict, event_id: str = None, event_type: str = None) -> "TransactionEvent":
+        """
+        Cobo API'nin döndüğü tekil işlem dict'inden (list_transactions, webhook
+        içindeki transaction) model üretir.
+        """
+        destination = tx.get("destination") or {}
+        if isinstance(destination, list):
+            destination = destination[0] if destination else {}
+        source = tx.get("source") or {}
+        if isinstance(source, list):
+            source = source[0] if source else {}
+
+        from_address = tx.get("from_address") or source.get("address")
+        if not from_address:
+            source_addresses = source.get("addresses") or []
+            from_address = source_addresses[0] if source_addresses else None
+
+        amount_raw = tx.get("amount") or destination.get("amount")
+        try:
+            amount = float(amount_raw) if amount_raw else 0.0
+        except (TypeError, ValueError):
+            amount = 0.0
+
+        return cls(
+            transaction_id=tx.get("transaction_id") or event_id,
+            status=(tx.get("status") or "").upper(),
+            tx_type=(tx.get("type") or "").upper(),
+            address=tx.get("to_address") or destination.get("address"),
+            from_address=from_address,
+            wallet_id=tx.get("wallet_id") or destination.get("wallet_id"),
+            amount=amount,
+            amount_raw=amount_raw,
+            symbol=tx.get("token_id") or tx.get("coin_code") or tx.get("asset_id"),
+            chain_id=tx.get("chain_id") or "Unknown",
+            created_timestamp=tx.get("created_timestamp"),
+            event_id=event_id,
+            event_type=event_type,
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"TransactionEvent(transaction_id={self.transaction_id!r}, status={self.status!r}, "
+            f"symbol={self.symbol!r}, amount={self.amount!r}, address={self.address!r})"
+        )
@@ -0,0 +1,36 @@
+"""
+Cobo İşlem Durumları
+====================
+Cobo bir işlem için sırasıyla Submitted → ... → Confirming → Completed gibi
+durumlar gönderir; webhook'lar ise sırasız gelebilir. Her duruma bir sıra (rank)
+verilir; yüksek rank daha ileri bir durumdur.
+
+- SUCCESS_STATUSES: Yatırım pipeline'ını tetikleyen terminal durumlar
+- FAILURE_STATUSES: Pipeline'a girmeyen terminal durumlar
+- Tanımsız durumlar rank 0 kabul edilir (ara durum gibi davranır)
+"""
+
+SUCCESS_STATUSES = frozenset({"COMPLETED", "SUCCESS", "CONFIRMED"})
+FAILURE_STATUSES = frozenset({"FAILED", "REJECTED"})
+
+TERMINAL_RANK = 100
+
+STATUS_RANK = {
+    "SUBMITTED": 10,
+    "PENDINGSCREENING": 20,
+    "PENDINGAUTHORIZATION": 30,
+    "PENDINGSIGNATURE": 40,
+    "PENDING": 45,
+    "BROADCASTING": 50,
+    "CONFIRMING": 60,
+    **{status: TERMINAL_RANK for status in SUCCESS_STATUSES | FAILURE_STATUSES},
+}
+
+
+def status_rank(status: str) -> int:
+    """Büyük harf durum → rank (tanımsızsa 0)."""
+    return STATUS_RANK.get(status or "", 0)
+
+
+def is_terminal(status: str) -> bool:
+    return status_rank(status) >= TERMINAL_RANK
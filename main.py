@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import threading
 import time
@@ -8,8 +9,27 @@ from fastapi.responses import JSONResponse, HTMLResponse
 from fastapi.staticfiles import StaticFiles
 
 # Config ve Servisler
-from config.settings import logger, PORT, ENVIRONMENT, ALLOWED_TEST_IP
-from servisler.db_service import ensure_transaction_index
+from config.settings import (
+    logger, PORT, ENVIRONMENT, ALLOWED_TEST_IP,
+    WEBHOOK_QUEUE_RETENTION_HOURS, WEBHOOK_DEDUP_SHARED, WEBHOOK_DEDUP_TTL_SECONDS,
+    TX_STATE_RETENTION_DAYS, LEDGER_TIMESERIES_ENABLED, LEDGER_TIMESERIES_RETENTION_DAYS,
+    PRICE_HISTORY_RETENTION_MINUTES,
+)
+from servisler.db_service import (
+    ensure_transaction_index,
+    ensure_webhook_outbox_indexes,
+    ensure_webhook_dedup_indexes,
+    ensure_transaction_state_indexes,
+    ensure_price_bar_indexes,
+    ensure_ledger_timeseries
+)
+from servisler.db_migrations import run_migrations
+from servisler.telegram_service import send_telegram_msg
+from workers.webhook_queue import webhook_queue
+from workers.address_index_watcher import address_index_watcher
+from workers.price_refresher import price_refresher
+from core.currency.price_oracle import price_oracle
+from workers.ledger_archiver import ledger_archiver
 
 # API Routers
 from api.home_router import router as home_router
@@ -20,6 +40,7 @@ from api.telegram_router import router as telegram_router
 from api.iban_router import router as iban_router
 from api.onramper_router import router as onramper_router
 from admin_api import router as admin_router
+from api.metrics_router import router as metrics_router
 
 # Telegram Bot
 from bot.telegram_bot import run_telegram_bot
@@ -68,6 +89,12 @@ async def verify_and_rate_limit(request: Request, call_next):
 
     return await call_next(request)
 
+async def _run_migrations():
+    try:
+        await run_migrations()
+    except Exception as e:
+        logger.error(f"❌ Index migration hatası: {e}")
+
 # --- Startup Event ---
 @app.on_event("startup")
 async def startup_event():
@@ -77,8 +104,51 @@ async def startup_event():
         logger.info("✅ Unique Index güvenceye alındı (Çift işlem koruması aktif)")
     except Exception as e:
         logger.error(f"❌ Index oluşturulurken hata: {e}")
+    # Index migration'ları arka planda (büyük koleksiyonlarda uzun sürebilir)
+    app.state.migration_task = asyncio.create_task(_run_migrations())
+    try:
+        await address_index_watcher.start()
+    except Exception as e:
+        # İndeks ilk kullanımda tekrar yüklenmeye çalışılır (is_our_address)
+        logger.error(f"❌ Adres indeksi yüklenemedi: {e}")
+    # Hacim filtresi ve USD çevirisi için fiyatlar: snapshot warm start + arka planda yenileme
+    try:
+        await ensure_price_bar_indexes(PRICE_HISTORY_RETENTION_MINUTES)
+    except Exception as e:
+        logger.error(f"❌ Fiyat geçmişi index'leri oluşturulamadı: {e}")
+    await price_refresher.start()
+    try:
+        if LEDGER_TIMESERIES_ENABLED:
+            await ensure_ledger_timeseries(LEDGER_TIMESERIES_RETENTION_DAYS)
+        await ledger_archiver.start()
+    except Exception as e:
+        logger.error(f"❌ Defter time-series/arşiv başlatılamadı: {e}")
+    try:
+        await ensure_webhook_outbox_indexes(WEBHOOK_QUEUE_RETENTION_HOURS)
+        if WEBHOOK_DEDUP_SHARED:
+            await ensure_webhook_dedup_indexes(WEBHOOK_DEDUP_TTL_SECONDS)
+        await ensure_transaction_state_indexes(TX_STATE_RETENTION_DAYS)
+    except Exception as e:
+        # Index hatası kuyruğu durdurmaz; mevcut index'lerle çalışılır
+        logger.error(f"❌ Webhook index'leri oluşturulamadı: {e}")
+    try:
+        await webhook_queue.start()
+    except Exception as e:
+        # Worker'sız kabul edilen olaylar hiç işlenmez: webhook endpoint'i 503 döner
+        # ve Cobo olayları tekrar gönderir
+        logger.critical(f"🚨 Webhook kuyruğu başlatılamadı, webhook'lar 503 ile reddedilecek: {e}")
+        send_telegram_msg(f"🚨 <b>WEBHOOK KUYRUĞU BAŞLATILAMADI</b>\n⚠️ {e}")
     logger.info("✅ Sistem tamamen hazır!")
 
+# --- Shutdown Event ---
+@app.on_event("shutdown")
+async def shutdown_event():
+    await webhook_queue.stop()
+    await address_index_watcher.stop()
+    await price_refresher.stop()
+    await price_oracle.close()
+    await ledger_archiver.stop()
+
 # Static Files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -91,6 +161,7 @@ app.include_router(telegram_router)
 app.include_router(iban_router)
 app.include_router(admin_router)
 app.include_router(onramper_router)
+app.include_router(metrics_router)
 
 if __name__ == "__main__":
     # Botu sadece canlı modda başlat
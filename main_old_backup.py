@@ -18,11 +18,11 @@ from servisler.db_service import (
     get_lead_by_tp, save_wallet_to_lead, get_lead_by_address, 
     increment_deposit_count, get_existing_wallet, 
     try_lock_transaction, ensure_transaction_index, update_financial_stats,
-    get_all_our_addresses
+    get_all_our_addresses, get_wallet_by_address
 )
 from servisler.mt5service import MT5UserManager
 from servisler.sweep_service import CoboSweepService
-from core.currency.converter.converter import coin_parser
+from core.currency.converter.converter import convert_to_usd
 
 from pathlib import Path
 
@@ -205,12 +205,9 @@ async def process_cobo_notification(data: dict):
                     tp = lead.get("tp_number")
                     name = lead.get("name", "Bilinmeyen")
                     
-                    # Asset bilgisini cüzdan listesinden bul
-                    asset = "USDT" # Varsayılan
-                    for w in lead.get("wallets", []):
-                        if w.get("address") == address:
-                            asset = w.get("asset", "USDT")
-                            break
+                    # Asset bilgisini cüzdan kaydından bul (lead okumaları wallets dizisini getirmez)
+                    wallet = await get_wallet_by_address(address)
+                    asset = (wallet or {}).get("asset") or "USDT" # Varsayılan
                     
                     # Ağ ismini güzelleştir (Opsiyonel)
                     display_chain = chain
@@ -311,9 +308,7 @@ async def process_cobo_notification(data: dict):
                 # --- CURRENCY CONVERTER INTEGRATION ---
                 original_amount = amount  # Her ihtimale karşı başlangıçta tanımla
                 try:
-                    # Blocking request'i executor'da çalıştır (Async yapıyı bozmamak için)
-                    loop = asyncio.get_event_loop()
-                    cv_data = await loop.run_in_executor(None, coin_parser, symbol, amount)
+                    cv_data = await convert_to_usd(symbol, amount)
                     
                     # 2. eleman her zaman USD'dir (converter.py yapısına göre)
                     # Örn: [{"currency": "TRX", "amount": 500}, {"currency": "USD", "amount": 65}]
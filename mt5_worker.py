@@ -4,6 +4,7 @@ import logging
 import asyncio
 from servisler.mt5service import MT5UserManager
 from servisler.db_service import save_lead, get_lead_by_tp
+from core.lead.lead_views import LeadFinancials
 from dotenv import load_dotenv
 
 from pathlib import Path
@@ -40,8 +41,8 @@ async def sync_from_mt5():
                         total_dep, total_with = manager.get_financial_summary(loginNum)
                         
                         # Mevcut lead'i kontrol et (Yatırım sayısını korumak için)
-                        existing_lead = await get_lead_by_tp(loginNum)
-                        deposit_count = existing_lead.get("deposit_count", 0) if existing_lead else 0
+                        existing_lead = await get_lead_by_tp(loginNum, view=LeadFinancials)
+                        deposit_count = existing_lead.deposit_count if existing_lead else 0
                         
                         # Eğer geçmişte bakiye hareketleri varsa ve deposit_count 0 ise güncelle
                         if total_dep > 0 and deposit_count == 0:
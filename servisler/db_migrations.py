@@ -0,0 +1,231 @@
+"""
+Index / Şema Migration'ları
+===========================
+Sıcak sorguların dayandığı tüm index'ler burada, sürüm numaralı adımlar halinde
+tanımlanır. Eskiden sadece transactions.transaction_id garanti ediliyordu; diğerleri
+elle oluşturulduysa vardı.
+
+- run_migrations(): Uygulanmamış sürümleri sırayla uygular, db.schema_migrations'a
+  kaydeder. Açılışta arka planda çalışır (main.py), istek trafiğini bekletmez.
+- Aynı anahtarlara sahip bir index zaten varsa (isim/opsiyon farklı, elle açılmış)
+  yeniden oluşturulmaz; eksik sayılmaz.
+- build_index_report(): Sıcak sorguların explain planı + $indexStats kullanım
+  sayıları. COLLSCAN yapan sorgu varsa raporda işaretlenir (GET /api/system/index-report).
+
+Yeni index gerekiyorsa mevcut adımı DEĞİŞTİRMEYİN; yeni bir sürüm ekleyin.
+TTL süresi ayardan gelen index'ler (outbox, dedup, işlem durumu) kendi
+ensure_* fonksiyonlarında kalır.
+"""
+
+import datetime
+import logging
+
+from pymongo.errors import OperationFailure
+
+from servisler.db_service import db
+
+logger = logging.getLogger(__name__)
+
+migration_collection = db.schema_migrations
+
+# Her index: (koleksiyon, anahtarlar, create_index opsiyonları)
+MIGRATIONS = [
+    {
+        "version": 1,
+        "description": "Lead, işlem kilidi ve IBAN sorguları",
+        "indexes": [
+            ("COBO", [("tp_number", 1)], {}),
+            ("COBO", [("wallets.address", 1)], {}),
+            ("transactions", [("transaction_id", 1)], {"unique": True}),
+            ("ibans", [("is_active", 1)], {}),
+            ("ibans", [("created_at", -1)], {}),
+        ],
+    },
+    {
+        "version": 2,
+        "description": "wallet_addresses koleksiyonu",
+        "indexes": [
+            ("wallet_addresses", [("address", 1)], {"unique": True}),
+            ("wallet_addresses", [("tp_number", 1), ("asset", 1), ("chain_id", 1)], {}),
+        ],
+    },
+    {
+        "version": 3,
+        "description": "İşlem defteri rapor ve arşiv sorguları",
+        "indexes": [
+            ("transactions", [("tp_number", 1), ("processed_at", -1)], {}),
+            ("transactions", [("symbol", 1), ("processed_at", -1)], {}),
+            ("transactions", [("processed_at", 1)], {}),
+            ("transactions_archive", [("tp_number", 1), ("processed_at", -1)], {}),
+        ],
+    },
+]
+
+# Explain raporunda kontrol edilen sıcak sorgular (değerler sadece örnek; plan şekli önemli)
+HOT_QUERIES = [
+    {"name": "lead_by_tp", "collection": "COBO", "filter": {"tp_number": "0"}},
+    {"name": "lead_by_wallet_legacy", "collection": "COBO", "filter": {"wallets.address": "-"}},
+    {"name": "wallet_by_address", "collection": "wallet_addresses", "filter": {"address": "-"}},
+    {
+        "name": "existing_wallet",
+        "collection": "wallet_addresses",
+        "filter": {"tp_number": "0", "asset": "-", "chain_id": "-"},
+    },
+    {"name": "transaction_lock", "collection": "transactions", "filter": {"transaction_id": "-"}},
+    {
+        "name": "ledger_by_customer",
+        "collection": "transactions",
+        "filter": {"tp_number": "0"},
+        "sort": {"processed_at": -1},
+    },
+    {
+        "name": "ledger_by_symbol",
+        "collection": "transactions",
+        "filter": {"symbol": "-", "processed_at": {"$gte": datetime.datetime(2000, 1, 1)}},
+        "sort": {"processed_at": -1},
+    },
+    {
+        "name": "ledger_archive_candidates",
+        "collection": "transactions",
+        "filter": {"processed_at": {"$lt": datetime.datetime(2000, 1, 1)}, "archived_at": {"$exists": False}},
+    },
+    {"name": "active_iban", "collection": "ibans", "filter": {"is_active": True}},
+    {"name": "iban_list", "collection": "ibans", "filter": {}, "sort": {"created_at": -1}},
+    {
+        "name": "outbox_claim",
+        "collection": "webhook_outbox",
+        "filter": {"status": "pending", "due_at": {"$lte": datetime.datetime(2000, 1, 1)}},
+        "sort": {"due_at": 1},
+    },
+]
+
+
+def _key_pattern(keys) -> tuple:
+    # index_information yönü float (1.0) döndürebilir; "text"/"2dsphere" gibi tipler string
+    return tuple(
+        (field, direction if isinstance(direction, str) else int(direction))
+        for field, direction in keys
+    )
+
+
+async def _existing_key_patterns(collection: str) -> set:
+    info = await db[collection].index_information()
+    return {_key_pattern(index["key"]) for index in info.values()}
+
+
+async def _missing_indexes(indexes: list) -> list:
+    existing = {}
+    missing = []
+    for collection, keys, options in indexes:
+        if collection not in existing:
+            existing[collection] = await _existing_key_patterns(collection)
+        if _key_pattern(keys) not in existing[collection]:
+            missing.append((collection, keys, options))
+    return missing
+
+
+async def get_applied_versions() -> set:
+    return {doc["_id"] async for doc in migration_collection.find({}, {"_id": 1})}
+
+
+async def run_migrations() -> list:
+    """
+    Uygulanmamış migration'ları sırayla uygular.
+    Bir adım hata verirse (örn: unique index için çift kayıt) durur; sonraki açılışta
+    aynı adımdan tekrar denenir. Returns: bu çalıştırmada uygulanan sürümler
+    """
+    applied = await get_applied_versions()
+    newly_applied = []
+    for migration in MIGRATIONS:
+        if migration["version"] in applied:
+            continue
+        created = []
+        try:
+            for collection, keys, options in await _missing_indexes(migration["indexes"]):
+                name = await db[collection].create_index(keys, background=True, **options)
+                created.append(f"{collection}.{name}")
+        except OperationFailure as e:
+            logger.error(f"❌ Migration v{migration['version']} uygulanamadı: {e}")
+            break
+        await migration_collection.update_one(
+            {"_id": migration["version"]},
+            {"$set": {
+                "description": migration["description"],
+                "created_indexes": created,
+                "applied_at": datetime.datetime.now(datetime.timezone.utc),
+            }},
+            upsert=True
+        )
+        newly_applied.append(migration["version"])
+        logger.info(f"✅ Migration v{migration['version']} uygulandı: {migration['description']} ({len(created)} yeni index)")
+    return newly_applied
+
+
+def _plan_stages(plan: dict) -> list:
+    """Explain winningPlan ağacını düz aşama listesine çevirir (kökten yaprağa)."""
+    stages = []
+    while plan:
+        entry = {"stage": plan.get("stage")}
+        if plan.get("indexName"):
+            entry["index"] = plan["indexName"]
+        stages.append(entry)
+        children = plan.get("inputStages") or []
+        plan = plan.get("inputStage") or (children[0] if children else None)
+    return stages
+
+
+async def _explain(query: dict) -> dict:
+    command = {"find": query["collection"], "filter": query["filter"]}
+    if query.get("sort"):
+        command["sort"] = query["sort"]
+    result = await db.command({"explain": command, "verbosity": "queryPlanner"})
+    planner = result.get("queryPlanner", {})
+    # Sharded/SBE çıktısında plan bir seviye içeride olabilir
+    plan = planner.get("winningPlan", {})
+    stages = _plan_stages(plan.get("queryPlan", plan))
+    return {
+        "name": query["name"],
+        "collection": query["collection"],
+        "stages": stages,
+        "collection_scan": any(stage["stage"] == "COLLSCAN" for stage in stages),
+        "in_memory_sort": any(stage["stage"] == "SORT" for stage in stages),
+    }
+
+
+async def _index_usage(collection: str) -> dict:
+    usage = {}
+    async for stat in db[collection].aggregate([{"$indexStats": {}}]):
+        usage[stat["name"]] = stat.get("accesses", {}).get("ops", 0)
+    return usage
+
+
+async def build_index_report() -> dict:
+    """Migration durumu, eksik index'ler, sıcak sorgu planları ve index kullanım sayıları."""
+    applied = await get_applied_versions()
+    declared = [index for migration in MIGRATIONS for index in migration["indexes"]]
+
+    queries = []
+    for query in HOT_QUERIES:
+        try:
+            queries.append(await _explain(query))
+        except OperationFailure as e:
+            queries.append({"name": query["name"], "collection": query["collection"], "error": str(e)})
+
+    index_usage = {}
+    for collection in sorted({index[0] for index in declared}):
+        try:
+            index_usage[collection] = await _index_usage(collection)
+        except OperationFailure as e:
+            index_usage[collection] = {"error": str(e)}
+
+    return {
+        "applied_versions": sorted(applied),
+        "pending_versions": [m["version"] for m in MIGRATIONS if m["version"] not in applied],
+        "missing_indexes": [
+            {"collection": collection, "keys": keys}
+            for collection, keys, _ in await _missing_indexes(declared)
+        ],
+        "collection_scans": [q["name"] for q in queries if q.get("collection_scan")],
+        "queries": queries,
+        "index_usage": index_usage,
+    }
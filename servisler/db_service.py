@@ -1,13 +1,34 @@
 import os
 import datetime
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo import ReturnDocument
+from pymongo import ReturnDocument, UpdateOne
 
-from config.settings import MONGODB_URL
+from config.settings import (
+    MONGODB_URL,
+    ADDRESS_INDEX_MODE,
+    ADDRESS_INDEX_RELOAD_SECONDS,
+    ADDRESS_BLOOM_PATH,
+    ADDRESS_BLOOM_ERROR_RATE,
+    ADDRESS_BLOOM_MIN_CAPACITY,
+    WALLET_ADDRESSES_LEGACY_FALLBACK,
+    LEDGER_USE_TRANSACTIONS,
+    LEDGER_TIMESERIES_ENABLED,
+)
+from core.cache.address_index import address_index
+from core.cache.lead_cache import lead_cache
+from core.lead.lead_views import LeadWallets
+from core.filter.bloom_filter import BloomFilter
+from core.tokens.token_registry import resolve_token
+from core.comision.calculate_comision import calculate_comision
 
 client = AsyncIOMotorClient(MONGODB_URL)
 db = client.maxipinfo
 cobo_collection = db.COBO
+# Cüzdan adresi → lead eşlemesi (bkz. WALLET ADDRESSES bölümü)
+wallet_address_collection = db.wallet_addresses
+
+# Lead okumalarında varsayılan projection: büyüyen wallets dizisi hariç her şey
+LEAD_BASE_PROJECTION = {"wallets": 0}
 
 
 async def save_lead(lead_data):
@@ -20,24 +41,61 @@ async def save_lead(lead_data):
         {"$set": lead_data},
         upsert=True
     )
+    lead_cache.invalidate(lead_data["tp_number"])
+
+async def get_lead_by_tp(tp_number, view=None):
+    """
+    Lead'i döner (read-through cache: core/cache/lead_cache.py).
 
-async def get_lead_by_tp(tp_number):
-    return await cobo_collection.find_one({"tp_number": str(tp_number)})
+    view: core/lead/lead_views.py'den bir görünüm sınıfı (LeadIdentity, LeadBalance...).
+          Verilirse o görünüm döner; cache kapalıyken sadece görünümün alanları okunur.
+          None ise wallets dizisi HARİÇ lead dict'i döner (cüzdanlar için LeadWallets).
+    """
+    query = {"tp_number": str(tp_number)}
+    if view is not None and not view.CACHED:
+        return view.from_doc(await cobo_collection.find_one(query, view.PROJECTION))
+    if lead_cache.enabled:
+        lead = await lead_cache.get(tp_number, lambda: cobo_collection.find_one(query, LEAD_BASE_PROJECTION))
+    else:
+        lead = await cobo_collection.find_one(query, view.PROJECTION if view else LEAD_BASE_PROJECTION)
+    return lead if view is None else view.from_doc(lead)
 
-async def get_lead_by_address(address):
+async def get_lead_by_address(address, view=None):
     """
-    Cüzdan adresinden hangi lead'e ait olduğunu bulur.
+    Cüzdan adresinden hangi lead'e ait olduğunu bulur (view: get_lead_by_tp ile aynı).
+    Adresin sahibi biliniyorsa lead cache'ten; değilse wallet_addresses üzerinde
+    tek indeksli okuma ($lookup ile lead aynı round-trip'te).
     """
-    return await cobo_collection.find_one({"wallets.address": address})
+    tp_number = lead_cache.owner_of(address)
+    if tp_number is not None:
+        return await get_lead_by_tp(tp_number, view=view)
+    lead = (await get_leads_by_addresses([address])).get(address)
+    return lead if view is None else view.from_doc(lead)
+
+async def get_wallet_by_address(address):
+    """Adresin cüzdan kaydı (tp_number, asset, chain_id, ...) — tek indeksli okuma."""
+    wallet = await wallet_address_collection.find_one({"address": address}, {"_id": 0})
+    if wallet or not WALLET_ADDRESSES_LEGACY_FALLBACK:
+        return wallet
+    lead = LeadWallets.from_doc(
+        await cobo_collection.find_one({"wallets.address": address}, LeadWallets.PROJECTION)
+    )
+    wallet = lead.find(address) if lead else None
+    return dict(wallet, tp_number=lead.tp_number) if wallet else None
 
 async def save_wallet_to_lead(tp_number, wallet_data):
     """
     Oluşturulan cüzdanı lead'e bağlar.
+    Geçiş dönemi: hem eski wallets dizisine hem wallet_addresses'e yazılır (dual-write).
     """
     await cobo_collection.update_one(
         {"tp_number": str(tp_number)},
         {"$push": {"wallets": wallet_data}}
     )
+    await save_wallet_address(tp_number, wallet_data)
+    lead_cache.invalidate(tp_number)
+    # İç transfer tespiti için bellek içi indekse de ekle
+    address_index.add(wallet_data.get("address"))
 
 async def increment_deposit_count(tp_number):
     """
@@ -49,12 +107,22 @@ async def increment_deposit_count(tp_number):
         return_document=True,
         upsert=True
     )
+    lead_cache.invalidate(tp_number)
     return result.get("deposit_count", 1)
 
 async def get_existing_wallet(tp_number, asset_name, chain_id):
     """
     Belirli bir varlık ve ağ için mevcut cüzdanı kontrol eder.
+    (tp_number, asset, chain_id) bileşik indeksi üzerinde tek okuma.
     """
+    wallet = await wallet_address_collection.find_one(
+        {"tp_number": str(tp_number), "asset": asset_name, "chain_id": chain_id},
+        {"_id": 0, "tp_number": 0}
+    )
+    if wallet or not WALLET_ADDRESSES_LEGACY_FALLBACK:
+        return wallet
+
+    # Backfill tamamlanmadan önce oluşturulmuş cüzdanlar için eski dizi sorgusu
     lead = await cobo_collection.find_one({
         "tp_number": str(tp_number),
         "wallets": {
@@ -68,6 +136,7 @@ async def get_existing_wallet(tp_number, asset_name, chain_id):
     if lead and "wallets" in lead:
         for wallet in lead["wallets"]:
             if wallet.get("asset") == asset_name and wallet.get("chain_id") == chain_id:
+                await save_wallet_address(tp_number, wallet)
                 return wallet
     return None
 
@@ -76,7 +145,43 @@ async def get_existing_wallet(tp_number, asset_name, chain_id):
 # İlk importta index'i garantiye al (Async olduğu için event loop içinde çağrılmalı, 
 # ama şimdilik save anında kontrol edeceğiz veya main startup'ta)
 
-from pymongo.errors import DuplicateKeyError
+from pymongo.errors import DuplicateKeyError, BulkWriteError, OperationFailure, CollectionInvalid
+
+# İŞLEM DEFTERİ — db.transactions koleksiyonu
+# Şema: { transaction_id, tp_number, amount (USD, brüt), symbol (Cobo token_id), status,
+#         processed_at, asset, chain, raw_amount, usd_rate, price_age_seconds,
+#         gross_usd, commission_usd, net_usd,
+#         status_history: [{status, at}], mt5_ticket, archived_at }
+# Kayıt işlem kilidiyle aynı upsert'te yazılır (transaction_id unique). Raporlama
+# index'leri: (tp_number, processed_at) ve (symbol, processed_at) — servisler/db_migrations.py
+
+def _ledger_entry(transaction_id, tp_number, amount, symbol, status, now, raw_amount=None,
+                  usd_rate=None, price_age_seconds=None):
+    """
+    Kilit upsert'inin $setOnInsert dokümanı (zengin defter kaydı).
+    usd_rate / price_age_seconds: Çeviride kullanılan kur ve yaşı (kaynak cevap
+    vermediyse bayat fiyat kullanılmış olabilir; stablecoin'de yaş None).
+    """
+    token = resolve_token(symbol)
+    fees = calculate_comision(amount)
+    return {
+        "transaction_id": transaction_id,
+        "tp_number": str(tp_number),
+        "amount": amount,
+        "symbol": symbol,
+        "status": status,
+        "processed_at": now,
+        "asset": token.asset if token else symbol,
+        "chain": token.chain if token else None,
+        "raw_amount": raw_amount,
+        "usd_rate": usd_rate,
+        "price_age_seconds": price_age_seconds,
+        "gross_usd": fees["gross"],
+        "commission_usd": fees["comision"],
+        "net_usd": fees["net"],
+        "status_history": [{"status": status, "at": now}],
+        "mt5_ticket": None,
+    }
 
 async def try_lock_transaction(transaction_id, tp_number, amount, symbol, status):
     """
@@ -95,14 +200,10 @@ async def try_lock_transaction(transaction_id, tp_number, amount, symbol, status
         result = await db.transactions.update_one(
             {"transaction_id": transaction_id},  # Filtre: Bu ID var mı?
             {
-                "$setOnInsert": {  # Sadece yeni kayıt oluşturuluyorsa set et
-                    "transaction_id": transaction_id,
-                    "tp_number": str(tp_number),
-                    "amount": amount,
-                    "symbol": symbol,
-                    "status": status,
-                    "processed_at": datetime.datetime.now()
-                }
+                # Sadece yeni kayıt oluşturuluyorsa set et
+                "$setOnInsert": _ledger_entry(
+                    transaction_id, tp_number, amount, symbol, status, datetime.datetime.now()
+                )
             },
             upsert=True  # Yoksa ekle, varsa dokunma!
         )
@@ -134,18 +235,321 @@ async def update_financial_stats(tp_number, amount, is_deposit=True):
         return_document=ReturnDocument.AFTER,
         upsert=True
     )
+    lead_cache.invalidate(tp_number)
     return result
 
-async def get_all_our_addresses():
-    """Sistemdeki tüm cüzdan adreslerini döner (iç transfer tespiti için)"""
-    addresses = set()
-    cursor = cobo_collection.find({}, {"wallets": 1})
+# Standalone MongoDB'de transaction yok; ilk denemede anlaşılır ve sıralı moda geçilir
+_ledger_transactions_enabled = LEDGER_USE_TRANSACTIONS
+
+async def _write_deposit_ledger(entry, session=None):
+    lock = await db.transactions.update_one(
+        {"transaction_id": entry["transaction_id"]},
+        {"$setOnInsert": entry},
+        upsert=True,
+        session=session
+    )
+    if lock.upserted_id is None:
+        return None
+    return await cobo_collection.find_one_and_update(
+        {"tp_number": entry["tp_number"]},
+        {"$inc": {"total_deposit": entry["amount"], "deposit_count": 1}},
+        projection={"tp_number": 1, "total_deposit": 1, "total_withdrawal": 1, "deposit_count": 1},
+        return_document=ReturnDocument.AFTER,
+        upsert=True,
+        session=session
+    )
+
+async def record_deposit(transaction_id, tp_number, amount, symbol, status, raw_amount=None,
+                         usd_rate=None, price_age_seconds=None):
+    """
+    YATIRIM DEFTERİ YAZIMI (try_lock_transaction + update_financial_stats + increment_deposit_count)
+
+    Kilit upsert'i ve TEK find_one_and_update ($inc total_deposit + deposit_count)
+    bir Mongo transaction'ında çalışır: ya ikisi birden yazılır ya hiçbiri.
+    Kilit alınıp istatistik yazılamadan çökme penceresi kalmaz; hata olursa kilit de
+    geri alınır ve outbox retry'ı yatırımı tekrar işler.
+
+    Replica set yoksa (standalone) aynı iki yazım transaction'sız, sıralı yapılır.
+    amount USD (brüt), raw_amount coin cinsinden gelen miktardır; usd_rate ve
+    price_age_seconds çeviride kullanılan kur ve yaşıdır (deftere yazılır).
+
+    Returns:
+        dict: Güncel lead (tp_number, total_deposit, total_withdrawal, deposit_count)
+        None: İşlem zaten işlenmiş
+    """
+    global _ledger_transactions_enabled
+    entry = _ledger_entry(
+        transaction_id, tp_number, amount, symbol, status, datetime.datetime.now(), raw_amount=raw_amount,
+        usd_rate=usd_rate, price_age_seconds=price_age_seconds
+    )
+    try:
+        lead = None
+        if _ledger_transactions_enabled:
+            try:
+                async with await client.start_session() as session:
+                    lead = await session.with_transaction(
+                        lambda s: _write_deposit_ledger(entry, session=s)
+                    )
+            except OperationFailure as e:
+                if e.code != 20:  # IllegalOperation: replica set / mongos değil
+                    raise
+                _ledger_transactions_enabled = False
+                print(f"⚠️ MongoDB transaction desteklemiyor, defter yazımı sıralı moda geçti: {e}")
+        if not _ledger_transactions_enabled:
+            lead = await _write_deposit_ledger(entry)
+    except DuplicateKeyError:
+        # Eşzamanlı kilit yarışını diğer istek kazandı
+        return None
+    if lead is not None:
+        lead_cache.invalidate(tp_number)
+        await _mirror_ledger_timeseries([entry])
+    return lead
+
+async def get_leads_by_addresses(addresses):
+    """
+    Birden fazla cüzdan adresinin lead'lerini TEK sorgu ile bulur:
+    wallet_addresses.address unique indeksi + COBO.tp_number üzerinden $lookup.
+    Returns: {address: lead (wallets hariç)}  (bulunamayan adresler dict'te yer almaz)
+    """
+    wanted = set(addresses)
+    leads_by_address = {}
+    generation = lead_cache.generation
+    cursor = wallet_address_collection.aggregate([
+        {"$match": {"address": {"$in": list(wanted)}}},
+        {"$lookup": {
+            "from": cobo_collection.name,
+            "localField": "tp_number",
+            "foreignField": "tp_number",
+            "as": "lead",
+        }},
+        {"$project": {"address": 1, "lead": 1}},
+        # Ağır wallets dizisi istemciye gönderilmez
+        {"$project": {"lead.wallets": 0}},
+    ])
     async for doc in cursor:
-        if "wallets" in doc:
-            for wallet in doc["wallets"]:
-                if "address" in wallet:
-                    addresses.add(wallet["address"])
-    return addresses
+        if doc["lead"]:
+            leads_by_address[doc["address"]] = doc["lead"][0]
+
+    missing = wanted - leads_by_address.keys()
+    if missing and WALLET_ADDRESSES_LEGACY_FALLBACK:
+        leads_by_address.update(await _get_leads_by_addresses_legacy(missing))
+    for address, lead in leads_by_address.items():
+        lead_cache.remember(address, lead, generation)
+    return leads_by_address
+
+async def _get_leads_by_addresses_legacy(wanted: set) -> dict:
+    """Eski wallets dizisi sorgusu; bulunanlar wallet_addresses'e de yazılır (kendini onarma)."""
+    leads_by_address = {}
+    cursor = cobo_collection.find({"wallets.address": {"$in": list(wanted)}})
+    async for lead in cursor:
+        for wallet in lead.get("wallets", []):
+            address = wallet.get("address")
+            if address in wanted:
+                await save_wallet_address(lead["tp_number"], wallet)
+                leads_by_address[address] = lead
+    for address, lead in leads_by_address.items():
+        leads_by_address[address] = {k: v for k, v in lead.items() if k != "wallets"}
+    return leads_by_address
+
+async def _write_deposits_bulk(entries, session=None):
+    """
+    Kilitler (tek unordered bulk_write) + kilidi alınan yatırımların istatistikleri
+    (tek bulk_write). Returns: kilidi BİZİM aldığımız entry index'leri
+    """
+    operations = [
+        UpdateOne({"transaction_id": entry["transaction_id"]}, {"$setOnInsert": entry}, upsert=True)
+        for entry in entries
+    ]
+    try:
+        result = await db.transactions.bulk_write(operations, ordered=False, session=session)
+        claimed = sorted(result.upserted_ids.keys())
+    except BulkWriteError as e:
+        # Eşzamanlı upsert yarışında unique index duplicate hatası verebilir;
+        # bu kayıtları başkası kilitlemiştir. Diğer hatalar kritik. Transaction içinde
+        # hata transaction'ı geçersiz kılar: yukarı fırlatılır, çağıran tekrar dener.
+        details = e.details or {}
+        if session is not None or any(err.get("code") != 11000 for err in details.get("writeErrors", [])):
+            raise
+        claimed = sorted(item["index"] for item in details.get("upserted", []))
+
+    increments = {}
+    for index in claimed:
+        entry = entries[index]
+        amount, count = increments.get(entry["tp_number"], (0.0, 0))
+        increments[entry["tp_number"]] = (amount + entry["amount"], count + 1)
+    if increments:
+        await cobo_collection.bulk_write([
+            UpdateOne(
+                {"tp_number": tp_number},
+                {"$inc": {"total_deposit": amount, "deposit_count": count}},
+                upsert=True
+            )
+            for tp_number, (amount, count) in increments.items()
+        ], ordered=False, session=session)
+    return claimed
+
+async def record_deposits_bulk(locks):
+    """
+    record_deposit'in toplu versiyonu (try_lock_transactions_bulk + apply_deposit_stats_bulk):
+    kilitler ve total_deposit / deposit_count artışları TEK Mongo transaction'ında yazılır.
+    İkisi arasında çökme/hata olursa kilitler de geri alınır; outbox retry'ı yatırımları
+    tekrar işler (kilit alınmış ama istatistiği yazılmamış yatırım kalmaz).
+
+    Replica set yoksa (standalone, code 20) record_deposit gibi sıralı moda düşer.
+
+    locks: [{"transaction_id", "tp_number", "amount", "symbol", "status",
+             "raw_amount", "usd_rate", "price_age_seconds"}, ...]
+    Returns: (kilidi BİZİM aldığımız transaction_id set'i,
+              {tp_number: güncel lead (total_deposit, total_withdrawal, deposit_count)})
+    """
+    global _ledger_transactions_enabled
+    now = datetime.datetime.now()
+    entries = [
+        _ledger_entry(
+            lock["transaction_id"], lock["tp_number"], lock["amount"], lock["symbol"], lock["status"],
+            now, raw_amount=lock.get("raw_amount"), usd_rate=lock.get("usd_rate"),
+            price_age_seconds=lock.get("price_age_seconds")
+        )
+        for lock in locks
+    ]
+    claimed = None
+    if _ledger_transactions_enabled:
+        try:
+            async with await client.start_session() as session:
+                claimed = await session.with_transaction(
+                    lambda s: _write_deposits_bulk(entries, session=s)
+                )
+        except BulkWriteError:
+            # BulkWriteError, OperationFailure'ın alt sınıfı: önce yakalanmalı.
+            # Eşzamanlı kilit yarışı transaction'ı iptal etti; kazanılan kilitler artık
+            # mevcut, tekrar denemede sadece bizimkiler upsert edilir
+            async with await client.start_session() as session:
+                claimed = await session.with_transaction(
+                    lambda s: _write_deposits_bulk(entries, session=s)
+                )
+        except OperationFailure as e:
+            if e.code != 20:  # IllegalOperation: replica set / mongos değil
+                raise
+            _ledger_transactions_enabled = False
+            print(f"⚠️ MongoDB transaction desteklemiyor, defter yazımı sıralı moda geçti: {e}")
+    if claimed is None:
+        claimed = await _write_deposits_bulk(entries)
+
+    claimed_entries = [entries[index] for index in claimed]
+    tp_numbers = {entry["tp_number"] for entry in claimed_entries}
+    lead_cache.invalidate_many(tp_numbers)
+    await _mirror_ledger_timeseries(claimed_entries)
+
+    updated = {}
+    if tp_numbers:
+        cursor = cobo_collection.find(
+            {"tp_number": {"$in": list(tp_numbers)}},
+            {"tp_number": 1, "total_deposit": 1, "total_withdrawal": 1, "deposit_count": 1}
+        )
+        async for lead in cursor:
+            updated[lead["tp_number"]] = lead
+    return {entry["transaction_id"] for entry in claimed_entries}, updated
+
+async def _iter_wallet_addresses():
+    """
+    Tüm cüzdan adreslerini akıtır. Geçiş bitene kadar (fallback açık) kaynak eski
+    wallets dizileridir; sonrasında wallet_addresses koleksiyonu.
+    """
+    if not WALLET_ADDRESSES_LEGACY_FALLBACK:
+        async for doc in wallet_address_collection.find({}, {"_id": 0, "address": 1}):
+            yield doc["address"]
+        return
+    async for doc in cobo_collection.find({}, {"wallets.address": 1}):
+        for wallet in doc.get("wallets", []):
+            if wallet.get("address"):
+                yield wallet["address"]
+
+async def get_all_our_addresses():
+    """Sistemdeki tüm cüzdan adreslerini döner (adres indeksini yüklemek için)"""
+    return {address async for address in _iter_wallet_addresses()}
+
+async def count_wallet_addresses() -> int:
+    """Toplam cüzdan sayısı (Bloom filtresi boyutlandırması için)"""
+    if not WALLET_ADDRESSES_LEGACY_FALLBACK:
+        return await wallet_address_collection.estimated_document_count()
+    result = await cobo_collection.aggregate([
+        {"$project": {"n": {"$size": {"$ifNull": ["$wallets", []]}}}},
+        {"$group": {"_id": None, "total": {"$sum": "$n"}}},
+    ]).to_list(1)
+    return result[0]["total"] if result else 0
+
+async def address_exists(address: str) -> bool:
+    """Adres herhangi bir lead'in cüzdanı mı? (Bloom pozitiflerinin kesin kontrolü)"""
+    if await wallet_address_collection.find_one({"address": address}, {"_id": 1}) is not None:
+        return True
+    if not WALLET_ADDRESSES_LEGACY_FALLBACK:
+        return False
+    return await cobo_collection.find_one({"wallets.address": address}, {"_id": 1}) is not None
+
+async def _build_address_bloom() -> BloomFilter:
+    """Adresleri set'te biriktirmeden, cursor'dan akıtarak Bloom filtresi kurar."""
+    capacity = max(await count_wallet_addresses() * 2, ADDRESS_BLOOM_MIN_CAPACITY)
+    bloom = BloomFilter.for_capacity(capacity, ADDRESS_BLOOM_ERROR_RATE)
+    async for address in _iter_wallet_addresses():
+        bloom.add(address)
+    return bloom
+
+def _is_bloom_file_fresh(path: str) -> bool:
+    """Başka bir process yakın zamanda kurduysa yeniden kurmaya gerek yok."""
+    if ADDRESS_INDEX_RELOAD_SECONDS <= 0 or not os.path.exists(path):
+        return False
+    return (datetime.datetime.now().timestamp() - os.path.getmtime(path)) < ADDRESS_INDEX_RELOAD_SECONDS
+
+async def load_address_index() -> int:
+    """Adres indeksini COBO koleksiyonundan (yeniden) yükler. Returns: adres sayısı"""
+    if ADDRESS_INDEX_MODE != "bloom":
+        address_index.load(await get_all_our_addresses())
+        return len(address_index)
+
+    # Her kurulum yeni sürüm dosyası yazar; açık (mmap'li) dosyaya dokunulmaz, eski
+    # filtre load_bloom'da yenisi yerleşince kapatılır
+    bloom = None
+    latest = BloomFilter.latest_version(ADDRESS_BLOOM_PATH)
+    if latest and _is_bloom_file_fresh(latest):
+        try:
+            bloom = BloomFilter.open_shared(latest)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Bloom dosyası açılamadı, yeniden kuruluyor: {e}")
+    if bloom is None:
+        bloom = await _build_address_bloom()
+        try:
+            bloom = BloomFilter.open_shared(bloom.save(ADDRESS_BLOOM_PATH))
+        except OSError as e:
+            # Paylaşılamadı (örn: disk hatası); bu process kendi kopyasını kullanır
+            print(f"⚠️ Bloom dosyası yazılamadı, bellek içi filtre kullanılıyor: {e}")
+    address_index.load_bloom(bloom)
+    return len(address_index)
+
+async def is_our_address(address: str) -> bool:
+    """
+    Adres bizim müşteri cüzdanlarımızdan biri mi? (bellek içi, O(1))
+    Bloom modunda "belki" cevabı Mongo'da doğrulanır.
+    İndeks henüz yüklenmediyse (örn: CLI backfill) ilk çağrıda yüklenir.
+    """
+    if not address_index.loaded:
+        await load_address_index()
+    verdict = address_index.lookup(address)
+    if verdict is None:
+        verdict = await address_exists(address)
+        if verdict:
+            address_index.add(address)
+    return verdict
+
+def watch_lead_wallets(resume_after=None):
+    """
+    COBO koleksiyonundaki lead ekleme/güncellemelerini izleyen change stream.
+    Replica set gerektirir (Atlas). async with ... as stream: async for change in stream
+    """
+    return cobo_collection.watch(
+        [{"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}}],
+        full_document="updateLookup",
+        resume_after=resume_after,
+    )
 
 async def ensure_transaction_index():
     """
@@ -170,6 +574,561 @@ async def ensure_transaction_index():
              print(f"❌ Index Hatası: {e}")
 
 
+# ============================================================
+# WEBHOOK OUTBOX — db.webhook_outbox koleksiyonu
+# Şema: { event_id, payload, status, priority, attempts, available_at, due_at,
+#         lease_until, worker_id, last_error, created_at, acked_at }
+# status: pending → processing → done | failed
+# ============================================================
+
+webhook_outbox_collection = db.webhook_outbox
+
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+async def enqueue_webhook_event(payload: dict, priority: int = 2, priority_delay_seconds: float = 0) -> str:  # 2 = NORMAL
+    """
+    Ham Cobo webhook payload'ını outbox'a 'pending' olarak yazar.
+    due_at = available_at + priority_delay_seconds (core/transaction/priority.py)
+    Returns: Eklenen belgenin string ObjectId'si
+    """
+    now = _utcnow()
+    result = await webhook_outbox_collection.insert_one({
+        "event_id": payload.get("event_id"),
+        "payload": payload,
+        "status": "pending",
+        "priority": priority,
+        "attempts": 0,
+        "available_at": now,
+        "due_at": now + datetime.timedelta(seconds=priority_delay_seconds),
+        "lease_until": None,
+        "created_at": now,
+    })
+    return str(result.inserted_id)
+
+
+async def claim_webhook_event(worker_id: str, lease_seconds: int) -> dict | None:
+    """
+    Sıradaki işlenebilir olayı atomik olarak kiralar (lease).
+    'pending' olanlar veya lease süresi dolmuş 'processing' olanlar alınabilir.
+    En küçük due_at önce alınır (öncelik + yaşlanma).
+    Kiralanacak olay yoksa None döner.
+    """
+    now = _utcnow()
+    return await webhook_outbox_collection.find_one_and_update(
+        {
+            "$or": [
+                {"status": "pending", "available_at": {"$lte": now}},
+                {"status": "processing", "lease_until": {"$lt": now}},
+            ]
+        },
+        {
+            "$set": {
+                "status": "processing",
+                "lease_until": now + datetime.timedelta(seconds=lease_seconds),
+                "worker_id": worker_id,
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("due_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def ack_webhook_event(outbox_id):
+    """Başarıyla işlenen olayı 'done' olarak işaretler (TTL index ile sonra silinir)."""
+    await webhook_outbox_collection.update_one(
+        {"_id": outbox_id},
+        {"$set": {"status": "done", "acked_at": _utcnow(), "lease_until": None}}
+    )
+
+
+async def release_webhook_event(
+    outbox_id,
+    error: str,
+    retry_in_seconds: float,
+    dead: bool = False,
+    priority_delay_seconds: float = 0
+):
+    """
+    Hata alan olayın kirasını bırakır.
+    dead=True ise 'failed' olarak işaretlenir ve bir daha denenmez.
+    """
+    available_at = _utcnow() + datetime.timedelta(seconds=retry_in_seconds)
+    await webhook_outbox_collection.update_one(
+        {"_id": outbox_id},
+        {"$set": {
+            "status": "failed" if dead else "pending",
+            "available_at": available_at,
+            "due_at": available_at + datetime.timedelta(seconds=priority_delay_seconds),
+            "lease_until": None,
+            "last_error": error[:500],
+        }}
+    )
+
+
+async def recover_webhook_outbox() -> int:
+    """
+    Startup'ta çağrılır: önceki process'ten kalan 'processing' kayıtlarını
+    tekrar 'pending' yapar. (API tek instance çalışır — ecosystem.config.js)
+    Returns: Kurtarılan kayıt sayısı
+    """
+    result = await webhook_outbox_collection.update_many(
+        {"status": "processing"},
+        {"$set": {"status": "pending", "available_at": _utcnow(), "lease_until": None}}
+    )
+    return result.modified_count
+
+
+async def count_pending_webhook_events() -> int:
+    """İşlenmeyi bekleyen (pending + processing) olay sayısını döner."""
+    return await webhook_outbox_collection.count_documents(
+        {"status": {"$in": ["pending", "processing"]}}
+    )
+
+
+async def ensure_webhook_outbox_indexes(retention_hours: int):
+    """
+    Outbox sorguları için index'leri oluşturur.
+    acked_at üzerindeki TTL index, işlenmiş kayıtları retention süresi sonunda siler.
+    """
+    await webhook_outbox_collection.create_index([("status", 1), ("available_at", 1)])
+    await webhook_outbox_collection.create_index([("status", 1), ("lease_until", 1)])
+    await webhook_outbox_collection.create_index([("status", 1), ("due_at", 1)])
+    await webhook_outbox_collection.create_index(
+        "acked_at", expireAfterSeconds=retention_hours * 3600
+    )
+
+
+# ============================================================
+# WEBHOOK DEDUP — db.webhook_dedup koleksiyonu (opsiyonel, çoklu worker)
+# Şema: { _id: dedup anahtarı, created_at }
+# ============================================================
+
+webhook_dedup_collection = db.webhook_dedup
+
+
+async def is_webhook_seen(keys: list) -> bool:
+    """Verilen dedup anahtarlarından herhangi biri daha önce kaydedilmiş mi?"""
+    doc = await webhook_dedup_collection.find_one({"_id": {"$in": keys}}, {"_id": 1})
+    return doc is not None
+
+
+async def mark_webhook_seen(keys: list):
+    """Dedup anahtarlarını kaydeder. Zaten var olanlar sessizce atlanır."""
+    now = _utcnow()
+    try:
+        await webhook_dedup_collection.insert_many(
+            [{"_id": key, "created_at": now} for key in keys],
+            ordered=False
+        )
+    except BulkWriteError:
+        # Duplicate key hataları beklenen durumdur
+        pass
+
+
+async def ensure_webhook_dedup_indexes(ttl_seconds: int):
+    """Dedup kayıtlarını TTL süresi sonunda otomatik siler."""
+    await webhook_dedup_collection.create_index("created_at", expireAfterSeconds=ttl_seconds)
+
+
+# ============================================================
+# BACKFILL CHECKPOINT — db.backfill_checkpoints koleksiyonu
+# Şema: { _id: job adı, since, until, window_start, after, processed,
+#         failed, failed_ids (outbox'ta yeniden denenen), started_at, updated_at, finished_at }
+# ============================================================
+
+backfill_checkpoint_collection = db.backfill_checkpoints
+
+
+async def get_backfill_checkpoint(name: str) -> dict | None:
+    """Kaldığı yerden devam için kayıtlı checkpoint'i döner."""
+    return await backfill_checkpoint_collection.find_one({"_id": name})
+
+
+async def save_backfill_checkpoint(name: str, fields: dict):
+    """Checkpoint'i günceller (yoksa oluşturur)."""
+    fields = dict(fields, updated_at=_utcnow())
+    await backfill_checkpoint_collection.update_one(
+        {"_id": name},
+        {"$set": fields},
+        upsert=True
+    )
+
+
+# ============================================================
+# WALLET ADDRESSES — db.wallet_addresses koleksiyonu
+# Şema: { address (unique), tp_number, asset, chain_id, created_at, ... }
+# Eskiden adresler lead dokümanındaki büyüyen wallets dizisinde aranıyordu.
+# Geçiş: save_wallet_to_lead iki yere yazar; okumalar önce bu koleksiyona bakar,
+# WALLET_ADDRESSES_LEGACY_FALLBACK=true iken bulamazsa eski diziye düşer.
+# backfill_wallet_addresses bittikten sonra fallback kapatılabilir.
+# Index'ler: servisler/db_migrations.py (v2)
+# ============================================================
+
+
+async def save_wallet_address(tp_number, wallet_data: dict):
+    """Cüzdanı wallet_addresses'e yazar (idempotent; mevcut kayıt değişmez)."""
+    if not wallet_data.get("address"):
+        return
+    try:
+        await wallet_address_collection.update_one(
+            {"address": wallet_data["address"]},
+            {"$setOnInsert": dict(wallet_data, tp_number=str(tp_number))},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # Eşzamanlı upsert yarışı: kaydı diğer istek oluşturdu
+        pass
+
+
+async def backfill_wallet_addresses(batch_size: int = 1000) -> int:
+    """
+    Tek seferlik geçiş: tüm lead'lerin wallets dizilerini wallet_addresses'e kopyalar.
+    Tekrar çalıştırmak güvenlidir ($setOnInsert). Returns: yeni eklenen kayıt sayısı
+    """
+    inserted = 0
+    operations = []
+
+    async def flush():
+        nonlocal inserted
+        try:
+            result = await wallet_address_collection.bulk_write(operations, ordered=False)
+            inserted += result.upserted_count
+        except BulkWriteError as e:
+            # Aynı adres iki lead'de ise ilk yazılan kalır; diğer hatalar kritik
+            details = e.details or {}
+            if any(err.get("code") != 11000 for err in details.get("writeErrors", [])):
+                raise
+            inserted += details.get("nUpserted", 0)
+        operations.clear()
+
+    async for lead in cobo_collection.find({"wallets.0": {"$exists": True}}, {"tp_number": 1, "wallets": 1}):
+        for wallet in lead["wallets"]:
+            if not wallet.get("address"):
+                continue
+            operations.append(UpdateOne(
+                {"address": wallet["address"]},
+                {"$setOnInsert": dict(wallet, tp_number=str(lead["tp_number"]))},
+                upsert=True
+            ))
+            if len(operations) >= batch_size:
+                await flush()
+    if operations:
+        await flush()
+    return inserted
+
+
+# ============================================================
+# İŞLEM DURUM MAKİNESİ — db.transaction_states koleksiyonu
+# Şema: { _id: transaction_id, status, rank, settled, updated_at }
+# rank: Görülen en yüksek durumun sırası (core/transaction/transaction_status.py)
+# settled: Terminal durum pipeline'dan başarıyla geçti
+# ============================================================
+
+transaction_state_collection = db.transaction_states
+
+
+async def advance_transaction_state(transaction_id: str, status: str, rank: int, allow_equal: bool = False) -> bool:
+    """
+    İşlemin durumunu TEK round-trip ile ileri taşır.
+    Kayıtlı rank daha yüksekse (veya allow_equal=False iken eşitse) ya da işlem
+    settled ise hiçbir şey yazılmaz.
+
+    Returns:
+        bool: True = durum ilerledi, False = olay eskimiş/gereksiz
+    """
+    rank_condition = {"$lte": rank} if allow_equal else {"$lt": rank}
+    now = _utcnow()
+    for _ in range(2):
+        try:
+            await transaction_state_collection.update_one(
+                {"_id": transaction_id, "settled": {"$ne": True}, "rank": rank_condition},
+                {
+                    "$set": {"status": status, "rank": rank, "updated_at": now},
+                    "$setOnInsert": {"settled": False},
+                },
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            # Filtre eşleşmedi ve upsert mevcut _id'ye çarptı → olay eskimiş.
+            # Eşzamanlı iki ilk upsert'te de bu hata gelir; bir kez daha denenir.
+            continue
+    return False
+
+
+async def settle_transaction_state(transaction_id: str, status: str):
+    """Terminal durumun pipeline'dan geçtiğini işaretler."""
+    await transaction_state_collection.update_one(
+        {"_id": transaction_id},
+        {"$set": {"settled": True, "status": status, "updated_at": _utcnow()}},
+        upsert=True
+    )
+
+
+async def ensure_transaction_state_indexes(retention_days: int):
+    """Durum kayıtlarını son güncellemeden retention_days sonra siler."""
+    await transaction_state_collection.create_index(
+        "updated_at", expireAfterSeconds=retention_days * 86400
+    )
+
+
+# ============================================================
+# FİYAT SNAPSHOT'I — db.price_snapshots koleksiyonu
+# Şema: { _id: "latest", prices: {asset: {usd, fetched_at (epoch)}}, updated_at }
+# Yeniden başlatmadan sonra ilk çevirilerin ağ beklememesi için son fiyatlar
+# ============================================================
+
+price_snapshot_collection = db.price_snapshots
+
+
+async def save_price_snapshot(entries: dict):
+    """entries: {asset: (usd, fetched_at epoch)} — price_cache.entries()"""
+    await price_snapshot_collection.update_one(
+        {"_id": "latest"},
+        {"$set": {
+            "prices": {asset: {"usd": usd, "fetched_at": fetched_at} for asset, (usd, fetched_at) in entries.items()},
+            "updated_at": _utcnow(),
+        }},
+        upsert=True
+    )
+
+
+async def load_price_snapshot() -> dict:
+    """Son snapshot: {asset: (usd, fetched_at epoch)} (yoksa boş)."""
+    doc = await price_snapshot_collection.find_one({"_id": "latest"})
+    if not doc:
+        return {}
+    return {
+        asset: (quote["usd"], quote["fetched_at"])
+        for asset, quote in doc.get("prices", {}).items()
+        if quote.get("usd") and quote.get("fetched_at")
+    }
+
+
+# ============================================================
+# FİYAT GEÇMİŞİ — db.price_bars koleksiyonu
+# Şema: { _id: "<asset>:<dakika>", asset, minute (epoch // 60), usd, at (bar zamanı) }
+# Dakikalık barların (core/currency/price_history.py) kalıcı kopyası: yeniden başlatmadan
+# sonra replay/backfill yine işlem anındaki fiyatla çevrilir. at üzerinde TTL index.
+# ============================================================
+
+price_bar_collection = db.price_bars
+
+
+async def save_price_bars(prices: dict, minute: int):
+    """
+    prices: {asset: usd} — minute (epoch // 60) barına yazılır. Aynı dakikadaki sonraki
+    yazım üstüne yazar; dakika bitince son değer barın kapanış fiyatı olarak kalır.
+    """
+    at = datetime.datetime.fromtimestamp(minute * 60, datetime.timezone.utc)
+    operations = [
+        UpdateOne(
+            {"_id": f"{asset}:{minute}"},
+            {"$set": {"asset": asset, "minute": minute, "usd": float(usd), "at": at}},
+            upsert=True
+        )
+        for asset, usd in prices.items()
+        if usd and usd > 0
+    ]
+    if operations:
+        await price_bar_collection.bulk_write(operations, ordered=False)
+
+
+async def load_price_bars(since_minute: int) -> list:
+    """since_minute'ten itibaren tüm barlar, dakikaya göre artan: [(asset, minute, usd)]"""
+    since = datetime.datetime.fromtimestamp(since_minute * 60, datetime.timezone.utc)
+    cursor = price_bar_collection.find(
+        {"at": {"$gte": since}}, {"_id": 0, "asset": 1, "minute": 1, "usd": 1}
+    ).sort("at", 1)
+    return [(doc["asset"], doc["minute"], doc["usd"]) async for doc in cursor]
+
+
+async def find_price_bar(asset: str, at: float, max_gap_seconds: float):
+    """
+    `at` (epoch saniye) anına en yakın kalıcı bar: (fiyat, uzaklık saniye) veya None.
+    PriceHistory.lookup ile aynı kural; bellekte bar yoksa kullanılır.
+    """
+    minute = at / 60
+    candidates = [
+        await price_bar_collection.find_one(
+            {"asset": asset, "minute": {"$lte": minute}}, sort=[("minute", -1)]
+        ),
+        await price_bar_collection.find_one(
+            {"asset": asset, "minute": {"$gt": minute}}, sort=[("minute", 1)]
+        ),
+    ]
+    best = None
+    for doc in candidates:
+        if doc is not None:
+            gap = abs(at - doc["minute"] * 60)
+            if best is None or gap < best[1]:
+                best = (doc["usd"], gap)
+    if best is None or best[1] > max_gap_seconds:
+        return None
+    return best
+
+
+async def ensure_price_bar_indexes(retention_minutes: int):
+    """Bar araması için (asset, minute) index'i; barlar retention_minutes sonra silinir."""
+    await price_bar_collection.create_index([("asset", 1), ("minute", 1)])
+    await price_bar_collection.create_index("at", expireAfterSeconds=retention_minutes * 60)
+
+
+# ============================================================
+# İŞLEM DEFTERİ: DURUM ZAMAN ÇİZELGESİ, RAPORLAR, ARŞİV
+# db.transactions şeması için bkz. _ledger_entry.
+# db.transactions_archive: Arşivlenen kayıtların tam hali (aynı _id)
+# db.ledger_timeseries (opsiyonel, time-series): { processed_at, meta: {tp_number,
+#   asset, chain}, transaction_id, raw_amount, gross_usd, commission_usd, net_usd }
+# ============================================================
+
+ledger_archive_collection = db.transactions_archive
+ledger_timeseries_collection = db.ledger_timeseries
+
+# Arşivlenince transactions'tan kaldırılan detay alanları. Kilit (transaction_id),
+# rapor index alanları (tp_number, symbol, processed_at, amount, status) ve rapor
+# tutarları (gross_usd, commission_usd, net_usd) kalır: eski bir işlemin tekrar gelmesi
+# yine reddedilir, summarize_ledger arşivlenmiş dönemlerde de doğru net toplam verir.
+LEDGER_ARCHIVED_FIELDS = (
+    "asset", "chain", "raw_amount", "usd_rate", "price_age_seconds", "status_history", "mt5_ticket",
+)
+
+
+async def append_ledger_status(transaction_id: str, status: str, **fields):
+    """Defter kaydının zaman çizelgesine durum ekler (örn: mt5_credited + mt5_ticket)."""
+    update = {"$push": {"status_history": {"status": status, "at": datetime.datetime.now()}}}
+    if fields:
+        update["$set"] = fields
+    await db.transactions.update_one({"transaction_id": transaction_id}, update)
+
+
+async def get_ledger_entries(tp_number=None, symbol=None, since=None, until=None, limit: int = 100) -> list:
+    """
+    Müşteri veya token bazında defter kayıtları (yeniden eskiye).
+    (tp_number, processed_at) / (symbol, processed_at) index'lerini kullanır.
+    Arşivlenmiş kayıtların (archived_at) detay alanları transactions_archive'dan
+    tek sorguyla tamamlanır.
+    """
+    query = {}
+    if tp_number is not None:
+        query["tp_number"] = str(tp_number)
+    if symbol:
+        query["symbol"] = symbol
+    if since or until:
+        query["processed_at"] = {}
+        if since:
+            query["processed_at"]["$gte"] = since
+        if until:
+            query["processed_at"]["$lt"] = until
+    entries = await db.transactions.find(query).sort("processed_at", -1).limit(limit).to_list(length=limit)
+    archived_ids = [entry["_id"] for entry in entries if entry.get("archived_at")]
+    if archived_ids:
+        details = {
+            doc["_id"]: doc
+            async for doc in ledger_archive_collection.find({"_id": {"$in": archived_ids}})
+        }
+        entries = [dict(details.get(entry["_id"], {}), **entry) for entry in entries]
+    for entry in entries:
+        entry.pop("_id", None)
+    return entries
+
+
+async def summarize_ledger(tp_number=None, since=None, until=None) -> list:
+    """Varlık bazında toplam yatırım (adet, brüt/net USD); tp_number verilirse tek müşteri."""
+    match = {}
+    if tp_number is not None:
+        match["tp_number"] = str(tp_number)
+    if since or until:
+        match["processed_at"] = {}
+        if since:
+            match["processed_at"]["$gte"] = since
+        if until:
+            match["processed_at"]["$lt"] = until
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": "$symbol",
+            "count": {"$sum": 1},
+            "gross_usd": {"$sum": "$amount"},
+            "net_usd": {"$sum": {"$ifNull": ["$net_usd", "$amount"]}},
+        }},
+        {"$sort": {"gross_usd": -1}},
+    ]
+    return [
+        {"symbol": row["_id"], "count": row["count"], "gross_usd": row["gross_usd"], "net_usd": row["net_usd"]}
+        async for row in db.transactions.aggregate(pipeline)
+    ]
+
+
+async def _mirror_ledger_timeseries(entries: list):
+    """Kredilenen yatırımları analitik time-series koleksiyonuna yazar (hata yazımı engellemez)."""
+    if not LEDGER_TIMESERIES_ENABLED or not entries:
+        return
+    try:
+        await ledger_timeseries_collection.insert_many([
+            {
+                "processed_at": entry["processed_at"],
+                "meta": {"tp_number": entry["tp_number"], "asset": entry["asset"], "chain": entry["chain"]},
+                "transaction_id": entry["transaction_id"],
+                "raw_amount": entry["raw_amount"],
+                "gross_usd": entry["gross_usd"],
+                "commission_usd": entry["commission_usd"],
+                "net_usd": entry["net_usd"],
+            }
+            for entry in entries
+        ], ordered=False)
+    except Exception as e:
+        print(f"⚠️ Defter time-series yazımı başarısız: {e}")
+
+
+async def ensure_ledger_timeseries(retention_days: int):
+    """db.ledger_timeseries'i time-series koleksiyonu olarak oluşturur (MongoDB 5.0+)."""
+    options = {"timeseries": {"timeField": "processed_at", "metaField": "meta", "granularity": "minutes"}}
+    if retention_days > 0:
+        options["expireAfterSeconds"] = retention_days * 86400
+    try:
+        await db.create_collection("ledger_timeseries", **options)
+        print("✅ Defter time-series koleksiyonu oluşturuldu: ledger_timeseries")
+    except CollectionInvalid:
+        pass  # Zaten var
+
+
+async def archive_ledger_entries(older_than_days: int, batch_size: int = 1000) -> int:
+    """
+    processed_at'i older_than_days günden eski kayıtların tam halini
+    transactions_archive'a kopyalar, transactions'ta detay alanlarını kaldırır.
+    Yarıda kesilirse tekrar çalıştırmak güvenlidir (arşivde aynı _id).
+
+    Returns: Arşivlenen kayıt sayısı
+    """
+    cutoff = datetime.datetime.now() - datetime.timedelta(days=older_than_days)
+    archived = 0
+    while True:
+        docs = await db.transactions.find(
+            {"processed_at": {"$lt": cutoff}, "archived_at": {"$exists": False}}
+        ).limit(batch_size).to_list(length=batch_size)
+        if not docs:
+            return archived
+        try:
+            await ledger_archive_collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            details = e.details or {}
+            if any(err.get("code") != 11000 for err in details.get("writeErrors", [])):
+                raise
+        await db.transactions.update_many(
+            {"_id": {"$in": [doc["_id"] for doc in docs]}},
+            {
+                "$set": {"archived_at": datetime.datetime.now()},
+                "$unset": {field: "" for field in LEDGER_ARCHIVED_FIELDS},
+            }
+        )
+        archived += len(docs)
+
+
 # ============================================================
 # IBAN YÖNETİMİ — db.ibans koleksiyonu
 # Şema: { bank_name, iban, account_holder, is_active, created_at, updated_at }
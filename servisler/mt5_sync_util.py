@@ -3,6 +3,7 @@ import time
 import logging
 from servisler.mt5service import MT5UserManager
 from servisler.db_service import save_lead, get_lead_by_tp
+from core.lead.lead_views import LeadFinancials
 
 logger = logging.getLogger(__name__)
 
@@ -30,8 +31,8 @@ async def force_sync_single_user(tp_number: str) -> bool:
                 total_dep, total_with = manager.get_financial_summary(tp_number)
                 
                 # Mevcut lead'i kontrol et (Yatırım sayısını korumak için)
-                existing_lead = await get_lead_by_tp(tp_number)
-                deposit_count = existing_lead.get("deposit_count", 0) if existing_lead else 0
+                existing_lead = await get_lead_by_tp(tp_number, view=LeadFinancials)
+                deposit_count = existing_lead.deposit_count if existing_lead else 0
                 
                 # Eğer geçmişte bakiye hareketleri varsa ve deposit_count 0 ise güncelle
                 if total_dep > 0 and deposit_count == 0:
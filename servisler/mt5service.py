@@ -15,6 +15,7 @@ class MT5UserManager:
         self.login = int(login)
         self.password = password
         self.manager = None
+        self.last_ticket = None  # Son başarılı DealerBalance'ın ticket'ı (dönerse)
     
     def connect(self):
         """MT5'e bağlan"""
@@ -92,6 +93,7 @@ class MT5UserManager:
             # DealerBalance çağrısı
             # Parametreler: (Login, Tutar, Tip, Yorum)
             # Tip 2 = DEAL_BALANCE (Bakiye Ekleme/Çıkarma)
+            self.last_ticket = None
             result = self.manager.DealerBalance(int(user_login), float(amount), 2, comment)
             
             print(f"ℹ️ MT5 DealerBalance Sonucu (Raw): {result} (Type: {type(result)})")
@@ -105,6 +107,7 @@ class MT5UserManager:
                 # Pozitif tamsayı döndüyse Ticket ID'dir ve başarılıdır
                 is_success = result > 0
                 if is_success:
+                    self.last_ticket = result
                     print(f"✅ İşlem Başarılı! Ticket ID: {result}")
             
             if is_success:
@@ -125,16 +125,22 @@ class CoboSweepService:
         except Exception as e:
             return {"success": False, "error": str(e)}
 
-    def list_transactions(self, wallet_id, limit=10):
+    def list_transactions(self, wallet_id, limit=10, after=None, types=None,
+                          min_created_timestamp=None, max_created_timestamp=None,
+                          direction=None):
         """
         Son işlemleri listele
         
         Args:
             wallet_id: Wallet ID
-            limit: Maksimum kayıt sayısı
+            limit: Maksimum kayıt sayısı (Cobo: 1-50)
+            after: Sonraki sayfa cursor'ı (önceki yanıtın pagination.after değeri)
+            types: Virgülle ayrılmış işlem tipleri (örn: "Deposit")
+            min_created_timestamp / max_created_timestamp: ms cinsinden zaman aralığı (en fazla 90 gün)
+            direction: "ASC" veya "DESC"
         
         Returns:
-            İşlem listesi
+            İşlem listesi (data + pagination)
         """
         try:
             with ApiClient(self.configuration) as api_client:
@@ -143,7 +149,12 @@ class CoboSweepService:
                 
                 result = api_instance.list_transactions(
                     wallet_ids=wallet_id,
-                    limit=limit
+                    limit=limit,
+                    after=after,
+                    types=types,
+                    min_created_timestamp=min_created_timestamp,
+                    max_created_timestamp=max_created_timestamp,
+                    direction=direction
                 )
                 return {"success": True, "data": result.to_dict()}
         except Exception as e:
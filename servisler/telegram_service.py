@@ -11,7 +11,7 @@ Parse mode: HTML — <b>, <code>, <i> tag'leri desteklenir.
 import logging
 import threading
 import requests
-from config.settings import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
+from config.settings import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, PRICE_MAX_STALENESS_SECONDS
 from core.comision.calculate_comision import COMISION_RATE
 
 logger = logging.getLogger(__name__)
@@ -47,10 +47,24 @@ def send_telegram_msg(message: str):
     t.start()
 
 
+def _format_price_age(price_age_seconds) -> str:
+    """Onay mesajı için kur yaşı satırı; PRICE_MAX_STALENESS_SECONDS'tan eski kur ayrıca uyarılır."""
+    if price_age_seconds is None:
+        return ""
+    if price_age_seconds < 60:
+        age_text = f"{price_age_seconds:.0f} sn"
+    else:
+        age_text = f"{price_age_seconds / 60:.0f} dk"
+    if price_age_seconds > PRICE_MAX_STALENESS_SECONDS:
+        return f"⚠️ <b>BAYAT KUR:</b> Fiyat {age_text} önce alındı, tutarı kontrol edin.\n\n"
+    return f"🕒 <b>Kur Yaşı:</b> {age_text}\n\n"
+
+
 # V2.0 - MT5 aktarım onayı için inline butonlu Telegram mesajı gönderir.
 def send_telegram_approval_request(transaction_id: str, name: str, symbol: str,
                                    chain_id: str, gross_usd: float,
-                                   comision: float, net_usd: float) -> None:
+                                   comision: float, net_usd: float,
+                                   price_age_seconds: float = None) -> None:
     """
     MT5 aktarımı için Telegram'a ONAYLA / REDDET butonlu onay mesajı gönderir.
     Buton callback_data formatı: 'approve:<transaction_id>' ve 'reject:<transaction_id>'
@@ -63,6 +77,7 @@ def send_telegram_approval_request(transaction_id: str, name: str, symbol: str,
         gross_usd:      Gelen brüt USD tutarı
         comision:       Kesilen komisyon tutarı
         net_usd:        MT5'e geçirilecek net tutar
+        price_age_seconds: Çeviride kullanılan fiyatın yaşı (stablecoin'de None)
     """
     token = TELEGRAM_BOT_TOKEN
     chat_id = TELEGRAM_CHAT_ID
@@ -75,6 +90,7 @@ def send_telegram_approval_request(transaction_id: str, name: str, symbol: str,
         f"📥 <b>Gelen Tutar:</b> <code>{gross_usd:,.2f} $</code>\n"
         f"✂️ <b>Komisyon (%{COMISION_RATE}):</b> <code>-{comision:,.2f} $</code>\n"
         f"✅ <b>Net MT5 Tutarı:</b> <code>{net_usd:,.2f} $</code>\n\n"
+        f"{_format_price_age(price_age_seconds)}"
         f"<i>Meta Hesabına paranın geçişini onaylıyor musunuz?</i>"
     )
 
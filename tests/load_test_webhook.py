@@ -0,0 +1,461 @@
+# -*- coding: utf-8 -*-
+"""
+COBO Webhook Offline Yük Testi
+==============================
+Binlerce gerçekçi Cobo payload'ı üretir ve webhook pipeline'ını (ingress dedup →
+outbox → worker havuzu → dispatch_cobo_notification) sunucu AÇMADAN, aynı process
+içinde çalıştırır. Dış servislerin hepsi yerel taklitlerle değiştirilir:
+
+- MongoDB   → mongomock-motor (bellek içi) veya --mongo-url ile yerel Mongo
+- MT5       → FakeMT5UserManager   (get_mt5_manager yerine)
+- Cobo SDK  → FakeCoboWithdrawalService (routing çekimi)
+- Kur API   → fake_convert_to_usd  (CryptoCompare yerine sabit kurlar)
+- Telegram  → bellek içi sayaç     (HTTP yok)
+
+Senaryo karışımı: farklı token'lar, dust (limit altı), spam token, iç transfer,
+bilinmeyen adres, Cobo retry (aynı event_id), CONFIRMING → COMPLETED dizileri.
+
+Rapor: throughput (olay/sn), uçtan uca p50/p95/p99 gecikme, tepe bellek
+(tracemalloc + RSS) ve GET /metrics'teki aşama özetleri.
+
+Gereksinimler (sadece bu script için):
+    pip install httpx mongomock-motor
+
+Kullanım:
+    python tests/load_test_webhook.py                         # 2000 olay, bellek içi Mongo
+    python tests/load_test_webhook.py --events 20000 --concurrency 8
+    python tests/load_test_webhook.py --mt5-ms 30 --fx-ms 150 --cobo-ms 200   # dış servis gecikmesi
+    python tests/load_test_webhook.py --mongo-url mongodb://localhost:27017 --batch
+
+NOT: --mongo-url verilirse "loadtest_<pid>" adında geçici bir veritabanı kullanılır
+     ve test sonunda silinir (maxipinfo'ya dokunulmaz). --batch (micro-batch)
+     bulk_write kullandığı için gerçek Mongo ile çalıştırılması önerilir.
+     mongomock index kullanmaz (her sorgu tam tarama); bellek içi moddaki mutlak
+     sayılar düşük çıkar, sadece aynı ayarlarla yapılan koşuları karşılaştırın.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+
+try:
+    import resource  # Windows'ta yok (RSS raporu atlanır)
+except ImportError:
+    resource = None
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# ─── Senaryo Ayarları ──────────────────────────────────────
+# (token_id, chain_id, tipik miktar aralığı)
+TOKENS = [
+    ("TRON_USDT", "TRON", (5, 8000)),
+    ("ETH_USDT", "ETH", (10, 5000)),
+    ("BSC_USDT", "BSC", (10, 3000)),
+    ("ETH", "ETH", (0.01, 3)),
+    ("TRON", "TRON", (20, 20000)),
+    ("BTC", "BTC", (0.0005, 0.2)),
+    ("SOL", "SOL", (0.1, 40)),
+]
+SPAM_TOKENS = ["TRON_FAKEUSD", "ETH_AIRDROP", "SCAMCOIN"]
+
+# Olay tipi ağırlıkları (toplam 100)
+SCENARIO_WEIGHTS = {
+    "deposit": 55,          # Doğrudan COMPLETED yatırım
+    "confirming": 15,       # CONFIRMING → COMPLETED dizisi (iki olay)
+    "dust": 8,              # Limit altı tutar
+    "spam": 6,              # Tanımsız / sahte token
+    "internal": 6,          # Kendi adresimizden gelen (sweep)
+    "unknown_address": 5,   # Sistemde olmayan adrese yatırım
+    "withdrawal": 5,        # Engellenen işlem tipi
+}
+DUPLICATE_RATIO = 0.10      # Cobo retry oranı (aynı event_id tekrar gönderilir)
+
+FAKE_USD_RATES = {"USDT": 1.0, "USDC": 1.0, "ETH": 1990.28, "TRX": 0.2783, "BTC": 67158.16, "SOL": 81.18}
+
+
+# ─── Taklit Servisler ──────────────────────────────────────
+class FakeMT5UserManager:
+    """servisler.mt5service.MT5UserManager yerine; gecikme simüle edilebilir."""
+
+    def __init__(self, delay_seconds: float):
+        self.delay_seconds = delay_seconds
+
+    def connect(self):
+        if self.delay_seconds:
+            time.sleep(self.delay_seconds)
+        return True
+
+    def disconnect(self):
+        return True
+
+    def get_user_info(self, login: int):
+        return {"login": login, "city": "Istanbul", "comment": "loadtest"}
+
+
+class FakeCoboWithdrawalService:
+    """servisler.withdrawal_service.CoboWithdrawalService yerine."""
+
+    delay_seconds = 0.0
+    calls = 0
+
+    def create_withdrawal(self, wallet_id, to_address, amount, token_id, chain_id, description=""):
+        if self.delay_seconds:
+            time.sleep(self.delay_seconds)
+        FakeCoboWithdrawalService.calls += 1
+        return {"success": True, "data": {"request_id": str(uuid.uuid4())}}
+
+
+class FakeTelegram:
+    """send_telegram_msg / send_telegram_approval_request yerine sayaç."""
+
+    def __init__(self):
+        self.messages = 0
+        self.approvals = 0
+
+    def send_msg(self, message: str):
+        self.messages += 1
+
+    def send_approval(self, **kwargs):
+        self.approvals += 1
+
+
+def make_fake_converter(delay_seconds: float):
+    """core.currency.converter.converter.convert_to_usd ile aynı dönüş formatı."""
+    from core.tokens.token_registry import resolve_token
+
+    async def fake_convert_to_usd(symbol, amount, created_timestamp=None):
+        if delay_seconds:
+            await asyncio.sleep(delay_seconds)
+        symbol = str(symbol).upper()
+        token = resolve_token(symbol)
+        rate = FAKE_USD_RATES.get(token.asset, 0.0) if token else 0.0
+        amount = float(amount)
+        return [
+            {"symbol": symbol, "amount": amount},
+            {"symbol": "USD", "amount": round(amount * rate, 2)},
+        ]
+    return fake_convert_to_usd
+
+
+# ─── Payload Üretimi ───────────────────────────────────────
+def _random_address(rng: random.Random, prefix: str = "T") -> str:
+    return prefix + "".join(rng.choice("ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz123456789") for _ in range(33))
+
+
+def _cobo_transaction(tx_id, token_id, chain_id, amount, to_address, from_address, status, tx_type="Deposit"):
+    """tests/assets/payload_*.json ile aynı şekilde Cobo işlem dict'i."""
+    now_ms = int(time.time() * 1000)
+    return {
+        "transaction_id": tx_id,
+        "wallet_id": "loadtest-wallet",
+        "type": tx_type,
+        "status": status,
+        "initiator_type": "External",
+        "source": {"source_type": "DepositFromAddress", "addresses": [from_address]},
+        "destination": {
+            "destination_type": "DepositToAddress",
+            "amount": str(amount),
+            "address": to_address,
+            "wallet_id": "loadtest-wallet",
+        },
+        "created_timestamp": now_ms,
+        "updated_timestamp": now_ms,
+        "chain_id": chain_id,
+        "token_id": token_id,
+        "asset_id": token_id.split("_")[-1],
+        "confirmed_num": 20 if status == "Completed" else 3,
+        "confirming_threshold": 20,
+        "transaction_hash": uuid.uuid4().hex,
+    }
+
+
+def _wrap(tx: dict) -> dict:
+    return {
+        "event_id": str(uuid.uuid4()),
+        "type": "wallets.transaction.updated",
+        "data": {"transaction": tx},
+    }
+
+
+def generate_payloads(count: int, lead_addresses: list, internal_addresses: list, seed: int) -> list:
+    """Senaryo ağırlıklarına göre karışık payload listesi (Cobo retry'ları dahil)."""
+    rng = random.Random(seed)
+    scenarios = list(SCENARIO_WEIGHTS)
+    weights = list(SCENARIO_WEIGHTS.values())
+    payloads = []
+
+    while len(payloads) < count:
+        scenario = rng.choices(scenarios, weights)[0]
+        token_id, chain_id, (low, high) = rng.choice(TOKENS)
+        amount = round(rng.uniform(low, high), 6)
+        to_address = rng.choice(lead_addresses)
+        from_address = _random_address(rng)
+        tx_id = f"LOAD-{uuid.uuid4()}"
+
+        if scenario == "confirming":
+            payloads.append(_wrap(_cobo_transaction(tx_id, token_id, chain_id, amount, to_address, from_address, "Confirming")))
+            payloads.append(_wrap(_cobo_transaction(tx_id, token_id, chain_id, amount, to_address, from_address, "Completed")))
+            continue
+        if scenario == "dust":
+            amount = round(low / 1000, 8)
+        elif scenario == "spam":
+            token_id = rng.choice(SPAM_TOKENS)
+        elif scenario == "internal":
+            from_address = rng.choice(internal_addresses)
+        elif scenario == "unknown_address":
+            to_address = _random_address(rng)
+
+        tx_type = "Withdrawal" if scenario == "withdrawal" else "Deposit"
+        payloads.append(_wrap(_cobo_transaction(tx_id, token_id, chain_id, amount, to_address, from_address, "Completed", tx_type)))
+
+    payloads = payloads[:count]
+
+    # Cobo retry'ları: aynı payload rastgele bir sonraki konumda tekrar gelir
+    for index in range(len(payloads)):
+        if rng.random() < DUPLICATE_RATIO:
+            payloads.insert(rng.randint(index, len(payloads)), payloads[index])
+    return payloads
+
+
+# ─── Ortam Kurulumu ────────────────────────────────────────
+def install_mongo(mongo_url: str):
+    """
+    servisler.db_service import edilmeden ÖNCE çağrılmalıdır; modül seviyesindeki
+    client/db bu ayara göre oluşur.
+    """
+    if mongo_url:
+        os.environ["MONGODB_URL"] = mongo_url
+        return
+    try:
+        import motor.motor_asyncio
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        print("  ❌ Bellek içi Mongo için mongomock-motor gerekli (pip install mongomock-motor)")
+        print("     veya --mongo-url ile yerel bir Mongo verin.")
+        sys.exit(1)
+    # .env'deki MONGODB_URL (Atlas SRV) çözülmeye çalışılmasın
+    motor.motor_asyncio.AsyncIOMotorClient = lambda *args, **kwargs: AsyncMongoMockClient()
+    # mongomock session/transaction desteklemez; defter yazımı sıralı modda çalışır
+    os.environ["LEDGER_USE_TRANSACTIONS"] = "false"
+
+
+def use_scratch_database(db_service):
+    """
+    Yerel Mongo'da gerçek veritabanı yerine geçici bir veritabanı kullanır.
+    db_service modül seviyesindeki koleksiyonları import anında bağladığı için
+    hepsi yeni veritabanına yeniden bağlanır.
+    """
+    from motor.motor_asyncio import AsyncIOMotorCollection
+
+    scratch = db_service.client[f"loadtest_{os.getpid()}"]
+    for name, value in list(vars(db_service).items()):
+        if isinstance(value, AsyncIOMotorCollection):
+            setattr(db_service, name, scratch[value.name])
+    db_service.db = scratch
+
+
+def install_fakes(args, telegram: FakeTelegram):
+    import workers.webhook_processor as processor
+    import workers.webhook_queue as queue_module
+    import servisler.withdrawal_service as withdrawal_module
+
+    fake_mt5 = FakeMT5UserManager(args.mt5_ms / 1000)
+    processor.get_mt5_manager = lambda: fake_mt5
+    processor.convert_to_usd = make_fake_converter(args.fx_ms / 1000)
+    processor.send_telegram_msg = telegram.send_msg
+    processor.send_telegram_approval_request = telegram.send_approval
+    queue_module.send_telegram_msg = telegram.send_msg
+
+    FakeCoboWithdrawalService.delay_seconds = args.cobo_ms / 1000
+    withdrawal_module.CoboWithdrawalService = FakeCoboWithdrawalService
+    processor.COBO_AUTO_ROUTING_ENABLED = not args.no_routing
+    processor.get_target_wallet = lambda symbol: ("TLoadTestMainWallet", "Ana Kasa", True)
+
+    processor.WEBHOOK_BATCH_ENABLED = args.batch
+
+
+async def seed_leads(db_service, lead_count: int, seed: int) -> tuple:
+    """Test lead'lerini ve cüzdanlarını oluşturur. (müşteri adresleri, iç adresler)"""
+    rng = random.Random(seed + 1)
+    lead_addresses = []
+    for index in range(lead_count):
+        wallets = [{"address": _random_address(rng), "chain_id": chain} for chain in ("TRON", "ETH")]
+        lead_addresses.extend(wallet["address"] for wallet in wallets)
+        await db_service.save_lead({
+            "tp_number": str(900000 + index),
+            "name": f"Load Test {index}",
+            "wallets": wallets,
+            "total_deposit": 0,
+            "total_withdrawal": 0,
+            "deposit_count": 0,
+        })
+    # İç transferler için kendi adreslerimizden bir kısmı kaynak olarak kullanılır
+    return lead_addresses, lead_addresses[: max(1, len(lead_addresses) // 10)]
+
+
+# ─── Rapor ─────────────────────────────────────────────────
+def _percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def print_report(sent, accepted, shed, latencies, elapsed, peak_bytes, telegram, stage_snapshot):
+    latencies = sorted(latencies)
+    rss = f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB" if resource else "N/A"
+
+    print("\n" + "═" * 60)
+    print("  📊 YÜK TESTİ SONUCU")
+    print("═" * 60)
+    print(f"  📤 Gönderilen POST      : {sent}")
+    print(f"  📥 Kuyruğa alınan olay  : {accepted}  (dedup elenen: {sent - accepted})")
+    print(f"  🚦 503 (backpressure)   : {shed}")
+    print(f"  ✅ İşlenen olay         : {len(latencies)}")
+    print(f"  ⏱️  Süre                 : {elapsed:.2f} sn")
+    print(f"  🚀 Throughput           : {len(latencies) / elapsed:,.1f} olay/sn")
+    print(f"  📈 Uçtan uca gecikme    : p50={_percentile(latencies, 0.50) * 1000:.1f} ms  "
+          f"p95={_percentile(latencies, 0.95) * 1000:.1f} ms  "
+          f"p99={_percentile(latencies, 0.99) * 1000:.1f} ms  "
+          f"max={(latencies[-1] if latencies else 0) * 1000:.1f} ms")
+    print(f"  🧠 Bellek               : tepe Python={peak_bytes / 1024 / 1024:.1f} MB  RSS={rss}")
+    print(f"  💬 Telegram             : {telegram.messages} mesaj, {telegram.approvals} onay isteği")
+    print(f"  🔀 Cobo routing çağrısı : {FakeCoboWithdrawalService.calls}")
+
+    print("\n  ── Aşama Gecikmeleri (/metrics) ──")
+    for stage, summary in stage_snapshot.get("stages", {}).items():
+        print(f"  {stage:<17} n={summary['count']:<7} p50={summary['p50_ms']:>8.2f} ms  "
+              f"p95={summary['p95_ms']:>8.2f} ms  p99={summary['p99_ms']:>8.2f} ms")
+    print("═" * 60)
+
+
+# ─── Çalıştırma ────────────────────────────────────────────
+async def run(args):
+    import httpx
+    from fastapi import FastAPI
+
+    import servisler.db_service as db_service
+    import workers.webhook_queue as queue_module
+    from api.webhook_router import router as webhook_router
+    from core.metrics.latency import pipeline_metrics
+
+    if args.mongo_url:
+        use_scratch_database(db_service)
+
+    telegram = FakeTelegram()
+    install_fakes(args, telegram)
+
+    lead_addresses, internal_addresses = await seed_leads(db_service, args.leads, args.seed)
+    payloads = generate_payloads(args.events, lead_addresses, internal_addresses, args.seed)
+    await db_service.ensure_transaction_index()
+
+    # dispatch'i sararak olay bazında tamamlanma zamanını ölç
+    first_seen = {}
+    latencies = []
+    expected = [float("inf")]
+    done = asyncio.Event()
+    original_dispatch = queue_module.dispatch_cobo_notification
+
+    async def timed_dispatch(data: dict):
+        try:
+            await original_dispatch(data)
+        finally:
+            started = first_seen.get(data.get("event_id"))
+            if started is not None:
+                latencies.append(time.perf_counter() - started)
+            if len(latencies) >= expected[0]:
+                done.set()
+
+    queue_module.dispatch_cobo_notification = timed_dispatch
+
+    queue = queue_module.webhook_queue
+    queue.concurrency = args.concurrency
+    queue.poll_seconds = 0.05
+    if args.high_water is not None:
+        queue.high_water_mark = args.high_water
+    await queue.start()
+
+    app = FastAPI()
+    app.include_router(webhook_router)
+
+    semaphore = asyncio.Semaphore(args.clients)
+    shed = [0]
+
+    tracemalloc.start()
+    started_at = time.perf_counter()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest") as client:
+        async def post(payload: dict):
+            async with semaphore:
+                event_id = payload["event_id"]
+                first_seen.setdefault(event_id, time.perf_counter())
+                # 503 (backpressure) → Cobo gibi bekleyip tekrar gönder
+                while (await client.post("/cobo/callback_v2", json=payload)).status_code == 503:
+                    shed[0] += 1
+                    await asyncio.sleep(args.retry_delay)
+
+        await asyncio.gather(*(post(payload) for payload in payloads))
+
+    # Dedup'tan geçen her olay (CONFIRMING + COMPLETED ayrı) tam bir kez işlenir
+    accepted_count = await db_service.webhook_outbox_collection.count_documents({})
+    expected[0] = accepted_count
+    if len(latencies) >= accepted_count:
+        done.set()
+    try:
+        await asyncio.wait_for(done.wait(), timeout=args.timeout)
+    except asyncio.TimeoutError:
+        print(f"\n  ⚠️ Zaman aşımı: {len(latencies)}/{accepted_count} olay işlendi")
+
+    elapsed = time.perf_counter() - started_at
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    await queue.stop()
+    queue_module.dispatch_cobo_notification = original_dispatch
+
+    print_report(len(payloads), accepted_count, shed[0], latencies, elapsed, peak_bytes, telegram, pipeline_metrics.snapshot())
+
+    if args.mongo_url:
+        await db_service.client.drop_database(db_service.db.name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cobo webhook pipeline offline yük testi")
+    parser.add_argument("--events", type=int, default=2000, help="Üretilecek olay sayısı (retry'lar hariç)")
+    parser.add_argument("--leads", type=int, default=200, help="Test müşteri sayısı")
+    parser.add_argument("--clients", type=int, default=50, help="Eşzamanlı POST sayısı")
+    parser.add_argument("--concurrency", type=int, default=4, help="Outbox worker sayısı")
+    parser.add_argument("--mt5-ms", type=float, default=0.0, help="Taklit MT5 bağlantı gecikmesi")
+    parser.add_argument("--fx-ms", type=float, default=0.0, help="Taklit kur API gecikmesi")
+    parser.add_argument("--cobo-ms", type=float, default=0.0, help="Taklit Cobo çekim gecikmesi")
+    parser.add_argument("--no-routing", action="store_true", help="Cobo routing adımını kapat")
+    parser.add_argument("--batch", action="store_true", help="Micro-batch aşamasını aç (WEBHOOK_BATCH_ENABLED)")
+    parser.add_argument("--mongo-url", help="Yerel Mongo (boşsa bellek içi mongomock)")
+    parser.add_argument("--high-water", type=int, help="WEBHOOK_QUEUE_HIGH_WATER_MARK'ı geçersiz kıl")
+    parser.add_argument("--retry-delay", type=float, default=0.2, help="503 sonrası tekrar gönderim beklemesi (sn)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=300, help="İşlemenin bitmesi için en fazla bekleme (sn)")
+    parser.add_argument("--verbose", action="store_true", help="Uygulama loglarını göster")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL)
+
+    install_mongo(args.mongo_url)
+
+    print("\n" + "═" * 60)
+    print("  🧪 COBO WEBHOOK OFFLINE YÜK TESTİ")
+    print(f"  📦 {args.events} olay | {args.leads} müşteri | {args.concurrency} worker | "
+          f"{'yerel Mongo' if args.mongo_url else 'bellek içi Mongo'}")
+    print("═" * 60)
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
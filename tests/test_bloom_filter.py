@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Bloom Filtresi Dosya Testi
+==========================
+BloomFilter'ın save → open_shared → yeniden kurulum döngüsünü geçici bir dizinde
+doğrular: açık (mmap'li) sürüm dosyasının üstüne yazılmaz, yeni sürüm ayrı dosyaya
+yazılır ve eski filtre kapatılana kadar okunabilir kalır (Windows'ta mmap'li
+dosyaya os.replace PermissionError verir).
+
+Kullanım:
+    python tests/test_bloom_filter.py
+    python -m pytest tests/test_bloom_filter.py
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Proje ana dizinini sys.path'e ekle (Modülleri import edebilmek için)
+sys.path.append(str(Path(__file__).parent.parent))
+
+from core.filter.bloom_filter import BloomFilter
+
+
+def build(addresses: list) -> BloomFilter:
+    bloom = BloomFilter.for_capacity(1000, 0.001)
+    for address in addresses:
+        bloom.add(address)
+    return bloom
+
+
+def test_membership_and_round_trip():
+    """1. Kaydedilen filtre mmap ile açılınca aynı adresleri tanır."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "address_bloom.bin")
+        addresses = [f"TAddr{i}" for i in range(500)]
+        shared = BloomFilter.open_shared(build(addresses).save(path))
+        try:
+            assert all(address in shared for address in addresses)
+            assert shared.count == 500
+            false_positives = sum(f"Other{i}" in shared for i in range(5000))
+            assert false_positives < 50, f"yanlış pozitif oranı yüksek: {false_positives}/5000"
+        finally:
+            shared.close()
+
+
+def test_rebuild_while_previous_is_mapped():
+    """2. Önceki sürüm mmap'liyken yeniden kurulum yeni dosyaya yazar; eski filtre okunabilir kalır."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "address_bloom.bin")
+        first_path = build(["TOld"]).save(path)
+        first = BloomFilter.open_shared(first_path)
+
+        second_path = build(["TOld", "TNew"]).save(path)
+        second = BloomFilter.open_shared(second_path)
+        try:
+            assert second_path != first_path, "açık dosyanın üstüne yazıldı"
+            assert BloomFilter.latest_version(path) == second_path
+            assert "TNew" in second and "TOld" in second
+            assert "TOld" in first and first.count == 1
+        finally:
+            first.close()
+            second.close()
+
+
+def test_old_versions_are_cleaned_up():
+    """3. Sürümler birikmez: sadece en yeni ve bir önceki sürüm kalır, geçici dosya kalmaz."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "address_bloom.bin")
+        for i in range(4):
+            build([f"TAddr{i}"]).save(path)
+        remaining = sorted(os.listdir(directory))
+        assert len(remaining) == 2, remaining
+        assert not any(name.endswith(".tmp") for name in remaining)
+        assert BloomFilter.latest_version(path).endswith(remaining[-1])
+
+
+def main():
+    tests = [value for name, value in globals().items() if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"  ✅ {test.__doc__.strip()}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {test.__doc__.strip()}\n     {type(e).__name__}: {e}")
+    print(f"\n  {len(tests) - failed}/{len(tests)} test başarılı")
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Yatırım Micro-Batch Testi
+=========================
+DepositBatcher'ın flush kurallarını (pencere / adet sınırı), batch başına tek
+lead sorgusu + tek defter yazımını ve olay bazlı sonuçlarını (bilinmeyen adres,
+kur hatası, zaten işlenmiş işlem, aynı müşterinin ara toplamları) sahte Mongo
+fonksiyonlarıyla doğrular. Dış servis gerekmez.
+
+Kullanım:
+    python tests/test_deposit_batcher.py
+    python -m pytest tests/test_deposit_batcher.py
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Proje ana dizinini sys.path'e ekle (Modülleri import edebilmek için)
+sys.path.append(str(Path(__file__).parent.parent))
+
+import workers.deposit_batcher as deposit_batcher
+from workers.deposit_batcher import DepositBatcher
+from config.settings import WEBHOOK_BATCH_MAX_EVENTS, WEBHOOK_QUEUE_CONCURRENCY
+
+LEADS = {
+    "TAddrA": {"tp_number": "100", "name": "Ali"},
+    "TAddrB": {"tp_number": "200", "name": "Ayşe"},
+}
+
+
+class FakeLedger:
+    """get_leads_by_addresses / record_deposits_bulk taklidi (çağrı sayılarını tutar)."""
+
+    def __init__(self, claimed_before=()):
+        self.claimed = set(claimed_before)
+        self.totals = {}
+        self.lead_queries = []
+        self.ledger_writes = []
+
+    async def get_leads_by_addresses(self, addresses):
+        self.lead_queries.append(set(addresses))
+        return {address: LEADS[address] for address in addresses if address in LEADS}
+
+    async def record_deposits_bulk(self, locks):
+        self.ledger_writes.append([lock["transaction_id"] for lock in locks])
+        claimed = set()
+        for lock in locks:
+            if lock["transaction_id"] in self.claimed:
+                continue
+            self.claimed.add(lock["transaction_id"])
+            claimed.add(lock["transaction_id"])
+            total, count = self.totals.get(lock["tp_number"], (0.0, 0))
+            self.totals[lock["tp_number"]] = (total + lock["amount"], count + 1)
+        updated = {
+            tp: {"tp_number": tp, "total_deposit": total, "total_withdrawal": 0.0, "deposit_count": count}
+            for tp, (total, count) in self.totals.items()
+        }
+        return claimed, updated
+
+
+async def fake_convert(symbol, amount, created_timestamp):
+    if symbol == "ETH":
+        raise RuntimeError("ETH için güncel USD fiyatı yok")
+    return {"amount": float(amount), "rate": 1.0, "price_age_seconds": None}
+
+
+def install(ledger: FakeLedger):
+    deposit_batcher.get_leads_by_addresses = ledger.get_leads_by_addresses
+    deposit_batcher.record_deposits_bulk = ledger.record_deposits_bulk
+
+
+def submit(batcher, transaction_id, address, amount, symbol="TRON_USDT"):
+    return batcher.submit(transaction_id, address, amount, symbol, "COMPLETED")
+
+
+def test_full_batch_flushes_without_waiting_for_window():
+    """1. max_events dolunca pencere beklenmeden tek lead sorgusu + tek defter yazımıyla flush edilir."""
+    async def scenario():
+        ledger = FakeLedger()
+        install(ledger)
+        batcher = DepositBatcher(fake_convert, window_ms=10_000, max_events=3)
+        started = time.monotonic()
+        results = await asyncio.gather(
+            submit(batcher, "t1", "TAddrA", 10),
+            submit(batcher, "t2", "TAddrB", 20),
+            submit(batcher, "t3", "TAddrA", 5),
+        )
+        assert time.monotonic() - started < 1, "dolu batch pencereyi bekledi"
+        assert len(ledger.lead_queries) == 1 and len(ledger.ledger_writes) == 1
+        assert [result["usd_amount"] for result in results] == [10.0, 20.0, 5.0]
+    asyncio.run(scenario())
+
+
+def test_partial_batch_flushes_after_window():
+    """2. Adet sınırına ulaşılmazsa batch pencere süresi sonunda flush edilir."""
+    async def scenario():
+        ledger = FakeLedger()
+        install(ledger)
+        batcher = DepositBatcher(fake_convert, window_ms=50, max_events=10)
+        started = time.monotonic()
+        result = await submit(batcher, "t1", "TAddrA", 10)
+        elapsed = time.monotonic() - started
+        assert 0.04 <= elapsed < 1, f"pencere süresi beklenmedi: {elapsed:.3f} sn"
+        assert result["tp_number"] == "100" and result["deposit_count"] == 1
+    asyncio.run(scenario())
+
+
+def test_batches_are_split_at_max_events():
+    """3. max_events'ten fazla eşzamanlı yatırım birden fazla batch'e bölünür."""
+    async def scenario():
+        ledger = FakeLedger()
+        install(ledger)
+        batcher = DepositBatcher(fake_convert, window_ms=20, max_events=2)
+        await asyncio.gather(*(submit(batcher, f"t{i}", "TAddrA", 1) for i in range(5)))
+        assert [len(write) for write in ledger.ledger_writes] == [2, 2, 1]
+    asyncio.run(scenario())
+
+
+def test_per_event_outcomes():
+    """4. Bilinmeyen adres ve zaten işlenmiş işlem None, kur hatası sadece o olaya hata döner."""
+    async def scenario():
+        ledger = FakeLedger(claimed_before=["t-old"])
+        install(ledger)
+        batcher = DepositBatcher(fake_convert, window_ms=10_000, max_events=4)
+        results = await asyncio.gather(
+            submit(batcher, "t-unknown", "TNobody", 10),
+            submit(batcher, "t-old", "TAddrA", 10),
+            submit(batcher, "t-eth", "TAddrA", 1, symbol="ETH"),
+            submit(batcher, "t-new", "TAddrB", 7),
+            return_exceptions=True,
+        )
+        assert results[0] is None and results[1] is None
+        assert isinstance(results[2], RuntimeError)
+        assert results[3]["usd_amount"] == 7.0
+        assert ledger.ledger_writes == [["t-old", "t-new"]]
+    asyncio.run(scenario())
+
+
+def test_same_lead_sees_running_subtotals():
+    """5. Aynı müşterinin batch'teki yatırımları tekil akıştaki gibi sıralı ara toplamları görür."""
+    async def scenario():
+        ledger = FakeLedger()
+        install(ledger)
+        batcher = DepositBatcher(fake_convert, window_ms=10_000, max_events=3)
+        results = await asyncio.gather(
+            submit(batcher, "t1", "TAddrA", 10),
+            submit(batcher, "t2", "TAddrA", 20),
+            submit(batcher, "t3", "TAddrA", 30),
+        )
+        assert [(r["total_deposit"], r["deposit_count"]) for r in results] == [(10.0, 1), (30.0, 2), (60.0, 3)]
+    asyncio.run(scenario())
+
+
+def test_batch_size_is_capped_at_queue_concurrency():
+    """6. WEBHOOK_BATCH_MAX_EVENTS kuyruk worker sayısını aşamaz (her worker kendi olayını bekler)."""
+    assert WEBHOOK_BATCH_MAX_EVENTS <= WEBHOOK_QUEUE_CONCURRENCY
+
+
+def main():
+    tests = [value for name, value in globals().items() if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"  ✅ {test.__doc__.strip()}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {test.__doc__.strip()}\n     {type(e).__name__}: {e}")
+    print(f"\n  {len(tests) - failed}/{len(tests)} test başarılı")
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Toplu Yatırım Defteri Testi
+===========================
+record_deposits_bulk'ın kilit + istatistik yazımını bellek içi sahte Mongo
+koleksiyonlarıyla doğrular: batch'te daha önce kilitlenmiş (veya eşzamanlı
+kilitlenen) bir işlem olsa bile diğer yatırımlar kredilendirilmelidir.
+Gerçek Mongo gerekmez.
+
+Kullanım:
+    python tests/test_deposit_ledger_bulk.py
+    python -m pytest tests/test_deposit_ledger_bulk.py
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Proje ana dizinini sys.path'e ekle (Modülleri import edebilmek için)
+sys.path.append(str(Path(__file__).parent.parent))
+
+from pymongo.errors import BulkWriteError, OperationFailure
+
+import servisler.db_service as db_service
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = iter(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeLedger:
+    """
+    db.transactions taklidi: transaction_id upsert'leri. racing'deki id'ler ilk
+    bulk_write'ta "başka worker" tarafından kilitlenir ve 11000 hatası döner.
+    Session içindeki hatada transaction iptal edildiği için hiçbir değişiklik yazılmaz.
+    """
+
+    def __init__(self, existing=(), racing=()):
+        self.docs = {tid: {"transaction_id": tid} for tid in existing}
+        self.racing = set(racing)
+        self.calls = 0
+
+    async def bulk_write(self, operations, ordered=True, session=None):
+        self.calls += 1
+        upserted, errors, inserts = [], [], {}
+        for index, operation in enumerate(operations):
+            tid = operation._filter["transaction_id"]
+            if tid in self.racing:
+                self.racing.discard(tid)
+                self.docs[tid] = {"transaction_id": tid, "tp_number": "other"}
+                errors.append({"index": index, "code": 11000, "errmsg": "E11000 duplicate key"})
+            elif tid not in self.docs:
+                inserts[tid] = dict(operation._doc["$setOnInsert"])
+                upserted.append({"index": index, "_id": tid})
+        if errors and session is not None:
+            raise BulkWriteError({"writeErrors": errors, "upserted": []})
+        self.docs.update(inserts)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "upserted": upserted})
+        return type("Result", (), {"upserted_ids": {item["index"]: item["_id"] for item in upserted}})()
+
+
+class FakeLeads:
+    """COBO koleksiyonu taklidi: $inc upsert'leri ve $in okuması."""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def bulk_write(self, operations, ordered=True, session=None):
+        for operation in operations:
+            tp_number = operation._filter["tp_number"]
+            lead = self.docs.setdefault(tp_number, {"tp_number": tp_number, "total_deposit": 0.0,
+                                                    "deposit_count": 0, "total_withdrawal": 0.0})
+            for field, value in operation._doc["$inc"].items():
+                lead[field] += value
+
+    def find(self, query, projection=None):
+        wanted = set(query["tp_number"]["$in"])
+        return FakeCursor([lead for tp, lead in self.docs.items() if tp in wanted])
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def with_transaction(self, callback):
+        return await callback(self)
+
+
+class FakeClient:
+    def __init__(self, transactions_supported=True):
+        self.transactions_supported = transactions_supported
+
+    async def start_session(self):
+        if not self.transactions_supported:
+            raise OperationFailure("Transaction numbers are only allowed on a replica set", code=20)
+        return FakeSession()
+
+
+def install_fakes(ledger: FakeLedger, transactions_supported=True) -> FakeLeads:
+    leads = FakeLeads()
+    db_service.db = type("FakeDB", (), {"transactions": ledger})()
+    db_service.cobo_collection = leads
+    db_service.client = FakeClient(transactions_supported)
+    db_service.LEDGER_TIMESERIES_ENABLED = False
+    db_service._ledger_transactions_enabled = True
+    return leads
+
+
+def make_locks(*items):
+    return [
+        {"transaction_id": tid, "tp_number": tp, "amount": amount, "symbol": "TRON_USDT", "status": "COMPLETED"}
+        for tid, tp, amount in items
+    ]
+
+
+def test_already_claimed_transaction_does_not_block_batch():
+    """1. Daha önce kilitlenmiş işlem atlanır, batch'teki diğer yatırımlar kredilendirilir."""
+    ledger = FakeLedger(existing=["t1"])
+    leads = install_fakes(ledger)
+    claimed, updated = asyncio.run(db_service.record_deposits_bulk(
+        make_locks(("t1", "100", 50.0), ("t2", "100", 20.0), ("t3", "200", 30.0))
+    ))
+    assert claimed == {"t2", "t3"}, claimed
+    assert leads.docs["100"]["total_deposit"] == 20.0 and leads.docs["100"]["deposit_count"] == 1
+    assert updated["200"]["total_deposit"] == 30.0
+
+
+def test_concurrent_claim_retries_transaction():
+    """2. Transaction içinde duplicate key (eşzamanlı kilit) gelirse tekrar denenir; diğerleri kredilendirilir."""
+    ledger = FakeLedger(racing=["t2"])
+    leads = install_fakes(ledger)
+    claimed, _ = asyncio.run(db_service.record_deposits_bulk(
+        make_locks(("t1", "100", 10.0), ("t2", "100", 20.0), ("t3", "300", 5.0))
+    ))
+    assert claimed == {"t1", "t3"}, claimed
+    assert ledger.calls == 2, "duplicate key sonrası transaction tekrar denenmedi"
+    assert leads.docs["100"]["total_deposit"] == 10.0 and leads.docs["100"]["deposit_count"] == 1
+    assert leads.docs["300"]["deposit_count"] == 1
+
+
+def test_standalone_mongo_falls_back_to_sequential_writes():
+    """3. Replica set yoksa (code 20) sıralı moda düşülür; eşzamanlı kilit yine sadece o işlemi eler."""
+    ledger = FakeLedger(racing=["t1"])
+    leads = install_fakes(ledger, transactions_supported=False)
+    claimed, _ = asyncio.run(db_service.record_deposits_bulk(
+        make_locks(("t1", "100", 10.0), ("t2", "100", 20.0))
+    ))
+    assert claimed == {"t2"}, claimed
+    assert db_service._ledger_transactions_enabled is False
+    assert leads.docs["100"]["total_deposit"] == 20.0
+
+
+def main():
+    tests = [value for name, value in globals().items() if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"  ✅ {test.__doc__.strip()}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {test.__doc__.strip()}\n     {type(e).__name__}: {e}")
+    print(f"\n  {len(tests) - failed}/{len(tests)} test başarılı")
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Webhook Dedup Testi
+===================
+LruTtlCache'in LRU/TTL davranışını ve WebhookDeduplicator'ın event_id /
+(transaction_id, status) anahtarlarıyla tekrar eleme kararlarını doğrular.
+Paylaşımlı (Mongo) mod sahte is_webhook_seen ile test edilir; dış servis gerekmez.
+
+Kullanım:
+    python tests/test_event_dedup.py
+    python -m pytest tests/test_event_dedup.py
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Proje ana dizinini sys.path'e ekle (Modülleri import edebilmek için)
+sys.path.append(str(Path(__file__).parent.parent))
+
+import workers.event_dedup as event_dedup
+from core.cache.lru_ttl_cache import LruTtlCache
+from workers.event_dedup import WebhookDeduplicator
+
+
+def make_webhook(event_id: str, transaction_id: str, status: str) -> dict:
+    return {
+        "event_id": event_id,
+        "type": "wallets.transaction.updated",
+        "data": {"transaction_id": transaction_id, "status": status, "type": "Deposit"},
+    }
+
+
+def test_lru_evicts_oldest_and_ttl_expires():
+    """1. LruTtlCache: kapasite aşılınca en eski kayıt çıkar, süresi dolan kayıt görünmez."""
+    cache = LruTtlCache(max_size=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # a en yeni konuma taşınır
+    cache.set("c", 3)
+    assert "b" not in cache and "a" in cache and "c" in cache
+    assert cache.evictions == 1
+
+    cache.set("short", 4, ttl_seconds=0.01)
+    time.sleep(0.02)
+    assert "short" not in cache
+    assert cache.get("short") is None
+
+
+def test_same_event_id_is_dropped():
+    """2. Aynı event_id ikinci kez gelirse elenir."""
+    async def scenario():
+        dedup = WebhookDeduplicator(max_entries=100, ttl_seconds=60)
+        payload = make_webhook("e1", "t1", "Completed")
+        assert await dedup.is_duplicate(payload) is False
+        assert await dedup.is_duplicate(payload) is True
+        assert dedup.dropped == 1
+    asyncio.run(scenario())
+
+
+def test_same_transaction_and_status_is_dropped():
+    """3. Farklı event_id ama aynı transaction_id + status elenir; yeni status geçer."""
+    async def scenario():
+        dedup = WebhookDeduplicator(max_entries=100, ttl_seconds=60)
+        assert await dedup.is_duplicate(make_webhook("e1", "t1", "Confirming")) is False
+        assert await dedup.is_duplicate(make_webhook("e2", "t1", "Confirming")) is True
+        assert await dedup.is_duplicate(make_webhook("e3", "t1", "Completed")) is False
+    asyncio.run(scenario())
+
+
+def test_forget_allows_retry():
+    """4. Kuyruğa yazılamayan olay forget() sonrası Cobo retry'ında tekrar kabul edilir."""
+    async def scenario():
+        dedup = WebhookDeduplicator(max_entries=100, ttl_seconds=60)
+        payload = make_webhook("e1", "t1", "Completed")
+        assert await dedup.is_duplicate(payload) is False
+        dedup.forget(payload)
+        assert await dedup.is_duplicate(payload) is False
+    asyncio.run(scenario())
+
+
+def test_expired_entry_is_accepted_again():
+    """5. TTL dolduktan sonra aynı olay yeniden kabul edilir."""
+    async def scenario():
+        dedup = WebhookDeduplicator(max_entries=100, ttl_seconds=0.01)
+        payload = make_webhook("e1", "t1", "Completed")
+        assert await dedup.is_duplicate(payload) is False
+        await asyncio.sleep(0.02)
+        assert await dedup.is_duplicate(payload) is False
+    asyncio.run(scenario())
+
+
+def test_non_dict_payloads_are_never_duplicates():
+    """6. JSON nesnesi olmayan gövde anahtar üretmez ve elenmez."""
+    async def scenario():
+        dedup = WebhookDeduplicator(max_entries=100, ttl_seconds=60)
+        assert WebhookDeduplicator.dedup_keys(["e1"]) == []
+        assert await dedup.is_duplicate(["e1"]) is False
+        assert await dedup.is_duplicate(["e1"]) is False
+    asyncio.run(scenario())
+
+
+def test_shared_mode_uses_mongo_and_fails_open():
+    """7. Paylaşımlı modda Mongo'da görülen olay elenir; Mongo hatası olayı engellemez."""
+    async def scenario():
+        seen = {"evt:e-other-process"}
+
+        async def fake_is_seen(keys):
+            return any(key in seen for key in keys)
+
+        async def broken_is_seen(keys):
+            raise RuntimeError("mongo down")
+
+        original = event_dedup.is_webhook_seen
+        try:
+            event_dedup.is_webhook_seen = fake_is_seen
+            dedup = WebhookDeduplicator(max_entries=100, ttl_seconds=60, shared=True)
+            assert await dedup.is_duplicate(make_webhook("e-other-process", "t9", "Completed")) is True
+            assert await dedup.is_duplicate(make_webhook("e-new", "t10", "Completed")) is False
+
+            event_dedup.is_webhook_seen = broken_is_seen
+            dedup = WebhookDeduplicator(max_entries=100, ttl_seconds=60, shared=True)
+            assert await dedup.is_duplicate(make_webhook("e1", "t1", "Completed")) is False
+        finally:
+            event_dedup.is_webhook_seen = original
+    asyncio.run(scenario())
+
+
+def main():
+    tests = [value for name, value in globals().items() if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"  ✅ {test.__doc__.strip()}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {test.__doc__.strip()}\n     {type(e).__name__}: {e}")
+    print(f"\n  {len(tests) - failed}/{len(tests)} test başarılı")
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
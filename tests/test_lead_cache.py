@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Lead Cache Testi
+================
+LeadCache'in single-flight yüklemesini (eşzamanlı miss'ler tek sorgu), None
+sonuçların cache'lenmemesini ve yükleme sırasında gelen invalidation'ın eski
+değerin cache'e yazılmasını engellediğini doğrular. Dış servis gerekmez.
+
+Kullanım:
+    python tests/test_lead_cache.py
+    python -m pytest tests/test_lead_cache.py
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Proje ana dizinini sys.path'e ekle (Modülleri import edebilmek için)
+sys.path.append(str(Path(__file__).parent.parent))
+
+from core.cache.lead_cache import LeadCache
+
+
+class FakeLoader:
+    """Mongo okuması taklidi: çağrı sayısını tutar, isteğe bağlı olarak bekler."""
+
+    def __init__(self, lead, delay_seconds: float = 0.01):
+        self.lead = lead
+        self.delay_seconds = delay_seconds
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay_seconds)
+        return self.lead
+
+
+def test_concurrent_misses_share_one_query():
+    """1. Aynı tp_number için eşzamanlı miss'ler tek sorguda birleşir; sonraki okuma cache'ten gelir."""
+    async def scenario():
+        cache = LeadCache(max_entries=100, ttl_seconds=60)
+        loader = FakeLoader({"tp_number": "100", "name": "Ali"})
+        results = await asyncio.gather(*(cache.get("100", loader) for _ in range(10)))
+        assert loader.calls == 1
+        assert all(result is results[0] for result in results)
+        await cache.get(100, loader)
+        assert loader.calls == 1
+    asyncio.run(scenario())
+
+
+def test_none_is_not_cached():
+    """2. Bulunamayan lead cache'lenmez (MT5 senkronizasyon fallback'i çalışmaya devam eder)."""
+    async def scenario():
+        cache = LeadCache(max_entries=100, ttl_seconds=60)
+        loader = FakeLoader(None, delay_seconds=0)
+        assert await cache.get("404", loader) is None
+        assert await cache.get("404", loader) is None
+        assert loader.calls == 2
+    asyncio.run(scenario())
+
+
+def test_invalidation_during_load_discards_stale_value():
+    """3. Yükleme sürerken invalidate edilen lead cache'e yazılmaz; sonraki okuma tekrar yükler."""
+    async def scenario():
+        cache = LeadCache(max_entries=100, ttl_seconds=60)
+        loader = FakeLoader({"tp_number": "100", "total_deposit": 0.0}, delay_seconds=0.05)
+        pending = asyncio.ensure_future(cache.get("100", loader))
+        await asyncio.sleep(0.01)
+        cache.invalidate("100")
+        await pending
+        loader.lead = {"tp_number": "100", "total_deposit": 50.0}
+        assert (await cache.get("100", loader))["total_deposit"] == 50.0
+        assert loader.calls == 2
+    asyncio.run(scenario())
+
+
+def test_remember_respects_generation():
+    """4. Adres sorgusundan gelen lead, sorgu sırasında invalidation olduysa cache'lenmez."""
+    cache = LeadCache(max_entries=100, ttl_seconds=60)
+    generation = cache.generation
+    cache.invalidate("100")
+    cache.remember("TAddrA", {"tp_number": "100"}, generation)
+    assert cache.owner_of("TAddrA") == "100"
+    assert cache.stats()["size"] == 0
+
+
+def main():
+    tests = [value for name, value in globals().items() if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"  ✅ {test.__doc__.strip()}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {test.__doc__.strip()}\n     {type(e).__name__}: {e}")
+    print(f"\n  {len(tests) - failed}/{len(tests)} test başarılı")
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
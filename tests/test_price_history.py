@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Dakikalık Fiyat Geçmişi Testi
+=============================
+PriceHistory'nin bar yazımı (aynı dakikada kapanış fiyatı, eski dakika yok sayılır),
+en yakın bar araması, saklama süresi kırpması ve kalıcı bar (store) fallback'ini
+doğrular. Dış servis gerekmez.
+
+Kullanım:
+    python tests/test_price_history.py
+    python -m pytest tests/test_price_history.py
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Proje ana dizinini sys.path'e ekle (Modülleri import edebilmek için)
+sys.path.append(str(Path(__file__).parent.parent))
+
+from core.currency.price_history import PriceHistory
+
+BASE = 1_800_000_000 - 1_800_000_000 % 60  # dakika başı (epoch saniye)
+
+
+def test_same_minute_keeps_closing_price():
+    """1. Aynı dakikadaki ikinci fiyat barın üstüne yazılır; eski dakika sıralamayı bozmaz."""
+    history = PriceHistory(retention_minutes=60)
+    history.record({"ETH": 100.0}, at=BASE + 5)
+    history.record({"ETH": 101.0, "BTC": 0}, at=BASE + 50)
+    history.record({"ETH": 90.0}, at=BASE - 120)
+    assert history.bars() == 1 and len(history) == 1
+    assert history.lookup("ETH", BASE + 30, 300) == (101.0, 30)
+
+
+def test_lookup_picks_nearest_bar_within_gap():
+    """2. İşlem anına en yakın bar seçilir; max_gap'ten uzak bar kullanılmaz."""
+    history = PriceHistory(retention_minutes=60)
+    history.record({"ETH": 100.0}, at=BASE)
+    history.record({"ETH": 110.0}, at=BASE + 600)
+    assert history.lookup("ETH", BASE + 100, 300) == (100.0, 100)
+    assert history.lookup("ETH", BASE + 500, 300) == (110.0, 100)
+    assert history.lookup("ETH", BASE + 300, 200) is None
+    assert history.lookup("BTC", BASE, 300) is None
+
+
+def test_retention_trims_old_bars():
+    """3. Saklama süresi %10 aşılınca en eski barlar toplu silinir."""
+    history = PriceHistory(retention_minutes=10)
+    for minute in range(12):
+        history.record({"ETH": float(minute + 1)}, at=BASE + minute * 60)
+    assert history.bars() == 10
+    assert history.lookup("ETH", BASE, 30) is None
+    assert history.lookup("ETH", BASE + 11 * 60, 30) == (12.0, 0)
+
+
+def test_find_falls_back_to_store():
+    """4. Bellekte bar yoksa find() kalıcı barlara bakar; store hatası None döner."""
+    async def scenario():
+        history = PriceHistory(retention_minutes=60)
+        history.record({"ETH": 100.0}, at=BASE)
+        queries = []
+
+        async def store(asset, at, max_gap_seconds):
+            queries.append(asset)
+            return (95.0, 10.0)
+
+        async def broken_store(asset, at, max_gap_seconds):
+            raise RuntimeError("mongo down")
+
+        history.store = store
+        assert await history.find("ETH", BASE, 300) == (100.0, 0)
+        assert await history.find("ETH", BASE - 86400, 300) == (95.0, 10.0)
+        assert queries == ["ETH"]
+        history.store = broken_store
+        assert await history.find("BTC", BASE, 300) is None
+    asyncio.run(scenario())
+
+
+def main():
+    tests = [value for name, value in globals().items() if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"  ✅ {test.__doc__.strip()}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {test.__doc__.strip()}\n     {type(e).__name__}: {e}")
+    print(f"\n  {len(tests) - failed}/{len(tests)} test başarılı")
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+PriceOracle Çoklu Kaynak Testi
+==============================
+Ağsız FakePriceProvider'larla PriceOracle'ın hedge, medyan, devre kesici ve
+deadline davranışlarını doğrular. Dış servis (Mongo, HTTP) gerekmez.
+
+Kullanım:
+    python tests/test_price_oracle.py
+    python -m pytest tests/test_price_oracle.py
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Proje ana dizinini sys.path'e ekle (Modülleri import edebilmek için)
+sys.path.append(str(Path(__file__).parent.parent))
+
+from core.currency.price_oracle import PriceOracle
+from core.currency.price_providers import CircuitBreaker, FakePriceProvider
+
+
+def make_provider(name: str, prices: dict, delay_seconds: float = 0.0, error: Exception = None,
+                  failure_threshold: int = 2, reset_seconds: float = 0.2) -> FakePriceProvider:
+    return FakePriceProvider(
+        CircuitBreaker(failure_threshold, reset_seconds), prices,
+        delay_seconds=delay_seconds, error=error, name=name,
+    )
+
+
+def make_oracle(providers: list, **overrides) -> PriceOracle:
+    options = dict(
+        ttl_seconds=0, fallback_max_staleness_seconds=0, timeout_seconds=1, max_connections=1,
+        deadline_seconds=0.5, hedge_delay_seconds=0.05,
+    )
+    options.update(overrides)
+    return PriceOracle(providers, **options)
+
+
+def test_hedge_uses_backup_when_primary_is_slow():
+    """1. Birincil kaynak hedge süresinde cevap vermezse yedek başlatılır ve onun cevabı kullanılır."""
+    async def scenario():
+        slow = make_provider("slow", {"ETH": 100.0}, delay_seconds=0.3)
+        fast = make_provider("fast", {"ETH": 101.0})
+        oracle = make_oracle([slow, fast])
+        started = time.monotonic()
+        prices = await oracle.refresh(["ETH"])
+        elapsed = time.monotonic() - started
+
+        assert prices == {"ETH": 101.0}
+        assert oracle.hedges == 1
+        assert elapsed < 0.2, f"hedge beklenenden yavaş: {elapsed:.2f} sn"
+        # Yetişemeyen kaynak iptal edilir ama hatalı sayılmaz
+        assert slow.breaker.state == "closed" and slow.breaker.failures == 0
+    asyncio.run(scenario())
+
+
+def test_failure_falls_through_without_waiting_for_hedge():
+    """2. Hata veren kaynağın yerine sıradaki hedge süresi beklenmeden başlatılır."""
+    async def scenario():
+        broken = make_provider("broken", {"ETH": 100.0}, error=ValueError("rate limit"))
+        backup = make_provider("backup", {"ETH": 102.0})
+        oracle = make_oracle([broken, backup], hedge_delay_seconds=10)
+        assert await oracle.refresh(["ETH"]) == {"ETH": 102.0}
+        assert oracle.hedges == 0
+        assert broken.breaker.failures == 1
+    asyncio.run(scenario())
+
+
+def test_breaker_opens_and_recovers_with_single_probe():
+    """3. Üst üste hatalar devre kesiciyi açar; reset süresinden sonra tek deneme ile kapanır."""
+    async def scenario():
+        flaky = make_provider("flaky", {"ETH": 100.0}, error=ValueError("down"))
+        backup = make_provider("backup", {"ETH": 103.0})
+        oracle = make_oracle([flaky, backup])
+
+        await oracle.refresh(["ETH"])
+        await oracle.refresh(["ETH"])
+        assert flaky.breaker.state == "open"
+
+        calls = flaky.calls
+        await oracle.refresh(["ETH"])
+        assert flaky.calls == calls, "açık devre kesicili kaynak sorgulandı"
+
+        await asyncio.sleep(0.25)
+        assert flaky.breaker.state == "half_open"
+        flaky.error = None
+        assert await oracle.refresh(["ETH"]) == {"ETH": 100.0}
+        assert flaky.calls == calls + 1
+        assert flaky.breaker.state == "closed"
+    asyncio.run(scenario())
+
+
+def test_deadline_bounds_fetch_and_counts_as_failure():
+    """4. Hiçbir kaynak deadline içinde cevap vermezse sorgu deadline'da hata ile biter."""
+    async def scenario():
+        first = make_provider("first", {"ETH": 1.0}, delay_seconds=2)
+        second = make_provider("second", {"ETH": 1.0}, delay_seconds=2)
+        oracle = make_oracle([first, second], deadline_seconds=0.3)
+        started = time.monotonic()
+        try:
+            await oracle.refresh(["ETH"])
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("deadline aşımında hata bekleniyordu")
+        assert time.monotonic() - started < 0.5
+        assert first.breaker.failures == 1 and second.breaker.failures == 1
+        assert oracle.errors == 1
+    asyncio.run(scenario())
+
+
+def test_median_ignores_single_outlier():
+    """5. Medyan: üç kaynaktan birinin hatalı fiyatı sonucu değiştirmez."""
+    async def scenario():
+        oracle = make_oracle([
+            make_provider("a", {"ETH": 100.0, "BTC": 50000.0}),
+            make_provider("b", {"ETH": 101.0, "BTC": 50010.0}),
+            make_provider("c", {"ETH": 1000.0, "BTC": 49990.0}),
+        ], aggregation="median", median_quorum=3)
+        assert await oracle.refresh(["ETH", "BTC"]) == {"ETH": 101.0, "BTC": 50000.0}
+    asyncio.run(scenario())
+
+
+def test_median_with_two_answers_does_not_average():
+    """6. Medyan modunda sadece iki cevap gelirse ortalama değil öncelikli kaynağın fiyatı alınır."""
+    async def scenario():
+        oracle = make_oracle([
+            make_provider("a", {"ETH": 1.0}),
+            make_provider("b", {"ETH": 3.0}),
+            make_provider("c", {"ETH": 2.0}, error=ValueError("down")),
+        ], aggregation="median", median_quorum=3)
+        assert await oracle.refresh(["ETH"]) == {"ETH": 1.0}
+    asyncio.run(scenario())
+
+
+def test_median_requires_three_providers():
+    """7. İki kaynakla median yapılandırması reddedilir."""
+    try:
+        make_oracle([make_provider("a", {}), make_provider("b", {})], aggregation="median")
+    except ValueError:
+        return
+    raise AssertionError("iki kaynakla median kabul edildi")
+
+
+def main():
+    tests = [value for name, value in globals().items() if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"  ✅ {test.__doc__.strip()}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {test.__doc__.strip()}\n     {type(e).__name__}: {e}")
+    print(f"\n  {len(tests) - failed}/{len(tests)} test başarılı")
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Token Registry Testi
+====================
+resolve_token'ın Cobo token_id çözümlemesini doğrular: bilinen token'lar, ağ
+önekli biçim, eş anlamlı adlar ve substring benzerliğiyle kaçmaya çalışan
+spam token'lar. Dış servis gerekmez.
+
+Kullanım:
+    python tests/test_token_registry.py
+    python -m pytest tests/test_token_registry.py
+"""
+
+import sys
+from pathlib import Path
+
+# Proje ana dizinini sys.path'e ekle (Modülleri import edebilmek için)
+sys.path.append(str(Path(__file__).parent.parent))
+
+from core.tokens.token_registry import resolve_token, priced_assets
+
+
+def test_known_tokens():
+    """1. Tablodaki ve ağ önekli token'lar doğru varlık, ağ ve ondalıkla çözülür."""
+    usdt = resolve_token("TRON_USDT")
+    assert (usdt.asset, usdt.chain, usdt.decimals, usdt.stablecoin) == ("USDT", "TRON", 6, True)
+    bsc = resolve_token("BSC_USDT")
+    assert (bsc.asset, bsc.chain, bsc.decimals) == ("USDT", "BSC", 18)
+    eth = resolve_token("ETH")
+    assert (eth.asset, eth.chain, eth.stablecoin) == ("ETH", "ETH", False)
+
+
+def test_aliases_and_case():
+    """2. Eş anlamlı adlar ve küçük harf/boşluklu token_id'ler normalize edilir."""
+    assert resolve_token("TRON").asset == "TRX"
+    assert resolve_token(" tron_usdt ").token_id == "TRON_USDT"
+
+
+def test_spam_tokens_are_rejected():
+    """3. Bilinen ağ/varlık adını içeren sahte token'lar ve boş değer reddedilir."""
+    for token_id in ("ETH_AIRDROP", "TRON_FAKEUSD", "SCAMCOIN", "ETH_USDT_FAKE", "FOO_USDT", "", None):
+        assert resolve_token(token_id) is None, token_id
+
+
+def test_priced_assets_exclude_stablecoins():
+    """4. Fiyatı çekilecek varlıklar stablecoin içermez."""
+    assets = priced_assets()
+    assert "USDT" not in assets and "USDC" not in assets
+    assert "ETH" in assets and assets == sorted(assets)
+
+
+def main():
+    tests = [value for name, value in globals().items() if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"  ✅ {test.__doc__.strip()}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {test.__doc__.strip()}\n     {type(e).__name__}: {e}")
+    print(f"\n  {len(tests) - failed}/{len(tests)} test başarılı")
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+İşlem Durum Makinesi Testi
+==========================
+TransactionStateMachine'in begin/settle geçişlerini ve _handle_transaction'ın
+settled kararını bellek içi sahte durum deposuyla (db.transaction_states'in
+advance/settle semantiği) doğrular. Gerçek Mongo gerekmez.
+
+Kullanım:
+    python tests/test_transaction_state.py
+    python -m pytest tests/test_transaction_state.py
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Proje ana dizinini sys.path'e ekle (Modülleri import edebilmek için)
+sys.path.append(str(Path(__file__).parent.parent))
+
+import workers.transaction_state as transaction_state
+import workers.webhook_processor as webhook_processor
+from core.transaction.transaction_event import TransactionEvent
+
+
+class FakeStateStore:
+    """advance_transaction_state / settle_transaction_state'in bellek içi karşılığı."""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def advance(self, transaction_id, status, rank, allow_equal=False):
+        doc = self.docs.get(transaction_id)
+        if doc is not None:
+            if doc["settled"] or doc["rank"] > rank or (doc["rank"] == rank and not allow_equal):
+                return False
+        self.docs[transaction_id] = {"status": status, "rank": rank,
+                                     "settled": doc["settled"] if doc else False}
+        return True
+
+    async def settle(self, transaction_id, status):
+        self.docs.setdefault(transaction_id, {"rank": 0})
+        self.docs[transaction_id].update(status=status, settled=True)
+
+
+def make_machine() -> tuple:
+    store = FakeStateStore()
+    transaction_state.advance_transaction_state = store.advance
+    transaction_state.settle_transaction_state = store.settle
+    return transaction_state.TransactionStateMachine(max_entries=100, ttl_seconds=60), store
+
+
+def make_event(transaction_id: str, status: str) -> TransactionEvent:
+    return TransactionEvent(
+        transaction_id=transaction_id, status=status, tx_type="DEPOSIT", address="TAddr",
+        from_address="TFrom", wallet_id="w", amount=10.0, amount_raw="10", symbol="TRON_USDT",
+        chain_id="TRON",
+    )
+
+
+def test_intermediate_then_terminal():
+    """1. Ara durum pipeline'a girmez; ilk başarılı terminal girer, settle sonrası tekrarı elenir."""
+    async def scenario():
+        machine, store = make_machine()
+        assert await machine.begin("t1", "CONFIRMING") is False
+        assert store.docs["t1"]["rank"] == 60 and not store.docs["t1"]["settled"]
+        assert await machine.begin("t1", "COMPLETED") is True
+        await machine.settle("t1", "COMPLETED")
+        assert await machine.begin("t1", "COMPLETED") is False
+        assert store.docs["t1"]["settled"] is True
+    asyncio.run(scenario())
+
+
+def test_out_of_order_event_is_skipped():
+    """2. Terminal durumdan sonra gelen eski ara durum elenir."""
+    async def scenario():
+        machine, _ = make_machine()
+        assert await machine.begin("t2", "COMPLETED") is True
+        assert await machine.begin("t2", "CONFIRMING") is False
+        assert machine.skipped == 1
+    asyncio.run(scenario())
+
+
+def test_unsettled_terminal_can_be_retried():
+    """3. Settle edilmemiş başarılı terminal olay (yarıda kalan pipeline) tekrar işlenebilir."""
+    async def scenario():
+        machine, _ = make_machine()
+        assert await machine.begin("t3", "COMPLETED") is True
+        assert await machine.begin("t3", "COMPLETED") is True
+    asyncio.run(scenario())
+
+
+def test_failure_status_settles_without_pipeline():
+    """4. FAILED terminal durumu pipeline'a girmeden settled olur."""
+    async def scenario():
+        machine, store = make_machine()
+        assert await machine.begin("t4", "FAILED") is False
+        assert store.docs["t4"]["settled"] is True
+        assert await machine.begin("t4", "COMPLETED") is False
+    asyncio.run(scenario())
+
+
+def test_handle_transaction_settles_only_definitive_outcomes():
+    """5. _handle_transaction: kredilenmeyen olay settled olmaz, sonraki retry pipeline'a tekrar girer."""
+    async def scenario():
+        machine, store = make_machine()
+        outcomes = [False, True]
+        calls = []
+
+        async def fake_pipeline(event):
+            calls.append(event.transaction_id)
+            return outcomes.pop(0)
+
+        original = (webhook_processor.transaction_states, webhook_processor._filter_and_process_transaction)
+        webhook_processor.transaction_states = machine
+        webhook_processor._filter_and_process_transaction = fake_pipeline
+        try:
+            await webhook_processor._handle_transaction(make_event("t5", "COMPLETED"))
+            assert not store.docs["t5"]["settled"], "kredilenmeyen işlem settled işaretlendi"
+            await webhook_processor._handle_transaction(make_event("t5", "COMPLETED"))
+            assert store.docs["t5"]["settled"] is True
+            await webhook_processor._handle_transaction(make_event("t5", "COMPLETED"))
+            assert calls == ["t5", "t5"]
+        finally:
+            webhook_processor.transaction_states, webhook_processor._filter_and_process_transaction = original
+    asyncio.run(scenario())
+
+
+def main():
+    tests = [value for name, value in globals().items() if name.startswith("test_") and callable(value)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"  ✅ {test.__doc__.strip()}")
+        except Exception as e:
+            failed += 1
+            print(f"  ❌ {test.__doc__.strip()}\n     {type(e).__name__}: {e}")
+    print(f"\n  {len(tests) - failed}/{len(tests)} test başarılı")
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
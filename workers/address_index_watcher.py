@@ -0,0 +1,89 @@
+"""
+Adres İndeksi Senkronizasyonu
+=============================
+Bellek içi adres indeksini (core/cache/address_index.py) diğer process'lerin
+eklediği cüzdanlarla güncel tutar. İki mod:
+
+- ADDRESS_INDEX_CHANGE_STREAM=true : COBO koleksiyonu change stream ile izlenir,
+  yeni wallets[].address değerleri anında eklenir (replica set gerekir — Atlas).
+  Stream koparsa resume token ile kaldığı yerden devam eder.
+- Aksi halde: ADDRESS_INDEX_RELOAD_SECONDS'ta bir tam yeniden yükleme (0 = kapalı).
+
+Tek process'te ikisi de gerekmez; save_wallet_to_lead ve wallets.addresses.created
+olayları indeksi zaten artımlı günceller.
+
+Change stream açıkken değişen lead'ler lead cache'ten de düşürülür
+(core/cache/lead_cache.py) — mt5_worker.py gibi ayrı process'lerin yazımları için.
+"""
+
+import asyncio
+import logging
+
+from core.cache.address_index import address_index
+from core.cache.lead_cache import lead_cache
+from servisler.db_service import load_address_index, watch_lead_wallets
+from config.settings import ADDRESS_INDEX_CHANGE_STREAM, ADDRESS_INDEX_RELOAD_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Change stream hatasından sonra yeniden bağlanma beklemesi (saniye)
+RECONNECT_DELAY_SECONDS = 5
+
+
+class AddressIndexWatcher:
+    """Adres indeksini change stream veya periyodik yükleme ile senkron tutar."""
+
+    def __init__(self, use_change_stream: bool, reload_seconds: float):
+        self.use_change_stream = use_change_stream
+        self.reload_seconds = reload_seconds
+        self._task = None
+        self._resume_token = None
+
+    async def start(self):
+        """İndeksi yükler ve seçilen senkronizasyon modunu başlatır."""
+        count = await load_address_index()
+        logger.info(f"✅ Adres indeksi yüklendi ({count} adres)")
+
+        if self.use_change_stream:
+            self._task = asyncio.create_task(self._follow_change_stream())
+        elif self.reload_seconds > 0:
+            self._task = asyncio.create_task(self._reload_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _follow_change_stream(self):
+        while True:
+            try:
+                async with watch_lead_wallets(resume_after=self._resume_token) as stream:
+                    async for change in stream:
+                        self._resume_token = change.get("_id")
+                        lead = change.get("fullDocument") or {}
+                        # Başka process'in (mt5_worker vb.) yazımı: lead cache'i düşür
+                        lead_cache.invalidate(lead.get("tp_number"))
+                        address_index.add_many(
+                            wallet.get("address") for wallet in lead.get("wallets", [])
+                        )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Adres change stream hatası: {e}")
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+    async def _reload_loop(self):
+        while True:
+            await asyncio.sleep(self.reload_seconds)
+            try:
+                await load_address_index()
+            except Exception as e:
+                logger.error(f"❌ Adres indeksi yenilenemedi: {e}")
+
+
+# Uygulama genelinde tek instance
+address_index_watcher = AddressIndexWatcher(
+    use_change_stream=ADDRESS_INDEX_CHANGE_STREAM,
+    reload_seconds=ADDRESS_INDEX_RELOAD_SECONDS,
+)
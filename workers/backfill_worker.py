@@ -0,0 +1,257 @@
+"""
+Cobo İşlem Backfill / Replay Motoru
+===================================
+Sistem kapalıyken kaçırılan webhook'ların yatırımlarını bulmak için Cobo işlem
+geçmişini cursor ile sayfa sayfa tarar ve her işlemi webhook ile AYNI
+_handle_transaction akışından geçirir.
+
+PROCESS:
+--------
+Onay bekleyen yatırımlar (workers/pending_store.py) API process'inin belleğinde
+tutulur; Telegram ONAYLA butonu da o process'e gelir. Bu yüzden işlemleri doğrudan
+işleyebilen tek yer admin endpoint'idir (POST /api/admin/backfill, API process'i).
+Komut satırından çalıştırılan backfill (ayrı process) işlemleri İŞLEMEZ, sadece
+webhook outbox'ına yazar; API process'indeki kuyruk worker'ları normal akışla işler.
+
+GÜVENLİK:
+---------
+try_lock_transaction idempotent olduğu için daha önce işlenmiş yatırımlar
+tekrar kredilendirilmez; aynı aralık istenildiği kadar tekrar oynatılabilir.
+
+DEVAM ETME:
+-----------
+Her sayfa bittikten sonra cursor db.backfill_checkpoints koleksiyonuna yazılır.
+İş yarıda kalırsa (restart/hata) bir sonraki çalıştırmada kaldığı yerden devam eder.
+
+İşlenemeyen işlemler atlanmaz: webhook outbox'ına (db.webhook_outbox) yazılır ve
+kuyruk worker'ları tarafından normal retry/backoff ile yeniden denenir; id'leri
+checkpoint'te failed_ids olarak tutulur. Outbox'a da yazılamazsa cursor o sayfayı
+geçmez, iş hata ile durur ve sonraki çalıştırma aynı sayfadan devam eder.
+
+Kullanım (olaylar API process'inin kuyruğuna yazılır):
+    python -m workers.backfill_worker --since 2026-10-01 --until 2026-10-02
+    python -m workers.backfill_worker --since 2026-10-01 --restart   # checkpoint'i yok say
+"""
+
+import argparse
+import asyncio
+import datetime
+import logging
+
+from servisler.sweep_service import CoboSweepService
+from servisler.db_service import get_backfill_checkpoint, save_backfill_checkpoint
+from servisler.telegram_service import send_telegram_msg
+from core.transaction.transaction_event import TransactionEvent
+from workers.webhook_processor import _handle_transaction
+from workers.webhook_queue import webhook_queue
+from config.settings import COBO_WALLET_ID, BACKFILL_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_NAME = "cobo_transactions"
+
+# Cobo list_transactions: sayfa başına en fazla 50 kayıt, tek sorguda en fazla 90 gün
+PAGE_SIZE = 50
+MAX_WINDOW_MS = 90 * 24 * 60 * 60 * 1000
+
+
+def _to_ms(value: datetime.datetime) -> int:
+    return int(value.timestamp() * 1000)
+
+
+class CoboBackfill:
+    """Cobo işlem geçmişini checkpoint'li cursor ile tarayıp yeniden işler."""
+
+    def __init__(self, wallet_id: str, concurrency: int, name: str = CHECKPOINT_NAME,
+                 enqueue_only: bool = False):
+        """
+        Args:
+            enqueue_only: True ise işlemler burada işlenmez, webhook outbox'ına yazılır
+                          (API process'i dışında çalışan backfill için zorunlu)
+        """
+        self.wallet_id = wallet_id
+        self.concurrency = max(1, concurrency)
+        self.name = name
+        self.enqueue_only = enqueue_only
+        self.service = CoboSweepService()
+        self.running = False
+        self.task = None  # start() ile başlatılan arka plan görevi (GC'ye karşı referans)
+
+    def start(self, since_ms: int, until_ms: int = None, restart: bool = False) -> asyncio.Task:
+        """run()'ı arka plan görevi olarak başlatır; bitişte sonuç loglanır, hata Telegram'a bildirilir."""
+        if self.running or (self.task is not None and not self.task.done()):
+            raise RuntimeError("Backfill zaten çalışıyor")
+        self.task = asyncio.create_task(self.run(since_ms, until_ms, restart))
+        self.task.add_done_callback(self._on_done)
+        return self.task
+
+    def _on_done(self, task: asyncio.Task):
+        if task.cancelled():
+            logger.warning("🛑 Backfill iptal edildi")
+            return
+        error = task.exception()
+        if error is not None:
+            logger.error(f"❌ Backfill yarıda kaldı (checkpoint'ten devam edilebilir): {error}")
+            send_telegram_msg(f"❌ <b>BACKFILL HATASI</b>\n⚠️ {error}\nCheckpoint'ten devam edilebilir.")
+            return
+        result = task.result()
+        if result["failed"]:
+            send_telegram_msg(
+                f"⚠️ <b>BACKFILL TAMAMLANDI</b>\n"
+                f"✅ İşlenen: {result['processed']} | ♻️ Outbox'ta yeniden denenecek: {result['failed']}"
+            )
+
+    async def run(self, since_ms: int, until_ms: int = None, restart: bool = False) -> dict:
+        """
+        [since_ms, until_ms] aralığındaki Deposit işlemlerini yeniden işler.
+
+        Returns:
+            dict: processed / failed sayıları ve outbox'a alınan failed_ids
+        """
+        if self.running:
+            raise RuntimeError("Backfill zaten çalışıyor")
+        self.running = True
+        try:
+            return await self._run(since_ms, until_ms, restart)
+        finally:
+            self.running = False
+
+    async def _run(self, since_ms: int, until_ms: int, restart: bool) -> dict:
+        until_ms = until_ms or _to_ms(datetime.datetime.now(datetime.timezone.utc))
+        checkpoint = None if restart else await get_backfill_checkpoint(self.name)
+
+        if checkpoint and not checkpoint.get("finished_at") and checkpoint.get("since") == since_ms:
+            # Aynı aralık yarıda kalmış: aynı bitişe kadar kaldığı yerden devam
+            until_ms = checkpoint["until"]
+            window_start = checkpoint["window_start"]
+            after = checkpoint.get("after")
+            processed = checkpoint.get("processed", 0)
+            failed = checkpoint.get("failed", 0)
+            failed_ids = checkpoint.get("failed_ids") or []
+            logger.info(f"♻️ Backfill checkpoint'ten devam ediyor (processed={processed})")
+        else:
+            window_start, after, processed, failed, failed_ids = since_ms, None, 0, 0, []
+            await save_backfill_checkpoint(self.name, {
+                "since": since_ms,
+                "window_start": window_start,
+                "until": until_ms,
+                "after": None,
+                "processed": 0,
+                "failed": 0,
+                "failed_ids": [],
+                "started_at": datetime.datetime.now(datetime.timezone.utc),
+                "finished_at": None,
+            })
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        while window_start < until_ms:
+            window_end = min(window_start + MAX_WINDOW_MS, until_ms)
+
+            while True:
+                page = await self._fetch_page(window_start, window_end, after)
+                transactions = page.get("data") or []
+
+                results = await asyncio.gather(
+                    *(self._replay(tx, semaphore) for tx in transactions)
+                )
+                processed += sum(1 for ok in results if ok)
+                page_failures = [tx for tx, ok in zip(transactions, results) if not ok]
+                # Hatalılar outbox'a yazılmadan cursor ilerlemez (yazılamazsa hata fırlar)
+                for tx in page_failures:
+                    await self._enqueue_retry(tx)
+                failed += len(page_failures)
+                failed_ids += [tx.get("transaction_id") for tx in page_failures]
+
+                after = (page.get("pagination") or {}).get("after") or None
+                await save_backfill_checkpoint(self.name, {
+                    "window_start": window_start,
+                    "after": after,
+                    "processed": processed,
+                    "failed": failed,
+                    "failed_ids": failed_ids,
+                })
+                if not after or not transactions:
+                    break
+
+            window_start, after = window_end, None
+            await save_backfill_checkpoint(self.name, {"window_start": window_start, "after": None})
+
+        await save_backfill_checkpoint(self.name, {
+            "finished_at": datetime.datetime.now(datetime.timezone.utc)
+        })
+        logger.info(f"✅ Backfill tamamlandı: {processed} işlem, {failed} hata (outbox'ta yeniden denenecek)")
+        return {"processed": processed, "failed": failed, "failed_ids": failed_ids}
+
+    async def _fetch_page(self, window_start: int, window_end: int, after: str) -> dict:
+        """Cobo SDK senkron olduğu için executor'da çalıştırılır."""
+        loop = asyncio.get_event_loop()
+        result = await loop.run_in_executor(
+            None,
+            lambda: self.service.list_transactions(
+                self.wallet_id,
+                limit=PAGE_SIZE,
+                after=after,
+                types="Deposit",
+                min_created_timestamp=window_start,
+                max_created_timestamp=window_end,
+                direction="ASC",
+            )
+        )
+        if not result.get("success"):
+            # Checkpoint korunur; bir sonraki çalıştırma bu sayfadan devam eder
+            raise RuntimeError(f"Cobo list_transactions hatası: {result.get('error')}")
+        return result["data"]
+
+    async def _replay(self, tx: dict, semaphore: asyncio.Semaphore) -> bool:
+        async with semaphore:
+            if self.enqueue_only:
+                # Outbox'a yazılamazsa hata fırlar ve cursor bu sayfayı geçmez
+                await self._enqueue(tx)
+                return True
+            event = TransactionEvent.from_cobo_transaction(tx, event_type="backfill")
+            try:
+                await _handle_transaction(event)
+                return True
+            except Exception as e:
+                logger.error(f"❌ Backfill işlem hatası ({event.transaction_id}): {e}")
+                return False
+
+    async def _enqueue(self, tx: dict):
+        """İşlemi webhook formatında outbox'a yazar (kuyruk worker'ları işler)."""
+        await webhook_queue.enqueue({
+            "event_id": f"backfill-{tx.get('transaction_id')}",
+            "type": "TRANSACTION",
+            "data": tx,
+        })
+
+    async def _enqueue_retry(self, tx: dict):
+        """İşlenemeyen işlemi outbox'a yazar (kuyruk normal retry/backoff ile yeniden dener)."""
+        await self._enqueue(tx)
+        logger.warning(f"♻️ Backfill işlemi outbox'a alındı: {tx.get('transaction_id')}")
+
+
+# Admin endpoint'lerinin paylaştığı tek instance
+cobo_backfill = CoboBackfill(wallet_id=COBO_WALLET_ID, concurrency=BACKFILL_CONCURRENCY)
+
+
+def parse_iso_to_ms(value: str) -> int:
+    """ISO tarih/saat (UTC kabul edilir) → Unix ms."""
+    return _to_ms(datetime.datetime.fromisoformat(value).replace(tzinfo=datetime.timezone.utc))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cobo işlem geçmişini yeniden işler")
+    parser.add_argument("--since", required=True, help="Başlangıç (ISO, örn: 2026-10-01 veya 2026-10-01T08:00)")
+    parser.add_argument("--until", help="Bitiş (ISO). Boşsa şu an")
+    parser.add_argument("--concurrency", type=int, default=BACKFILL_CONCURRENCY)
+    parser.add_argument("--restart", action="store_true", help="Checkpoint'i yok say, baştan başla")
+    args = parser.parse_args()
+
+    # Bu process'te onay kaydı tutulamaz: işlemler API process'inin kuyruğuna bırakılır
+    backfill = CoboBackfill(wallet_id=COBO_WALLET_ID, concurrency=args.concurrency, enqueue_only=True)
+    result = asyncio.run(backfill.run(
+        since_ms=parse_iso_to_ms(args.since),
+        until_ms=parse_iso_to_ms(args.until) if args.until else None,
+        restart=args.restart,
+    ))
+    print(f"✅ {result['processed']} işlem outbox'a yazıldı; API process'indeki kuyruk işleyecek.")
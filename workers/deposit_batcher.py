@@ -0,0 +1,209 @@
+"""
+Yatırım Micro-Batch Aşaması
+===========================
+Yoğun dönemlerde (sweep, airdrop fırtınası) queue worker'larının aynı anda
+işlediği yatırımların Mongo işlemlerini toplu hale getirir.
+
+Kısa bir pencerede (WEBHOOK_BATCH_WINDOW_MS) veya WEBHOOK_BATCH_MAX_EVENTS
+dolunca toplanan yatırımlar için:
+1. Tüm lead'ler TEK $in sorgusu ile bulunur      (get_leads_by_addresses)
+2. Kur çevirileri paralel yapılır
+3. Tüm kilitler TEK unordered bulk_write ile alınır ve
+4. total_deposit / deposit_count TEK bulk_write ile artırılır — ikisi aynı Mongo
+   transaction'ında (record_deposits_bulk); tekil akıştaki record_deposit gibi atomik
+
+GERÇEK KAZANÇ:
+--------------
+Her queue worker submit() sonucunu beklediği için bir batch en fazla
+WEBHOOK_QUEUE_CONCURRENCY olay tutar (MAX_EVENTS bu sınıra kırpılır). Yani
+kazanç, eşzamanlı N yatırımın N lead sorgusu + N kilit/istatistik
+transaction'ı yerine 1 sorgu + 1 transaction ile yazılmasıdır. Tüm worker'lar
+yatırım işlerken batch dolduğu an flush edilir; pencere yalnızca daha az
+eşzamanlı yatırım varken beklenir, bu yüzden kısa tutulmalıdır.
+
+Her submit() çağrısı, tekil akıştaki _credit_deposit ile aynı sonucu döner;
+sonraki adımlar (MT5 metadata, Telegram, routing) olay bazında devam eder.
+"""
+
+import asyncio
+import logging
+import time
+
+from servisler.db_service import (
+    get_leads_by_addresses,
+    record_deposits_bulk,
+)
+from core.metrics.latency import pipeline_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class DepositBatcher:
+    """Yatırımları zaman/adet penceresinde toplayıp toplu Mongo işlemleriyle kaydeder."""
+
+    def __init__(self, convert, window_ms: int, max_events: int):
+        """
+        Args:
+            convert:    async (symbol, amount, created_timestamp) -> {"amount", "rate", "price_age_seconds"}
+                        (fiyat yoksa hata fırlatır; sadece o olay başarısız olur)
+            window_ms:  İlk olaydan sonra batch'in bekleme süresi
+            max_events: Bu sayıya ulaşınca beklemeden flush edilir
+        """
+        self._convert = convert
+        self.window_seconds = window_ms / 1000
+        self.max_events = max(1, max_events)
+        self._pending: list = []  # [(item, future)]
+        self._timer = None
+        self._flush_tasks: set = set()
+
+    async def submit(self, transaction_id: str, address: str, amount: float, symbol: str, status: str,
+                     created_timestamp: int = None):
+        """
+        Yatırımı sıradaki batch'e ekler ve batch işlenince sonucunu döner.
+
+        Returns:
+            dict: tp_number, name, usd_amount, price_age_seconds, total_deposit, total_withdrawal, deposit_count
+            None: Bilinmeyen adres veya işlem zaten işlenmiş
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        item = {
+            "transaction_id": transaction_id,
+            "address": address,
+            "amount": amount,
+            "symbol": symbol,
+            "status": status,
+            "created_timestamp": created_timestamp,
+        }
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_events:
+            self._flush_now()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self._flush_now)
+
+        return await future
+
+    def _flush_now(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._flush(batch))
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush(self, batch: list):
+        try:
+            results = await self._process([item for item, _ in batch])
+        except Exception as e:
+            logger.error(f"❌ Yatırım batch hatası ({len(batch)} olay): {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def _process(self, items: list) -> list:
+        results = [None] * len(items)
+
+        # 1. Lead'leri tek sorguda bul
+        started = time.perf_counter()
+        leads = await get_leads_by_addresses({item["address"] for item in items})
+        self._observe("lead_lookup", started)
+
+        known = []
+        seen_ids = set()
+        for index, item in enumerate(items):
+            lead = leads.get(item["address"])
+            if not lead:
+                logger.warning(f"⚠️ Bilinmeyen adrese deposit: {item['address']} - Tx: {item['transaction_id']}")
+                continue
+            if item["transaction_id"] in seen_ids:
+                logger.info(f"⏭️ İşlem aynı batch'te tekrarlandı: {item['transaction_id']}")
+                continue
+            seen_ids.add(item["transaction_id"])
+            known.append((index, item, lead))
+
+        if not known:
+            return results
+
+        # 2. Kur çevirileri (paralel). Fiyatı olmayan olay batch'ten çıkar ve hata ile
+        # döner (kuyruk yeniden dener); diğerleri etkilenmez.
+        conversions = await asyncio.gather(
+            *(self._convert(item["symbol"], item["amount"], item["created_timestamp"]) for _, item, _ in known),
+            return_exceptions=True
+        )
+        converted = []
+        for entry, conversion in zip(known, conversions):
+            if isinstance(conversion, Exception):
+                results[entry[0]] = conversion
+            else:
+                converted.append((entry, conversion))
+        known = [entry for entry, _ in converted]
+        conversions = [conversion for _, conversion in converted]
+        usd_amounts = [conversion["amount"] for conversion in conversions]
+        if not known:
+            return results
+
+        # 3-4. Kilitler + istatistikler tek Mongo transaction'ında (atomik)
+        started = time.perf_counter()
+        claimed, updated_leads = await record_deposits_bulk([
+            {
+                "transaction_id": item["transaction_id"],
+                "tp_number": lead.get("tp_number"),
+                "amount": usd_amount,
+                "symbol": item["symbol"],
+                "status": item["status"],
+                "raw_amount": item["amount"],
+                "usd_rate": conversion["rate"],
+                "price_age_seconds": conversion["price_age_seconds"],
+            }
+            for (_, item, lead), usd_amount, conversion in zip(known, usd_amounts, conversions)
+        ])
+        self._observe("ledger_write", started)
+
+        credited = []
+        for (index, item, lead), conversion in zip(known, conversions):
+            if item["transaction_id"] in claimed:
+                credited.append((index, lead, conversion))
+            else:
+                logger.info(f"⏭️ İşlem zaten işlenmiş (Race Condition Önlemi): {item['transaction_id']}")
+
+        if not credited:
+            return results
+
+        # Aynı müşterinin batch'te birden fazla yatırımı varsa her olay kendi
+        # sırasındaki ara toplamı görür (tekil akışla aynı mesajlar)
+        later = {}
+        for index, lead, conversion in reversed(credited):
+            usd_amount = conversion["amount"]
+            tp_number = str(lead.get("tp_number"))
+            updated = updated_leads.get(tp_number, {})
+            later_amount, later_count = later.get(tp_number, (0.0, 0))
+            results[index] = {
+                "tp_number": lead.get("tp_number"),
+                "name": lead.get("name", "Bilinmeyen"),
+                "usd_amount": usd_amount,
+                "price_age_seconds": conversion["price_age_seconds"],
+                "total_deposit": updated.get("total_deposit", 0) - later_amount,
+                "total_withdrawal": updated.get("total_withdrawal", 0),
+                "deposit_count": updated.get("deposit_count", 1) - later_count,
+            }
+            later[tp_number] = (later_amount + usd_amount, later_count + 1)
+
+        logger.info(f"📦 Yatırım batch'i işlendi: {len(items)} olay, {len(credited)} kayıt")
+        return results
+
+    @staticmethod
+    def _observe(stage: str, started: float):
+        # Batch aşamaları birden fazla olaya ait; event_type/token kırılımına yazılmaz
+        pipeline_metrics.observe(stage, time.perf_counter() - started, event_type=None, token=None)
@@ -0,0 +1,112 @@
+"""
+Webhook Tekrar (Duplicate) Eleyici
+==================================
+Cobo aynı event_id'yi birden fazla kez gönderebilir; ayrıca aynı işlem için
+wallets.transaction.created / updated / succeeded olayları aynı status ile gelir.
+Bu olayların her biri eskiden tüm pipeline'dan (filtreler, lead sorgusu, kur)
+geçip ancak try_lock_transaction'da reddediliyordu.
+
+Bu katman olayları outbox'a yazılmadan ÖNCE eler:
+- Bellek içi LRU+TTL cache (mikrosaniye, DB/HTTP yok)
+- Opsiyonel Mongo yedeği (WEBHOOK_DEDUP_SHARED=true) — birden fazla process için
+
+Anahtarlar:
+- evt:<event_id>
+- tx:<transaction_id>:<status>
+
+NOT: Asıl çift işlem koruması yine try_lock_transaction'dır. Bu katman sadece
+gereksiz işi ucuza eler.
+"""
+
+import logging
+
+from core.cache.lru_ttl_cache import LruTtlCache
+from core.transaction.transaction_event import TransactionEvent
+from servisler.db_service import is_webhook_seen, mark_webhook_seen
+from config.settings import (
+    WEBHOOK_DEDUP_MAX_ENTRIES,
+    WEBHOOK_DEDUP_TTL_SECONDS,
+    WEBHOOK_DEDUP_SHARED,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookDeduplicator:
+    """event_id ve (transaction_id, status) bazlı tekrar eleyici."""
+
+    def __init__(self, max_entries: int, ttl_seconds: int, shared: bool = False):
+        self.shared = shared
+        self._seen = LruTtlCache(max_size=max_entries, ttl_seconds=ttl_seconds)
+        self.dropped = 0
+
+    @staticmethod
+    def dedup_keys(data: dict) -> list:
+        """Payload'dan dedup anahtarlarını çıkarır (JSON nesnesi değilse anahtar yok)."""
+        if not isinstance(data, dict):
+            return []
+        keys = []
+        event_id = data.get("event_id")
+        if event_id:
+            keys.append(f"evt:{event_id}")
+
+        event = TransactionEvent.from_webhook(data)
+        if event.transaction_id and event.status:
+            keys.append(f"tx:{event.transaction_id}:{event.status}")
+        return keys
+
+    async def is_duplicate(self, data: dict) -> bool:
+        """
+        Olay daha önce kabul edilmiş mi? Önce bellek, sonra (opsiyonel) Mongo.
+        Yeni olayın anahtarları hemen bellekte rezerve edilir; böylece aynı anda
+        gelen eş retry'lar da elenir.
+        """
+        keys = self.dedup_keys(data)
+        if not keys:
+            return False
+
+        for key in keys:
+            if key in self._seen:
+                self.dropped += 1
+                return True
+
+        if self.shared:
+            try:
+                if await is_webhook_seen(keys):
+                    # Sonraki tekrarlar için belleği ısıt
+                    for key in keys:
+                        self._seen.set(key, True)
+                    self.dropped += 1
+                    return True
+            except Exception as e:
+                # Dedup bir optimizasyon; Mongo hatası olayı engellememeli
+                logger.error(f"❌ Dedup Mongo kontrol hatası: {e}")
+
+        for key in keys:
+            self._seen.set(key, True)
+        return False
+
+    def forget(self, data: dict):
+        """Kuyruğa yazılamayan olayın rezervasyonunu kaldırır (Cobo retry'ı elenmesin)."""
+        for key in self.dedup_keys(data):
+            self._seen.pop(key)
+
+    async def remember(self, data: dict):
+        """Kuyruğa yazılan olayın anahtarlarını paylaşımlı depoya (Mongo) da kaydeder."""
+        if not self.shared:
+            return
+        keys = self.dedup_keys(data)
+        if not keys:
+            return
+        try:
+            await mark_webhook_seen(keys)
+        except Exception as e:
+            logger.error(f"❌ Dedup Mongo kayıt hatası: {e}")
+
+
+# Uygulama genelinde tek instance
+webhook_deduplicator = WebhookDeduplicator(
+    max_entries=WEBHOOK_DEDUP_MAX_ENTRIES,
+    ttl_seconds=WEBHOOK_DEDUP_TTL_SECONDS,
+    shared=WEBHOOK_DEDUP_SHARED,
+)
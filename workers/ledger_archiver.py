@@ -0,0 +1,57 @@
+"""
+İşlem Defteri Arşivleyici
+=========================
+LEDGER_ARCHIVE_AFTER_DAYS'ten eski defter kayıtlarını LEDGER_ARCHIVE_INTERVAL_SECONDS'ta
+bir db.transactions_archive'a taşır (servisler/db_service.py → archive_ledger_entries).
+
+transactions'ta kayıt SİLİNMEZ: transaction_id kilidi ve rapor alanları (brüt/komisyon/net
+USD dahil) kalır, sadece detay alanları (status_history, kur, MT5 ticket vb.) kaldırılır;
+get_ledger_entries bunları arşivden tamamlar. Böylece eski bir işlem
+backfill/replay ile tekrar gelse de çift kredi oluşmaz; koleksiyon ve index'ler küçük kalır.
+"""
+
+import asyncio
+import logging
+
+from servisler.db_service import archive_ledger_entries
+from config.settings import LEDGER_ARCHIVE_AFTER_DAYS, LEDGER_ARCHIVE_INTERVAL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class LedgerArchiver:
+    """Eski defter kayıtlarını periyodik olarak arşivleyen arka plan görevi."""
+
+    def __init__(self, after_days: int, interval_seconds: float):
+        self.after_days = after_days
+        self.interval_seconds = interval_seconds
+        self._task = None
+
+    async def start(self):
+        if self.after_days > 0 and self._task is None:
+            self._task = asyncio.create_task(self._archive_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _archive_loop(self):
+        while True:
+            try:
+                archived = await archive_ledger_entries(self.after_days)
+                if archived:
+                    logger.info(f"🗄️ Defter arşivlendi: {archived} kayıt ({self.after_days} günden eski)")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Defter arşivlenemedi: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+
+# Uygulama genelinde tek instance
+ledger_archiver = LedgerArchiver(
+    after_days=LEDGER_ARCHIVE_AFTER_DAYS,
+    interval_seconds=LEDGER_ARCHIVE_INTERVAL_SECONDS,
+)
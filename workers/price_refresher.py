@@ -0,0 +1,129 @@
+"""
+Fiyat Yenileyici
+================
+İzinli (stablecoin olmayan) varlıkların USD fiyatlarını PRICE_REFRESH_SECONDS'ta
+bir çekip paylaşılan fiyat cache'ine (core/currency/price_cache.py) yazar.
+Hacim filtresi ve USD çevirisi (convert_to_usd) aynı cache'ten okur; böylece filtre kararı ile
+kaydedilen USD tutarı aynı kura dayanır ve webhook yolu ağ beklemez.
+
+Tüm varlıklar PriceOracle üzerinden TEK sorguda çekilir (kaynaklar hedge edilir,
+devre kesicisi açık olan atlanır); sonuç cache'e atomik olarak yazılır. Çekim
+başarısız olursa cache'teki son fiyatlar PRICE_MAX_STALENESS_SECONDS dolana kadar
+kullanılmaya devam eder; sonrasında filtre statik kurlara düşer.
+
+Her başarılı turdan sonra snapshot Mongo'ya yazılır (db.price_snapshots); açılışta
+geri yüklenir, böylece yeniden başlatma sonrası ilk çeviriler ağ beklemez (warm start).
+Yüklenen fiyatlar kendi çekilme zamanlarıyla gelir, bayatlık sınırları aynen geçerlidir.
+
+Her turun fiyatları dakikalık fiyat geçmişine ve kalıcı barlarına (db.price_bars) da
+yazılır (core/currency/price_history.py); yatırımlar bu geçmişten işlem anındaki fiyatla
+çevrilir. Açılışta saklama penceresindeki barlar snapshot'tan önce geri yüklenir.
+
+Metrikler (/metrics): price_refresh histogramı (tur süresi), price_snapshot_age_seconds
+(en eski fiyatın yaşı), price_snapshot_assets ve price_refresh_failures sayacı.
+"""
+
+import asyncio
+import logging
+import time
+
+from core.currency.price_cache import price_cache
+from core.currency.price_history import price_history
+from core.currency.price_oracle import price_oracle
+from core.metrics.latency import pipeline_metrics
+from core.tokens.token_registry import priced_assets
+from servisler.db_service import (
+    load_price_snapshot,
+    save_price_snapshot,
+    load_price_bars,
+    save_price_bars,
+    find_price_bar,
+)
+from config.settings import PRICE_REFRESH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class PriceRefresher:
+    """Fiyat cache'ini periyodik olarak tazeleyen arka plan görevi."""
+
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self._task = None
+
+    async def start(self):
+        await self.warm_start()
+        if self.interval_seconds > 0 and self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def warm_start(self):
+        """Kalıcı barları fiyat geçmişine, snapshot'ı fiyat cache'ine yükler (hata açılışı engellemez)."""
+        since_minute = int(time.time() // 60) - price_history.retention_minutes
+        try:
+            bars = await load_price_bars(since_minute)
+        except Exception as e:
+            logger.error(f"❌ Fiyat geçmişi yüklenemedi: {e}")
+            bars = []
+        for asset, minute, price in bars:
+            price_history.record({asset: price}, at=minute * 60)
+        if bars:
+            logger.info(f"✅ Fiyat geçmişi yüklendi ({len(bars)} bar, {len(price_history)} varlık)")
+
+        try:
+            entries = await load_price_snapshot()
+        except Exception as e:
+            logger.error(f"❌ Fiyat snapshot'ı yüklenemedi: {e}")
+            return
+        price_cache.restore(entries)
+        for asset, (price, fetched_at) in entries.items():
+            price_history.record({asset: price}, at=fetched_at)
+        if entries:
+            logger.info(f"✅ Fiyat snapshot'ı yüklendi ({len(entries)} varlık, en eski {price_cache.max_age():.0f} sn)")
+
+    async def refresh(self) -> int:
+        """Tek yenileme turu. Returns: güncellenen fiyat sayısı"""
+        assets = priced_assets()
+        started = time.perf_counter()
+        prices = await price_oracle.refresh(assets)
+        now = time.time()
+        price_history.record(prices, at=now)
+        pipeline_metrics.observe("price_refresh", time.perf_counter() - started, event_type=None, token=None)
+        if len(prices) < len(assets):
+            logger.warning(f"⚠️ Fiyat yenileme eksik: {len(prices)}/{len(assets)} varlık")
+        try:
+            await save_price_snapshot(price_cache.entries())
+        except Exception as e:
+            logger.error(f"❌ Fiyat snapshot'ı kaydedilemedi: {e}")
+        try:
+            await save_price_bars(prices, int(now // 60))
+        except Exception as e:
+            logger.error(f"❌ Fiyat barları kaydedilemedi: {e}")
+        return len(prices)
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                pipeline_metrics.increment("price_refresh_failures")
+                logger.error(f"❌ Fiyatlar yenilenemedi: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+
+# Bellekte bulunamayan barlar için kalıcı geçmiş
+price_history.store = find_price_bar
+
+# Uygulama genelinde tek instance
+price_refresher = PriceRefresher(interval_seconds=PRICE_REFRESH_SECONDS)
+
+pipeline_metrics.register_gauge("price_snapshot_age_seconds", lambda: price_cache.max_age() or 0.0)
+pipeline_metrics.register_gauge("price_snapshot_assets", lambda: len(price_cache))
+pipeline_metrics.register_gauge("price_history_bars", price_history.bars)
@@ -0,0 +1,109 @@
+"""
+İşlem Durum Makinesi
+====================
+Tek bir yatırım için Cobo CONFIRMING, birkaç "updated" ve sonunda COMPLETED /
+SUCCESS olayı gönderir. Eskiden her biri filtrelerden ve Mongo sorgularından
+geçiyordu; oysa sadece terminal durum önemlidir.
+
+Her işlem için db.transaction_states'te görülen en yüksek durum (rank) tutulur:
+- Ara durum          → rank ilerletilir, pipeline ÇALIŞMAZ
+- Eskimiş/sırasız    → tek update_one ile (veya bellekten) elenir
+- İlk başarılı terminal geçiş → pipeline çalışır, bitince 'settled' işaretlenir
+- Başarısız terminal (FAILED/REJECTED) → settled, pipeline çalışmaz
+
+ÇÖKME GÜVENLİĞİ:
+----------------
+settled sadece yatırım kredilendikten veya kesin olarak reddedildikten sonra yazılır
+(workers/webhook_processor.py). Pipeline yarıda kalırsa ya da karar sonradan
+değişebilecekse (bilinmeyen adres, spam/dust filtresi) outbox retry'ı veya backfill
+eşit rank'e izin verildiği için yeniden işlenir (çift kredi koruması defterdeki
+unique transaction_id kilidindedir).
+
+NOT: Dedup (workers/event_dedup.py) gibi bu katman da bir optimizasyondur;
+Mongo hatasında olay pipeline'a bırakılır.
+"""
+
+import logging
+
+from core.cache.lru_ttl_cache import LruTtlCache
+from core.transaction.transaction_status import (
+    SUCCESS_STATUSES,
+    FAILURE_STATUSES,
+    status_rank,
+)
+from servisler.db_service import advance_transaction_state, settle_transaction_state
+from config.settings import TX_STATE_CACHE_MAX_ENTRIES, TX_STATE_RETENTION_DAYS
+
+logger = logging.getLogger(__name__)
+
+# Bellekteki settled işaretinin tutulma süresi (Mongo kaydıyla aynı)
+_CACHE_TTL_SECONDS = TX_STATE_RETENTION_DAYS * 86400
+
+
+class TransactionStateMachine:
+    """transaction_id bazlı, en yüksek durumu tutan kalıcı durum makinesi."""
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        # transaction_id → (rank, settled)
+        self._known = LruTtlCache(max_size=max_entries, ttl_seconds=ttl_seconds)
+        self.skipped = 0
+
+    async def begin(self, transaction_id: str, status: str) -> bool:
+        """
+        Olay pipeline'a girmeli mi?
+
+        Returns:
+            bool: True = ilk başarılı terminal geçiş (veya durum izlenemiyor)
+        """
+        if not transaction_id:
+            return True
+
+        rank = status_rank(status)
+        success = status in SUCCESS_STATUSES
+
+        known = self._known.get(transaction_id)
+        if known is not None:
+            known_rank, settled = known
+            if settled or known_rank > rank or (known_rank == rank and not success):
+                self.skipped += 1
+                return False
+
+        try:
+            # Başarılı terminal durumda eşit rank'e izin verilir: yarıda kalan
+            # pipeline'ın outbox retry'ı tekrar işlenebilsin
+            advanced = await advance_transaction_state(transaction_id, status, rank, allow_equal=success)
+        except Exception as e:
+            logger.error(f"❌ İşlem durumu okunamadı ({transaction_id}): {e}")
+            return success
+
+        if not advanced:
+            self.skipped += 1
+            logger.info(f"⏭️ Eskimiş/tekrar olay atlandı: {transaction_id} ({status})")
+            return False
+
+        self._known.set(transaction_id, (rank, False))
+
+        if status in FAILURE_STATUSES:
+            await self.settle(transaction_id, status)
+            return False
+        if not success:
+            logger.info(f"⏳ Ara durum kaydedildi: {transaction_id} ({status})")
+        return success
+
+    async def settle(self, transaction_id: str, status: str):
+        """Terminal olayın pipeline'ı bitti; sonraki olaylar ucuzca elenir."""
+        if not transaction_id:
+            return
+        self._known.set(transaction_id, (status_rank(status), True))
+        try:
+            await settle_transaction_state(transaction_id, status)
+        except Exception as e:
+            # Sonraki olay en kötü ihtimalle pipeline'ı tekrar çalıştırır (try_lock korur)
+            logger.error(f"❌ İşlem durumu kaydedilemedi ({transaction_id}): {e}")
+
+
+# Uygulama genelinde tek instance
+transaction_states = TransactionStateMachine(
+    max_entries=TX_STATE_CACHE_MAX_ENTRIES,
+    ttl_seconds=_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,37 @@
+"""
+wallet_addresses Geçişi (Backfill)
+==================================
+Lead dokümanlarındaki wallets dizilerini db.wallet_addresses koleksiyonuna
+kopyalayan tek seferlik iş. Yeni cüzdanlar zaten iki yere yazıldığı için
+(save_wallet_to_lead) bir kez çalıştırmak yeterlidir; tekrar çalıştırmak güvenlidir.
+
+Geçiş adımları:
+    1. Bu sürümü deploy et (dual-write + fallback'li okuma)
+    2. python -m workers.wallet_address_migration
+    3. WALLET_ADDRESSES_LEGACY_FALLBACK=false → okumalar sadece yeni koleksiyondan
+"""
+
+import argparse
+import asyncio
+import logging
+
+from servisler.db_service import backfill_wallet_addresses
+from servisler.db_migrations import run_migrations
+
+logger = logging.getLogger(__name__)
+
+
+async def migrate(batch_size: int) -> int:
+    # Unique index backfill'den ÖNCE kurulmalı: aynı adres iki kez yazılmasın
+    await run_migrations()
+    inserted = await backfill_wallet_addresses(batch_size=batch_size)
+    logger.info(f"✅ wallet_addresses backfill tamamlandı ({inserted} yeni kayıt)")
+    return inserted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lead wallets dizilerini wallet_addresses'e kopyalar")
+    parser.add_argument("--batch-size", type=int, default=1000, help="bulk_write başına işlem sayısı")
+    args = parser.parse_args()
+
+    asyncio.run(migrate(args.batch_size))
@@ -3,17 +3,17 @@ COBO WEBHOOK İŞLEYİCİ (Background Task)
 ========================================
 
 Bu modül, Cobo platformundan gelen webhook bildirimlerini arka planda işler.
-main.py'deki /cobo/callback endpoint'i bu modüldeki process_cobo_notification()
-fonksiyonunu BackgroundTasks ile çağırır.
+/cobo/callback_v2 endpoint'i olayı kalıcı outbox'a yazar; workers/webhook_queue.py
+içindeki worker havuzu bu modüldeki dispatch_cobo_notification() fonksiyonunu çağırır.
 
 İŞ AKIŞI:
 ---------
 1. Event tipi belirlenir (cüzdan/işlem)
-2. İşlem filtreleri uygulanır (Tip, Token, Volume, İç Transfer)
-3. Müşteri doğrulanır (MongoDB)
-4. Kur çevirisi yapılır (converter.py)
-5. Race condition koruması (try_lock_transaction)
-6. Finansal istatistikler güncellenir
+2. Durum makinesi: ara/eskimiş olaylar elenir (transaction_state.py)
+3. İşlem filtreleri uygulanır (Tip, Token, Volume, İç Transfer)
+4. Müşteri doğrulanır (MongoDB)
+5. Kur çevirisi yapılır (converter.py)
+6. Race condition koruması + finansal istatistikler (record_deposit, tek transaction)
 7. MT5'e bakiye eklenir
 8. Telegram bildirimi gönderilir
 
@@ -22,47 +22,68 @@ BAĞIMLILIKLAR:
 - servisler.db_service (MongoDB işlemleri)
 - servisler.telegram_service (Bildirimler)
 - config.settings (MT5 manager instance)
-- config.constants (ALLOWED_TOKENS, BLOCKED_TYPES)
+- config.constants (BLOCKED_TYPES)
+- core.tokens.token_registry (Token sınıflandırma)
 - core.filter.base_volume_filter (Hacim filtresi)
 - core.currency.converter.converter (Kur çevirisi)
 """
 
 import logging
 import asyncio
+import time
 from servisler.db_service import (
+    get_lead_by_tp,
     get_lead_by_address,
-    try_lock_transaction,
-    increment_deposit_count,
-    update_financial_stats,
-    get_all_our_addresses
+    get_wallet_by_address,
+    record_deposit,
+    is_our_address
 )
+from core.cache.address_index import address_index
 from servisler.telegram_service import send_telegram_msg, send_telegram_approval_request
 from config.settings import get_mt5_manager
-from config.constants import ALLOWED_TOKENS, BLOCKED_TYPES, get_display_chain_name
-from core.currency.converter.converter import coin_parser
+from config.constants import BLOCKED_TYPES, get_display_chain_name
+from core.currency.converter.converter import convert_to_usd
 from core.filter.base_volume_filter import BaseVolumeFilter
+from core.transaction.transaction_event import TransactionEvent
+from core.tokens.token_registry import resolve_token
+from core.lead.lead_views import LeadIdentity
+from core.transaction.transaction_status import SUCCESS_STATUSES
+from core.metrics.latency import pipeline_metrics
+from workers.transaction_state import transaction_states
 
 # V2.0 - Komisyon hesaplama, onay bekleyen işlem deposu ve cüzdan yönlendirme importları
 from core.comision.calculate_comision import calculate_comision
 from core.routing.coin_router import get_target_wallet
 from workers.pending_store import pending_transactions
 from config.settings import COBO_AUTO_ROUTING_ENABLED
+from config.settings import WEBHOOK_BATCH_ENABLED, WEBHOOK_BATCH_WINDOW_MS, WEBHOOK_BATCH_MAX_EVENTS
+from workers.deposit_batcher import DepositBatcher
 
 logger = logging.getLogger(__name__)
 
-async def process_cobo_notification(data: dict):
+# Opsiyonel micro-batch aşaması (WEBHOOK_BATCH_ENABLED=true)
+deposit_batcher = DepositBatcher(
+    convert=lambda symbol, amount, created_timestamp: _convert_deposit_amount(symbol, amount, created_timestamp),
+    window_ms=WEBHOOK_BATCH_WINDOW_MS,
+    max_events=WEBHOOK_BATCH_MAX_EVENTS,
+)
+
+async def dispatch_cobo_notification(data: dict):
     """
-    Cobo webhook bildirimlerini arka planda işleyen asenkron fonksiyon
+    Cobo webhook bildirimini event tipine göre ilgili handler'a yönlendirir.
+    Hataları yutmaz — outbox worker'ı hata alan olayı tekrar dener.
 
     Args:
         data: Cobo webhook payload
     """
-    try:
-        logger.info(f"🔄 Arka plan işlemi başlatıldı: {data.get('event_id', 'unknown')}")
+    logger.info(f"🔄 Arka plan işlemi başlatıldı: {data.get('event_id', 'unknown')}")
 
-        # Cobo uses 'type' not 'event_type'
-        event_type = data.get("type") or data.get("event_type")
+    # Cobo uses 'type' not 'event_type'
+    event_type = data.get("type") or data.get("event_type")
+    pipeline_metrics.count_event(event_type)
 
+    # Etiketler olay bitince sıfırlanır (worker task'ı sonraki olayda aynı context'i kullanır)
+    with pipeline_metrics.event_labels(event_type), pipeline_metrics.timer("total"):
         # Wallet creation notification
         if event_type == "wallets.addresses.created":
             await _handle_wallet_created(data)
@@ -74,11 +95,22 @@ async def process_cobo_notification(data: dict):
             "wallets.transaction.updated", "wallets.transaction.succeeded",
             "wallets.transactions.created", "wallets.transactions.updated"
         ]:
-            await _handle_transaction(data)
+            await _handle_transaction(TransactionEvent.from_webhook(data))
 
         else:
             logger.info(f"ℹ️ Diğer event type: {event_type}")
 
+
+async def process_cobo_notification(data: dict):
+    """
+    Cobo webhook bildirimlerini arka planda işleyen asenkron fonksiyon.
+    Hataları loglar ve yutar (kuyruk dışı, tek seferlik çağrılar için).
+
+    Args:
+        data: Cobo webhook payload
+    """
+    try:
+        await dispatch_cobo_notification(data)
     except Exception as e:
         logger.error(f"❌ Arka plan işlem hatası: {e}")
         import traceback
@@ -89,23 +121,24 @@ async def _handle_wallet_created(data: dict):
     """
     Cüzdan oluşturma bildirimlerini işler
     """
-    addresses = data.get("data", {}).get("addresses", [])
-    for addr_data in addresses:
+    payload = data.get("data")
+    addresses = payload.get("addresses") if isinstance(payload, dict) else None
+    for addr_data in addresses or []:
+        if not isinstance(addr_data, dict):
+            continue
         address = addr_data.get("address")
         chain = addr_data.get("chain_id")
 
-        # Bu adresi hangi kullanıcı için oluşturduk?
-        lead = await get_lead_by_address(address)
-        if lead:
-            tp = lead.get("tp_number")
-            name = lead.get("name", "Bilinmeyen")
+        # Cobo'da bizim için oluşturulan adres: iç transfer tespitine ekle
+        address_index.add(address)
 
-            # Asset bilgisini cüzdan listesinden bul
-            asset = "USDT"  # Varsayılan
-            for w in lead.get("wallets", []):
-                if w.get("address") == address:
-                    asset = w.get("asset", "USDT")
-                    break
+        # Bu adresi hangi kullanıcı için oluşturduk? (asset bilgisi cüzdan kaydında)
+        wallet = await get_wallet_by_address(address)
+        lead = await get_lead_by_tp(wallet["tp_number"], view=LeadIdentity) if wallet else None
+        if lead:
+            tp = lead.tp_number
+            name = lead.name or "Bilinmeyen"
+            asset = wallet.get("asset") or "USDT"
 
             # Ağ ismini güzelleştir
             display_chain = get_display_chain_name(chain)
@@ -122,66 +155,81 @@ async def _handle_wallet_created(data: dict):
             logger.info(f"✅ Cüzdan bildirimi: {name} (TP: {tp}) - {asset} {chain}")
 
 
-async def _handle_transaction(data: dict):
+async def _handle_transaction(event: TransactionEvent):
     """
-    İşlem (transaction) bildirimlerini işler
+    İşlem (transaction) bildirimlerini işler.
+    Webhook ve backfill/replay aynı normalize edilmiş modeli kullanır.
+
+    Durum makinesi (workers/transaction_state.py) ara durumları ve eskimiş
+    olayları filtrelere girmeden eler; pipeline sadece ilk başarılı terminal
+    geçişte çalışır. İşlem sadece kredilendiyse veya kesin olarak reddedildiyse
+    'settled' işaretlenir; bilinmeyen adres, spam/dust filtresi gibi sonradan
+    değişebilecek kararlarda sonraki retry/backfill pipeline'a tekrar girer.
     """
-    tx = data.get("data", {})
-    if "transaction" in tx:
-        tx = tx["transaction"]
+    if not event.address:
+        return
 
-    transaction_id = tx.get("transaction_id") or data.get("event_id")
-    status = tx.get("status", "").upper()
+    with pipeline_metrics.timer("state"):
+        should_process = await transaction_states.begin(event.transaction_id, event.status)
+    if not should_process:
+        return
 
-    # Veri çekme mantığı
-    address = tx.get("to_address") or tx.get("destination", {}).get("address")
-    from_address = tx.get("from_address") or tx.get("source", {}).get("address")
-    wallet_id = tx.get("wallet_id") or tx.get("destination", {}).get("wallet_id")
+    if await _filter_and_process_transaction(event):
+        await transaction_states.settle(event.transaction_id, event.status)
 
-    amount_str = tx.get("amount") or tx.get("destination", {}).get("amount")
-    amount = float(amount_str) if amount_str else 0
-    symbol = tx.get("token_id") or tx.get("coin_code") or tx.get("asset_id")
-    chain_id = tx.get("chain_id", "Unknown")
-    tx_type = tx.get("type", "").upper()
+
+async def _filter_and_process_transaction(event: TransactionEvent) -> bool:
+    """
+    Filtreleri uygular ve başarılı yatırımı işler.
+
+    Returns:
+        bool: True = yatırım kredilendi veya kesin olarak reddedildi (işlem tipi,
+              iç transfer); False = karar sonradan değişebilir, settled işaretlenmez
+    """
+    transaction_id = event.transaction_id
+    status = event.status
+    address = event.address
+    from_address = event.from_address
+    wallet_id = event.wallet_id
+    amount = event.amount
+    symbol = event.symbol
+    chain_id = event.chain_id
+    created_timestamp = event.created_timestamp
+    tx_type = event.tx_type
 
     if not address:
-        return
+        return False
 
-    # FİLTRE 1: Tip kontrolü - Sadece DEPOSIT kabul et
-    if tx_type in BLOCKED_TYPES or tx_type not in ["DEPOSIT", "RECEIVE"]:
-        logger.info(f"⏭️ Engellenen işlem tipi: {tx_type} - {transaction_id}")
-        return
+    pipeline_metrics.set_token(symbol)
 
-    # FİLTRE 2: Gerçek coin kontrolü - Sadece bilinen coinleri kabul et
-    token_upper = (symbol or "").upper()
-    is_allowed = False
-    for allowed in ALLOWED_TOKENS:
-        if allowed in token_upper:
-            is_allowed = True
-            break
+    with pipeline_metrics.timer("filters"):
+        # FİLTRE 1: Tip kontrolü - Sadece DEPOSIT kabul et
+        if tx_type in BLOCKED_TYPES or tx_type not in ["DEPOSIT", "RECEIVE"]:
+            logger.info(f"⏭️ Engellenen işlem tipi: {tx_type} - {transaction_id}")
+            return True
 
-    if not is_allowed:
-        logger.info(f"⏭️ Fake/Spam token engellendi: {symbol} - {transaction_id}")
-        return
+        # FİLTRE 2: Gerçek coin kontrolü - Sadece bilinen coinleri kabul et (token registry)
+        if resolve_token(symbol) is None:
+            logger.info(f"⏭️ Fake/Spam token engellendi: {symbol} - {transaction_id}")
+            return False
 
-    # FİLTRE 3: Minimum tutar kontrolü - 1 USD altını engelle
-    if await BaseVolumeFilter.should_block_transaction(symbol, amount, transaction_id):
-        return
+        # FİLTRE 3: Minimum tutar kontrolü - 1 USD altını engelle
+        if await BaseVolumeFilter.should_block_transaction(symbol, amount, transaction_id):
+            return False
 
-    # FİLTRE 4: İç transfer kontrolü - Kendi adreslerimizden gelenleri engelle
-    if from_address:
-        our_addresses = await get_all_our_addresses()
-        if from_address in our_addresses:
+        # FİLTRE 4: İç transfer kontrolü - Kendi adreslerimizden gelenleri engelle (O(1) indeks)
+        if from_address and await is_our_address(from_address):
             logger.info(f"⏭️ İç transfer engellendi (sweep/consolidation): {transaction_id}")
-            return
+            return True
 
     # Sadece başarılı işlemleri işle
-    if status in ["COMPLETED", "SUCCESS", "CONFIRMED"]:
-        await _process_successful_transaction(
-            transaction_id, address, amount, symbol, chain_id, status, wallet_id
+    if status in SUCCESS_STATUSES:
+        return await _process_successful_transaction(
+            transaction_id, address, amount, symbol, chain_id, status, wallet_id, created_timestamp
         )
-    elif status == "CONFIRMING":
+    if status == "CONFIRMING":
         logger.info(f"⏳ Ödeme tespit edildi (Onay bekleniyor): {transaction_id}")
+    return False
 
 
 async def _process_successful_transaction(
@@ -191,54 +239,42 @@ async def _process_successful_transaction(
     symbol: str,
     chain_id: str,
     status: str,
-    wallet_id: str = None
-):
+    wallet_id: str = None,
+    created_timestamp: int = None
+) -> bool:
     """
     Başarılı işlemleri işler: Müşteri bulma, kur çevirme, MT5 aktarım onayı
-    """
-    # Müşteriyi bul
-    lead = await get_lead_by_address(address)
-    if not lead:
-        logger.warning(f"⚠️ Bilinmeyen adrese deposit: {address} - Tx: {transaction_id}")
-        return
 
-    tp_number = lead.get("tp_number")
-    name = lead.get("name", "Bilinmeyen")
-
-    # Kur çevirisi
+    Returns:
+        bool: True = yatırım bu olayla kredilendi
+    """
     original_amount = amount
-    try:
-        loop = asyncio.get_event_loop()
-        cv_data = await loop.run_in_executor(None, coin_parser, symbol, amount)
-
-        # 2. eleman her zaman USD'dir
-        usd_record = cv_data[1]
-        amount = float(usd_record['amount'])
-        logger.info(f"💱 Kur Çevirisi Yapıldı: {original_amount} {symbol} -> {amount} USD")
-    except Exception as e:
-        logger.error(f"❌ Kur Çevirme Hatası ({symbol}): {e}")
 
-    # Atomik kilit - Race condition koruması
-    is_locked = await try_lock_transaction(transaction_id, tp_number, amount, symbol, status)
-    if not is_locked:
-        logger.info(f"⏭️ İşlem zaten işlenmiş (Race Condition Önlemi): {transaction_id}")
-        return
+    # Müşteri bulma + kur + kilit + istatistik (batch açıksa toplu Mongo işlemleri)
+    if WEBHOOK_BATCH_ENABLED:
+        credited = await deposit_batcher.submit(transaction_id, address, amount, symbol, status, created_timestamp)
+    else:
+        credited = await _credit_deposit(transaction_id, address, amount, symbol, status, created_timestamp)
+    if not credited:
+        return False
+
+    tp_number = credited["tp_number"]
+    name = credited["name"]
+    amount = credited["usd_amount"]
+    tot_dep = credited["total_deposit"]
+    tot_with = credited["total_withdrawal"]
+    count = credited["deposit_count"]
+    price_age_seconds = credited.get("price_age_seconds")
 
     # Miktar formatla
     formatted_amount = "{:,.2f}".format(amount).replace(",", "X").replace(".", ",").replace("X", ".")
     formatted_raw_amount = "{:,.2f}".format(original_amount).replace(",", "X").replace(".", ",").replace("X", ".")
 
-    # Finansal istatistikleri güncelle
-    updated_lead = await update_financial_stats(tp_number, amount, is_deposit=True)
-    tot_dep = updated_lead.get("total_deposit", 0)
-    tot_with = updated_lead.get("total_withdrawal", 0)
-
-    # Yatırım sayısını artır
-    count = await increment_deposit_count(tp_number)
     base_comment = "DEPOSIT" if count == 1 else "DEPOSIT-2"
 
     # MT5 metadata çek
-    city_code, acc_comment = await _fetch_mt5_metadata(tp_number)
+    with pipeline_metrics.timer("mt5_metadata"):
+        city_code, acc_comment = await _fetch_mt5_metadata(tp_number)
 
     # Telegram bildirimi gönder (mevcut - ilk bildirim mesajı)
     msg = _build_deposit_telegram_message(
@@ -246,7 +282,8 @@ async def _process_successful_transaction(
         formatted_amount, tp_number, city_code, acc_comment,
         tot_dep, tot_with
     )
-    send_telegram_msg(msg)
+    with pipeline_metrics.timer("telegram_enqueue"):
+        send_telegram_msg(msg)
 
     # V2.0 - Komisyon hesapla
     comision_data = calculate_comision(amount)
@@ -270,24 +307,27 @@ async def _process_successful_transaction(
         "base_comment": base_comment,
         "tot_dep": tot_dep,
         "tot_with": tot_with,
+        "price_age_seconds": price_age_seconds,
     }
 
     # V2.0 - MT5 aktarımı için Telegram onay mesajı gönder (ONAYLA / REDDET butonları)
-    send_telegram_approval_request(
-        transaction_id=transaction_id,
-        name=name,
-        symbol=symbol,
-        chain_id=chain_id,
-        gross_usd=amount,
-        comision=comision_amount,
-        net_usd=net_amount
-    )
+    with pipeline_metrics.timer("telegram_enqueue"):
+        send_telegram_approval_request(
+            transaction_id=transaction_id,
+            name=name,
+            symbol=symbol,
+            chain_id=chain_id,
+            gross_usd=amount,
+            comision=comision_amount,
+            net_usd=net_amount,
+            price_age_seconds=price_age_seconds
+        )
 
     # V2.0 - Coin routing: Gelen coin türüne göre hedef cüzdanı belirle ve transfer et.
     # COBO_AUTO_ROUTING_ENABLED=false ise bu blok tamamen atlanır.
     if not COBO_AUTO_ROUTING_ENABLED:
         logger.info(f"⏸️ Otomatik routing devre dışı (COBO_AUTO_ROUTING_ENABLED=false). {symbol} için routing yapılmadı.")
-        return
+        return True
 
     wallet_address, wallet_label, is_main = get_target_wallet(symbol)
 
@@ -297,16 +337,17 @@ async def _process_successful_transaction(
             withdrawal_service = CoboWithdrawalService()
 
             loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(
-                None,
-                withdrawal_service.create_withdrawal,
-                wallet_id,
-                wallet_address,
-                original_amount,
-                symbol,
-                chain_id,
-                f"Auto-routed to {wallet_label}"
-            )
+            with pipeline_metrics.timer("routing"):
+                result = await loop.run_in_executor(
+                    None,
+                    withdrawal_service.create_withdrawal,
+                    wallet_id,
+                    wallet_address,
+                    original_amount,
+                    symbol,
+                    chain_id,
+                    f"Auto-routed to {wallet_label}"
+                )
 
             if isinstance(result, dict) and result.get("success"):
                 logger.info(f"🔀 Routing Başarılı: {symbol} -> {wallet_label} ({wallet_address})")
@@ -339,7 +380,90 @@ async def _process_successful_transaction(
 
     elif not wallet_id:
         logger.warning(f"⚠️ wallet_id gelmedi, '{symbol}' için routing yapılamadı.")
+    return True
+
+
+
+async def _convert_deposit_amount(symbol: str, amount: float, created_timestamp: int = None) -> dict:
+    """
+    Coin miktarını USD'ye çevirir. created_timestamp (Cobo, ms) verilirse işlem anındaki
+    fiyat kullanılır (dakikalık fiyat geçmişi); replay/backfill aynı tutarı üretir.
 
+    Returns:
+        dict: {"amount": USD tutarı, "rate": kur, "price_age_seconds": kullanılan fiyatın yaşı}
+    Raises:
+        Kabul edilebilir bayatlıkta fiyat yoksa hata — yatırım 1:1 kaydedilmez,
+        webhook kuyruğu olayı daha sonra yeniden dener.
+    """
+    started = time.perf_counter()
+    try:
+        cv_data = await convert_to_usd(symbol, amount, created_timestamp)
+
+        # 2. eleman her zaman USD'dir
+        usd_record = cv_data[1]
+        usd_amount = float(usd_record['amount'])
+        logger.info(f"💱 Kur Çevirisi Yapıldı: {amount} {symbol} -> {usd_amount} USD")
+        return {
+            "amount": usd_amount,
+            "rate": usd_record.get("rate"),
+            "price_age_seconds": usd_record.get("price_age_seconds"),
+        }
+    except Exception as e:
+        logger.error(f"❌ Kur Çevirme Hatası ({symbol}): {e}")
+        raise
+    finally:
+        # Batch modunda birden fazla token aynı task'ta çevrilir; etiketi açıkça ver
+        pipeline_metrics.observe("fx", time.perf_counter() - started, token=(symbol or "unknown").upper())
+
+
+async def _credit_deposit(
+    transaction_id: str,
+    address: str,
+    amount: float,
+    symbol: str,
+    status: str,
+    created_timestamp: int = None
+) -> dict | None:
+    """
+    Tekil (batch'siz) yatırım kaydı: müşteri bulma, kur çevirisi, atomik kilit ile
+    finansal istatistik ve yatırım sayısı güncellemesi (tek defter yazımı).
+
+    Returns:
+        dict: tp_number, name, usd_amount, price_age_seconds, total_deposit, total_withdrawal, deposit_count
+        None: Bilinmeyen adres veya işlem zaten işlenmiş
+    """
+    # Müşteriyi bul
+    with pipeline_metrics.timer("lead_lookup"):
+        lead = await get_lead_by_address(address, view=LeadIdentity)
+    if not lead:
+        logger.warning(f"⚠️ Bilinmeyen adrese deposit: {address} - Tx: {transaction_id}")
+        return None
+
+    tp_number = lead.tp_number
+
+    # Kur çevirisi
+    conversion = await _convert_deposit_amount(symbol, amount, created_timestamp)
+    usd_amount = conversion["amount"]
+
+    # Atomik kilit + istatistikler (Race condition koruması, tek transaction)
+    with pipeline_metrics.timer("ledger_write"):
+        updated_lead = await record_deposit(
+            transaction_id, tp_number, usd_amount, symbol, status, raw_amount=amount,
+            usd_rate=conversion["rate"], price_age_seconds=conversion["price_age_seconds"]
+        )
+    if updated_lead is None:
+        logger.info(f"⏭️ İşlem zaten işlenmiş (Race Condition Önlemi): {transaction_id}")
+        return None
+
+    return {
+        "tp_number": tp_number,
+        "name": lead.name or "Bilinmeyen",
+        "usd_amount": usd_amount,
+        "price_age_seconds": conversion["price_age_seconds"],
+        "total_deposit": updated_lead.get("total_deposit", 0),
+        "total_withdrawal": updated_lead.get("total_withdrawal", 0),
+        "deposit_count": updated_lead.get("deposit_count", 1),
+    }
 
 
 def _parse_cobo_error(error: object) -> str:
@@ -444,6 +568,9 @@ async def _process_mt5_balance(
 ):
     """
     MT5'e bakiye ekler
+
+    Returns:
+        tuple: (başarılı mı, MT5 ticket — DealerBalance döndürdüyse)
     """
     mt5_manager = get_mt5_manager()
 
@@ -458,6 +585,7 @@ async def _process_mt5_balance(
                     f"📝 Yorum: {comment}"
                 )
                 send_telegram_msg(mt5_res)
+                return True, mt5_manager.last_ticket
             else:
                 send_telegram_msg(
                     f"❌ <b>MT5 İŞLEM HATASI</b>\n"
@@ -482,3 +610,4 @@ async def _process_mt5_balance(
             f"💰 {formatted_amount} $\n"
             f"⚠️ Para veritabanına işlendi ama MT5'e GEÇMEDİ! Manuel kontrol gerekli."
         )
+    return False, None
@@ -0,0 +1,224 @@
+"""
+Kalıcı Webhook Kuyruğu (MongoDB Outbox + Worker Havuzu)
+========================================================
+Cobo webhook'ları BackgroundTasks yerine önce db.webhook_outbox koleksiyonuna
+yazılır. Sabit sayıdaki async worker bu koleksiyondan lease (kiralama) ile
+olay çeker, işler ve ack'ler.
+
+NEDEN:
+------
+- Process restart / crash / PM2 max_memory_restart durumunda işlenmemiş
+  yatırımlar kaybolmaz; bir sonraki açılışta kaldığı yerden devam edilir.
+- Worker sayısı sabit olduğu için Cobo retry fırtınasında bile bellekte
+  sınırsız coroutine birikmez (Mongo'da bekler).
+
+SEMANTİK:
+---------
+- claim: pending veya lease süresi dolmuş olay atomik olarak alınır
+- ack: başarılı olay 'done' olur (TTL index ile retention sonrası silinir)
+- release: hata alan olay üstel bekleme ile tekrar 'pending' olur,
+  WEBHOOK_QUEUE_MAX_ATTEMPTS aşılırsa 'failed' olur ve Telegram'a alarm gider
+- Çift işleme riski try_lock_transaction ile zaten sıfırdır (idempotent)
+
+BACKPRESSURE:
+-------------
+Bekleyen olay sayısı (depth) bellekte tutulur: enqueue'da artar, ack/dead-letter'da
+azalır ve WEBHOOK_QUEUE_DEPTH_REFRESH_SECONDS'ta bir Mongo'dan düzeltilir (diğer
+process'ler, lease kurtarmaları). depth WEBHOOK_QUEUE_HIGH_WATER_MARK'ı aşınca
+/cobo/callback_v2 503 + Retry-After döner; taşan yük Cobo'nun retry'ında bekler.
+
+ÖNCELİK:
+--------
+Olaylar FIFO yerine değere göre sıralanır (core/transaction/priority.py): büyük
+yatırımlar öne geçer, spam/dust sona kalır; yaşlanma sayesinde hiçbiri aç kalmaz.
+"""
+
+import asyncio
+import logging
+import os
+
+from servisler.db_service import (
+    enqueue_webhook_event,
+    claim_webhook_event,
+    ack_webhook_event,
+    release_webhook_event,
+    recover_webhook_outbox,
+    count_pending_webhook_events,
+)
+from servisler.telegram_service import send_telegram_msg
+from workers.webhook_processor import dispatch_cobo_notification
+from config.settings import (
+    WEBHOOK_QUEUE_CONCURRENCY,
+    WEBHOOK_QUEUE_LEASE_SECONDS,
+    WEBHOOK_QUEUE_MAX_ATTEMPTS,
+    WEBHOOK_QUEUE_POLL_SECONDS,
+    WEBHOOK_QUEUE_HIGH_WATER_MARK,
+    WEBHOOK_QUEUE_DEPTH_REFRESH_SECONDS,
+    WEBHOOK_PRIORITY_AGING_SECONDS,
+)
+from core.metrics.latency import pipeline_metrics
+from core.transaction.priority import (
+    PRIORITY_NAMES,
+    PRIORITY_NORMAL,
+    score_webhook_event,
+    priority_delay_seconds,
+)
+
+logger = logging.getLogger(__name__)
+
+# Hata sonrası tekrar deneme bekleme süresinin üst sınırı (saniye)
+MAX_RETRY_DELAY_SECONDS = 300
+
+
+class WebhookQueue:
+    """MongoDB outbox'ından beslenen sabit boyutlu async worker havuzu."""
+
+    def __init__(
+        self,
+        concurrency: int,
+        lease_seconds: int,
+        max_attempts: int,
+        poll_seconds: float,
+        high_water_mark: int = 0,
+        depth_refresh_seconds: float = 5,
+        aging_seconds: float = 0,
+    ):
+        self.concurrency = max(1, concurrency)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.poll_seconds = poll_seconds
+        self.high_water_mark = high_water_mark  # 0 = sınırsız
+        self.depth_refresh_seconds = depth_refresh_seconds
+        self.aging_seconds = aging_seconds  # 0 = FIFO
+        self.depth = 0
+        self._workers: list[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._running = False
+
+    async def start(self):
+        """Yarım kalan olayları kurtarır ve worker'ları başlatır."""
+        if self._running:
+            return
+        recovered = await recover_webhook_outbox()
+        if recovered:
+            logger.warning(f"♻️ Outbox kurtarma: {recovered} yarım kalmış olay tekrar kuyruğa alındı")
+
+        await self.refresh_depth()
+        self._running = True
+        self._workers = [
+            asyncio.create_task(self._worker_loop(f"{os.getpid()}-{i}"))
+            for i in range(self.concurrency)
+        ]
+        self._workers.append(asyncio.create_task(self._depth_loop()))
+        logger.info(f"✅ Webhook kuyruğu başladı ({self.concurrency} worker)")
+
+    async def stop(self):
+        """Worker'ları durdurur. İşlenmekte olan olaylar lease ile geri kazanılır."""
+        self._running = False
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("🛑 Webhook kuyruğu durduruldu")
+
+    async def enqueue(self, data: dict) -> str:
+        """Olayı öncelik puanıyla outbox'a yazar ve boşta bekleyen worker'ları uyandırır."""
+        priority = score_webhook_event(data)
+        outbox_id = await enqueue_webhook_event(
+            data, priority, priority_delay_seconds(priority, self.aging_seconds)
+        )
+        pipeline_metrics.increment(f"webhook_priority_{PRIORITY_NAMES[priority]}")
+        self.depth += 1
+        self._wakeup.set()
+        return outbox_id
+
+    @property
+    def running(self) -> bool:
+        """Worker'lar çalışıyor mu? (başlatılamadıysa endpoint olayları kabul etmez)"""
+        return self._running
+
+    def is_overloaded(self) -> bool:
+        """Bekleyen iş high-water mark'ı aştı mı? (yeni olaylar 503 ile geri çevrilir)"""
+        return self.high_water_mark > 0 and self.depth >= self.high_water_mark
+
+    async def refresh_depth(self):
+        """Bellekteki tahmini Mongo'daki gerçek pending + processing sayısıyla düzeltir."""
+        try:
+            self.depth = await count_pending_webhook_events()
+        except Exception as e:
+            logger.error(f"❌ Outbox derinliği okunamadı: {e}")
+
+    async def _depth_loop(self):
+        while self._running:
+            await asyncio.sleep(self.depth_refresh_seconds)
+            await self.refresh_depth()
+
+    async def _worker_loop(self, worker_id: str):
+        while self._running:
+            try:
+                doc = await claim_webhook_event(worker_id, self.lease_seconds)
+            except Exception as e:
+                logger.error(f"❌ Outbox claim hatası ({worker_id}): {e}")
+                await asyncio.sleep(self.poll_seconds)
+                continue
+
+            if not doc:
+                await self._wait_for_work()
+                continue
+
+            await self._process(doc)
+
+    async def _wait_for_work(self):
+        """Yeni olay gelene ya da poll süresi dolana kadar bekler."""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _process(self, doc: dict):
+        outbox_id = doc["_id"]
+        attempts = doc.get("attempts", 1)
+        event_id = doc.get("event_id") or "unknown"
+
+        try:
+            await dispatch_cobo_notification(doc["payload"])
+            await ack_webhook_event(outbox_id)
+            self.depth = max(0, self.depth - 1)
+        except Exception as e:
+            is_dead = attempts >= self.max_attempts
+            retry_in = min(5 * 2 ** (attempts - 1), MAX_RETRY_DELAY_SECONDS)
+            logger.error(f"❌ Webhook işleme hatası ({event_id}, deneme {attempts}): {e}")
+            try:
+                await release_webhook_event(
+                    outbox_id, str(e), retry_in, dead=is_dead,
+                    priority_delay_seconds=priority_delay_seconds(
+                        doc.get("priority", PRIORITY_NORMAL), self.aging_seconds
+                    ),
+                )
+            except Exception as release_error:
+                # Lease süresi dolunca olay zaten tekrar alınır
+                logger.error(f"❌ Outbox release hatası ({event_id}): {release_error}")
+
+            if is_dead:
+                self.depth = max(0, self.depth - 1)
+                send_telegram_msg(
+                    f"🚨 <b>WEBHOOK İŞLENEMEDİ</b>\n"
+                    f"🆔 Event: <code>{event_id}</code>\n"
+                    f"🔁 Deneme: {attempts}\n"
+                    f"⚠️ Hata: {str(e)[:200]}\n"
+                    f"<i>Olay outbox'ta 'failed' olarak bekliyor, manuel kontrol gerekli.</i>"
+                )
+
+
+# Uygulama genelinde tek kuyruk instance'ı
+webhook_queue = WebhookQueue(
+    concurrency=WEBHOOK_QUEUE_CONCURRENCY,
+    lease_seconds=WEBHOOK_QUEUE_LEASE_SECONDS,
+    max_attempts=WEBHOOK_QUEUE_MAX_ATTEMPTS,
+    poll_seconds=WEBHOOK_QUEUE_POLL_SECONDS,
+    high_water_mark=WEBHOOK_QUEUE_HIGH_WATER_MARK,
+    depth_refresh_seconds=WEBHOOK_QUEUE_DEPTH_REFRESH_SECONDS,
+    aging_seconds=WEBHOOK_PRIORITY_AGING_SECONDS,
+)
+pipeline_metrics.register_gauge("webhook_queue_depth", lambda: webhook_queue.depth)